@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_startup import free_port, wait_for
+from benchmarks.synthetic import encode_page, generate_page
+
+IN_PROCESS = "inprocess"
+GUNICORN = "gunicorn"
+PERCENTILES = (50, 95, 99)
+
+
+def post(url, body, content_type, timeout):
+    request = urllib.request.Request(url, data=body, method="POST")
+    request.add_header("Content-Type", content_type)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def multipart_body(filename, content):
+    boundary = uuid.uuid4().hex
+    body = (
+        (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            "Content-Type: image/png\r\n\r\n"
+        ).encode()
+        + content
+        + f"\r\n--{boundary}--\r\n".encode()
+    )
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class Recorder:
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def call(self, endpoint, function, *args):
+        start = time.perf_counter()
+        try:
+            status, data = function(*args)
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            status, data = None, None
+        seconds = time.perf_counter() - start
+
+        # Every endpoint answers 200 with success false on handled failures
+        ok = status == 200 and bool(data and data.get("success"))
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append((seconds, ok, status))
+        return data if ok else None
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * rank // 100) - 1)
+    return ordered[index]
+
+
+def upload_and_process(base_url, recorder, index, page, timeout):
+    filename = f"load-{uuid.uuid4().hex[:8]}-{index}.png"
+    body, content_type = multipart_body(filename, page)
+    uploaded = recorder.call(
+        "/upload", post, f"{base_url}/upload", body, content_type, timeout
+    )
+    if uploaded is None:
+        return
+
+    recorder.call(
+        "/process",
+        post,
+        f"{base_url}/process/{uploaded['filename']}",
+        b"",
+        "application/octet-stream",
+        timeout,
+    )
+
+
+def extract(base_url, recorder, index, page, timeout):
+    recorder.call("/extract", post, f"{base_url}/extract", page, "image/png", timeout)
+
+
+FLOWS = {"process": upload_and_process, "extract": extract}
+
+
+def run_load(base_url, flow, pages, requests, concurrency, timeout):
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for index in range(requests):
+            executor.submit(
+                FLOWS[flow],
+                base_url,
+                recorder,
+                index,
+                pages[index % len(pages)],
+                timeout,
+            )
+    elapsed = time.perf_counter() - start
+
+    report = {}
+    for endpoint, samples in recorder.samples.items():
+        seconds = [sample[0] for sample in samples]
+        errors = sum(not sample[1] for sample in samples)
+        statuses = {}
+        for sample in samples:
+            statuses[str(sample[2])] = statuses.get(str(sample[2]), 0) + 1
+
+        report[endpoint] = {
+            "requests": len(samples),
+            "rps": len(samples) / elapsed,
+            "error_rate": errors / len(samples),
+            "statuses": statuses,
+            **{f"p{rank}_ms": percentile(seconds, rank) * 1000 for rank in PERCENTILES},
+        }
+    return report
+
+
+def server_environment(temp_dir, engine, latency):
+    environment = {
+        "PROMETHEUS_MULTIPROC_DIR": os.path.join(temp_dir, "metrics"),
+        "ADMISSION_DB_PATH": os.path.join(temp_dir, "admission.sqlite3"),
+        "JOB_DB_PATH": os.path.join(temp_dir, "jobs.sqlite3"),
+        # Under gunicorn too, uploads land in the run's directory and go with it
+        "UPLOAD_FOLDER": os.path.join(temp_dir, "uploads"),
+        "UPLOAD_INDEX_PATH": os.path.join(temp_dir, "uploads.sqlite3"),
+        "STUB_OCR_LATENCY_SECONDS": str(latency),
+    }
+    if engine:
+        environment["OCR_ENGINE"] = engine
+    return environment
+
+
+def in_process_server(environment, timeout):
+    # Settings are read at import, so the app is imported once the environment
+    # for this run is in place
+    os.environ.update(environment)
+    os.makedirs(environment["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    from werkzeug.serving import make_server
+
+    from src.web_app.app import flask_app
+
+    os.makedirs(environment["UPLOAD_FOLDER"])
+    flask_app.config["UPLOAD_FOLDER"] = environment["UPLOAD_FOLDER"]
+
+    port = free_port()
+    server = make_server("127.0.0.1", port, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    wait_for(f"http://127.0.0.1:{port}/cache/stats", timeout)
+    return f"http://127.0.0.1:{port}", server.shutdown
+
+
+def gunicorn_server(workers, environment, timeout):
+    port = free_port()
+    environment = dict(os.environ, **environment)
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-w",
+            str(workers),
+            "-b",
+            f"127.0.0.1:{port}",
+            "main:flask_app",
+        ],
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def stop():
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout)
+
+    try:
+        wait_for(f"http://127.0.0.1:{port}/cache/stats", timeout)
+    except Exception:
+        stop()
+        raise
+    return f"http://127.0.0.1:{port}", stop
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test of the upload and process flow of the web app, in "
+        "process or under gunicorn, with a stand-in OCR engine of fixed latency"
+    )
+    parser.add_argument("--mode", choices=(IN_PROCESS, GUNICORN), default=IN_PROCESS)
+    parser.add_argument("--flow", choices=tuple(FLOWS), default="process")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--distinct-pages",
+        type=int,
+        default=None,
+        help="pages are reused past this count, so the rest hit the result cache",
+    )
+    parser.add_argument(
+        "--engine",
+        default="stub",
+        help="OCR engine of the server, an empty value keeps OCR_ENGINE",
+    )
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--size", type=int, nargs=2, default=(800, 600))
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    width, height = args.size
+    pages = [
+        encode_page(generate_page(width, height, seed=seed))
+        for seed in range(args.distinct_pages or args.requests)
+    ]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        environment = server_environment(temp_dir, args.engine, args.latency)
+        if args.mode == GUNICORN:
+            base_url, stop = gunicorn_server(args.workers, environment, args.timeout)
+        else:
+            base_url, stop = in_process_server(environment, args.timeout)
+
+        try:
+            report = run_load(
+                base_url,
+                args.flow,
+                pages,
+                args.requests,
+                args.concurrency,
+                args.timeout,
+            )
+        finally:
+            stop()
+
+    for endpoint, result in report.items():
+        print(
+            f"{endpoint:>8}: {result['requests']:5d} requests, "
+            f"{result['rps']:7.1f} req/s, "
+            + ", ".join(
+                f"p{rank} {result[f'p{rank}_ms']:7.1f} ms" for rank in PERCENTILES
+            )
+            + f", errors {result['error_rate']:6.1%}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"mode": args.mode, "flow": args.flow, "endpoints": report},
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
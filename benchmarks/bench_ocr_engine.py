@@ -0,0 +1,67 @@
+import argparse
+import statistics
+import time
+
+from benchmarks.synthetic import encode_page, generate_page
+from src.text_extractor.app import TextExtractor
+from src.text_extractor.constants import Constants
+from src.text_extractor.engine import close_ocr_engines, get_ocr_engine
+
+ENGINES = (Constants.PYTESSERACT_ENGINE, Constants.TESSEROCR_ENGINE)
+
+
+def build_regions(count):
+    extractor = TextExtractor(in_memory=True)
+    page = encode_page(generate_page(800, 1100))
+    regions = extractor.draw_contours_and_crop_images(extractor.pre_process_image(page))
+    return (regions * (count // max(len(regions), 1) + 1))[:count]
+
+
+def bench_engine(name, regions):
+    start = time.perf_counter()
+    engine = get_ocr_engine(name)
+    startup = time.perf_counter() - start
+
+    latencies = []
+    for region in regions:
+        start = time.perf_counter()
+        engine.image_to_string(
+            region["image"],
+            Constants.JPN_LANGUAGE,
+            Constants.ENGINE_MODE,
+            region["segmentation"],
+        )
+        latencies.append(time.perf_counter() - start)
+
+    return startup, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-region OCR latency of one pytesseract call per region "
+        "against the persistent tesserocr pool"
+    )
+    parser.add_argument("--regions", type=int, default=50)
+    args = parser.parse_args()
+
+    regions = build_regions(args.regions)
+
+    for name in ENGINES:
+        try:
+            startup, latencies = bench_engine(name, regions)
+        except Exception as e:
+            print(f"{name:>12}: skipped ({e})")
+            continue
+        finally:
+            close_ocr_engines()
+
+        print(
+            f"{name:>12}: startup {startup * 1000:8.1f} ms, "
+            f"per region mean {statistics.mean(latencies) * 1000:8.1f} ms, "
+            f"p50 {statistics.median(latencies) * 1000:8.1f} ms, "
+            f"max {max(latencies) * 1000:8.1f} ms over {len(latencies)} regions"
+        )
+
+
+if __name__ == "__main__":
+    main()
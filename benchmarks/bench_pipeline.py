@@ -0,0 +1,225 @@
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import HORIZONTAL, VERTICAL, encode_page, generate_page
+from src.text_extractor.app import TextExtractor
+from src.text_extractor.constants import Constants
+from src.text_extractor.engine import get_ocr_engine, resolve_engine_name
+
+RESOLUTIONS = ((1240, 1754), (2480, 3508), (4960, 7016))
+DENSITIES = (0.3, 0.9)
+LAYOUTS = (HORIZONTAL, VERTICAL)
+STAGES = ("decode", "resize", "preprocess", "segmentation", "ocr", "normalize")
+
+
+def measure(stage_timings, stage_memory, name, function, *args):
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+
+    result = function(*args)
+
+    stage_timings[name].append(time.perf_counter() - start)
+    stage_memory[name] = max(
+        stage_memory[name], tracemalloc.get_traced_memory()[1] - current
+    )
+    return result
+
+
+def bench_page(page, extractor, repeat, run_ocr):
+    stage_timings = {stage: [] for stage in STAGES}
+    stage_memory = {stage: 0 for stage in STAGES}
+    regions = 0
+
+    for _ in range(repeat):
+        decoded = measure(
+            stage_timings, stage_memory, "decode", extractor.decode_image, page
+        )
+        scaled = measure(
+            stage_timings, stage_memory, "resize", extractor.scale_image, decoded
+        )
+        del decoded
+        binary = measure(
+            stage_timings, stage_memory, "preprocess", extractor.binarize_image, scaled
+        )
+        del scaled
+        cropped = measure(
+            stage_timings,
+            stage_memory,
+            "segmentation",
+            extractor.draw_contours_and_crop_images,
+            binary,
+        )
+        regions = len(cropped)
+
+        text_data = [""] * len(cropped)
+        if run_ocr:
+            text_data = measure(
+                stage_timings, stage_memory, "ocr", extractor.apply_ocr, cropped
+            )
+        measure(
+            stage_timings,
+            stage_memory,
+            "normalize",
+            extractor.normalize_text,
+            text_data,
+        )
+
+    # Best of the repeats is the least noisy estimate of each stage
+    seconds = {
+        stage: min(timings) if timings else None
+        for stage, timings in stage_timings.items()
+    }
+    return {
+        "regions": regions,
+        "seconds": seconds,
+        "peak_bytes": stage_memory,
+        "total_seconds": sum(value for value in seconds.values() if value),
+    }
+
+
+def ocr_available(engine_name):
+    try:
+        get_ocr_engine(engine_name).image_to_string(
+            np.full((32, 32), 255, dtype=np.uint8),
+            Constants.JPN_LANGUAGE,
+            Constants.ENGINE_MODE,
+            Constants.HORIZONTAL_SEGMENTATION_MODE,
+        )
+        return True
+    except Exception:
+        return False
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def compare(results, baseline, threshold):
+    previous = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+
+    for case in results["cases"]:
+        before = previous.get(case["name"])
+        if before is None:
+            continue
+        for stage, seconds in case["seconds"].items():
+            old = before["seconds"].get(stage)
+            if seconds and old and seconds > old * (1 + threshold):
+                regressions.append(
+                    f"{case['name']} {stage}: {old * 1000:.1f} ms -> "
+                    f"{seconds * 1000:.1f} ms"
+                )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time each TextExtractor stage on synthetic pages"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scaling", default=Constants.ADAPTIVE_SCALING)
+    parser.add_argument("--ocr-engine", default=None)
+    parser.add_argument("--skip-ocr", action="store_true")
+    parser.add_argument("--quick", action="store_true", help="smallest pages only")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results to check against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    run_ocr = not args.skip_ocr and ocr_available(args.ocr_engine)
+    if not run_ocr:
+        print("OCR stage skipped, no OCR engine is available")
+
+    extractor = TextExtractor(
+        in_memory=True,
+        scaling=args.scaling,
+        ocr_engine=args.ocr_engine,
+        cache_regions=False,
+    )
+    resolutions = RESOLUTIONS[:1] if args.quick else RESOLUTIONS
+    results = {
+        "environment": environment(),
+        "config": {
+            "scaling": args.scaling,
+            "ocr_engine": resolve_engine_name(args.ocr_engine) if run_ocr else None,
+            "repeat": args.repeat,
+        },
+        "cases": [],
+    }
+
+    tracemalloc.start()
+    for width, height in resolutions:
+        for density in DENSITIES:
+            for layout in LAYOUTS:
+                page = encode_page(
+                    generate_page(width, height, density=density, layout=layout)
+                )
+                case = bench_page(page, extractor, args.repeat, run_ocr)
+                case.update(
+                    name=f"{width}x{height}-{layout}-{density}",
+                    width=width,
+                    height=height,
+                    density=density,
+                    layout=layout,
+                    pages_per_second=1 / case["total_seconds"],
+                    megapixels_per_second=width * height / 1e6 / case["total_seconds"],
+                )
+                results["cases"].append(case)
+
+                stages = " ".join(
+                    f"{stage} {seconds * 1000:.0f}ms"
+                    for stage, seconds in case["seconds"].items()
+                    if seconds is not None
+                )
+                print(
+                    f"{case['name']:>28}: {case['pages_per_second']:6.2f} pages/s, "
+                    f"{case['megapixels_per_second']:6.2f} MP/s, "
+                    f"peak {max(case['peak_bytes'].values()) / 1024**2:7.1f} MB, "
+                    f"{case['regions']} regions | {stages}"
+                )
+    tracemalloc.stop()
+
+    results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import encode_page, generate_page
+
+MODES = ("legacy", "in_memory")
+SIZES = ((1240, 1754), (2480, 3508), (4960, 7016))
+
+
+def run_child(mode, path, repeat):
+    from src.text_extractor.app import TextExtractor
+
+    extractor = TextExtractor(in_memory=mode == "in_memory")
+    temp_dir = tempfile.gettempdir()
+    temp_files_before = len(os.listdir(temp_dir))
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extractor.pre_process_image(path)
+        timings.append(time.perf_counter() - start)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "mode": mode,
+        "best_seconds": min(timings),
+        "mean_seconds": sum(timings) / len(timings),
+        "peak_rss_delta_mb": (peak_kb - baseline_kb) / 1024,
+        "leaked_temp_files": len(os.listdir(temp_dir)) - temp_files_before,
+    }
+
+
+def run_mode(mode, path, repeat):
+    # Each mode runs in a fresh interpreter so peak RSS is not shared between them
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_preprocessing", "--child", mode, path]
+        + ["--repeat", str(repeat)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the temp file and in-memory preprocessing paths"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child[0], args.child[1], args.repeat)))
+        return
+
+    for width, height in SIZES:
+        with tempfile.NamedTemporaryFile(suffix=".png") as page_file:
+            page_file.write(encode_page(generate_page(width, height)))
+            page_file.flush()
+
+            for mode in MODES:
+                result = run_mode(mode, page_file.name, args.repeat)
+                print(
+                    f"{width}x{height} {mode:>9}: "
+                    f"best {result['best_seconds'] * 1000:8.1f} ms, "
+                    f"mean {result['mean_seconds'] * 1000:8.1f} ms, "
+                    f"peak rss +{result['peak_rss_delta_mb']:7.1f} MB, "
+                    f"temp files left {result['leaked_temp_files']}"
+                )
+
+
+if __name__ == "__main__":
+    main()
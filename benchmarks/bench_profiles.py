@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import time
+
+from benchmarks.bench_pipeline import ocr_available
+from benchmarks.synthetic import encode_page, generate_text_page
+from src.text_extractor.app import TextExtractor
+from src.text_extractor.constants import Constants
+from src.text_extractor.engine import resolve_engine_name
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "samples")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+
+# (name, generate_text_page options) of the generated set: a clean screenshot, a
+# grey scan with sensor noise, a faded low contrast print and small soft text
+SYNTHETIC_SAMPLES = (
+    ("screenshot", {}),
+    ("scan", {"background": 210, "ink": 50, "noise": 18, "blur": 0.8}),
+    ("faded", {"background": 190, "ink": 120, "noise": 6}),
+    ("small", {"font_size": 14, "noise": 10, "blur": 0.6}),
+)
+
+
+def load_samples(directory):
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        truth_path = os.path.join(directory, f"{stem}.txt")
+        if extension.lower() not in IMAGE_EXTENSIONS or not os.path.exists(truth_path):
+            continue
+
+        with open(os.path.join(directory, name), "rb") as file:
+            image = file.read()
+        with open(truth_path, encoding="utf-8") as file:
+            truth = file.read()
+        samples.append((name, image, truth))
+
+    return samples
+
+
+def synthetic_samples(pages_per_kind=3):
+    # Same seeds, same pages: runs on different hosts compare like for like
+    samples = []
+    for name, options in SYNTHETIC_SAMPLES:
+        for seed in range(pages_per_kind):
+            page, truth = generate_text_page(seed=seed, **options)
+            samples.append((f"{name}-{seed}.png", encode_page(page), truth))
+    return samples
+
+
+def strip_whitespace(text):
+    return "".join(text.split())
+
+
+def edit_distance(first, second):
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (first_char != second_char),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def bench(profile, samples, scaling, with_ocr):
+    # Regions cached by an earlier profile would skip OCR for the later ones
+    extractor = TextExtractor(
+        in_memory=True, scaling=scaling, profile=profile, cache_regions=False
+    )
+    preprocess_seconds = []
+    total_seconds = []
+    errors = characters = 0
+
+    for _, image, truth in samples:
+        start = time.perf_counter()
+        extractor.pre_process_image(image)
+        preprocess_seconds.append(time.perf_counter() - start)
+        if not with_ocr:
+            continue
+
+        start = time.perf_counter()
+        text = extractor.run(image) or ""
+        total_seconds.append(time.perf_counter() - start)
+
+        truth = strip_whitespace(truth)
+        errors += edit_distance(strip_whitespace(text), truth)
+        characters += len(truth)
+
+    result = {
+        "profile": profile,
+        "pages": len(samples),
+        "preprocess_ms": sum(preprocess_seconds) / len(samples) * 1000,
+    }
+    if with_ocr:
+        result["total_ms"] = sum(total_seconds) / len(samples) * 1000
+        result["character_accuracy"] = max(0.0, 1 - errors / max(characters, 1))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency and character accuracy of each preprocessing profile "
+        "on a local sample set, where every image needs a <name>.txt transcription, "
+        "or on a generated one"
+    )
+    parser.add_argument("--samples", default=SAMPLES_DIR)
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="use the generated sample set, the default when --samples has none",
+    )
+    parser.add_argument("--scaling", default=Constants.ADAPTIVE_SCALING)
+    parser.add_argument("--skip-ocr", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    samples = []
+    if not args.synthetic and os.path.isdir(args.samples):
+        samples = load_samples(args.samples)
+    if not samples:
+        print(f"Using the generated sample set, no local samples in {args.samples}")
+        samples = synthetic_samples()
+
+    with_ocr = not args.skip_ocr and ocr_available(resolve_engine_name(None))
+    if not with_ocr:
+        print("OCR is skipped, only preprocessing latency is reported")
+
+    results = [
+        bench(profile, samples, args.scaling, with_ocr)
+        for profile in Constants.PROFILES
+    ]
+    for result in results:
+        line = f"{result['profile']:>8}: preprocess {result['preprocess_ms']:8.1f} ms"
+        if with_ocr:
+            line += (
+                f", total {result['total_ms']:8.1f} ms, "
+                f"character accuracy {result['character_accuracy']:6.1%}"
+            )
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import time
+
+from benchmarks.synthetic import encode_page, generate_page
+from src.text_extractor.app import TextExtractor
+from src.text_extractor.constants import Constants
+
+# (width, height, glyph size) of typical inputs
+PAGES = (
+    (1240, 1754, 14),
+    (2480, 3508, 40),
+    (4000, 3000, 64),
+    (800, 12000, 24),
+)
+
+
+def bench(scaling, page, repeat):
+    extractor = TextExtractor(in_memory=True, scaling=scaling)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        processed = extractor.pre_process_image(page)
+        extractor.draw_contours_and_crop_images(processed)
+        timings.append(time.perf_counter() - start)
+    return processed.size, extractor.scale_factor, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pixels processed and latency of the fixed 2x upscale "
+        "against adaptive glyph-size scaling"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for width, height, glyph in PAGES:
+        page = encode_page(generate_page(width, height, glyph_size=glyph))
+
+        for scaling in (Constants.FIXED_SCALING, Constants.ADAPTIVE_SCALING):
+            pixels, scale, seconds = bench(scaling, page, args.repeat)
+            print(
+                f"{width}x{height} glyph {glyph:>3}px {scaling:>8}: "
+                f"scale {scale:4.2f}, {pixels / 1e6:7.1f} MP processed, "
+                f"{seconds * 1000:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.synthetic import encode_page, generate_page
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import src.web_app.app
+{eager}
+print(time.perf_counter() - start)
+"""
+
+EAGER_IMPORT = "import src.text_extractor.app"
+
+# (name, GUNICORN_PRELOAD, WARM_UP_AFTER_FORK)
+MODES = (
+    ("lazy", "false", "false"),
+    ("preload", "true", "false"),
+    ("preload + warm up", "true", "true"),
+)
+
+
+def import_seconds(eager):
+    script = IMPORT_SCRIPT.format(eager=EAGER_IMPORT if eager else "")
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout, data=None):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            request = urllib.request.Request(url, data=data)
+            if data is not None:
+                request.add_header("Content-Type", "image/png")
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                return
+        except (urllib.error.URLError, ConnectionError):
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+def first_requests(preload, warm_up, workers, page, timeout):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = dict(
+            os.environ,
+            GUNICORN_PRELOAD=preload,
+            WARM_UP_AFTER_FORK=warm_up,
+            PROMETHEUS_MULTIPROC_DIR=os.path.join(temp_dir, "metrics"),
+            ADMISSION_DB_PATH=os.path.join(temp_dir, "admission.sqlite3"),
+            JOB_DB_PATH=os.path.join(temp_dir, "jobs.sqlite3"),
+            UPLOAD_INDEX_PATH=os.path.join(temp_dir, "uploads.sqlite3"),
+        )
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "-w",
+                str(workers),
+                "-b",
+                f"127.0.0.1:{port}",
+                "main:flask_app",
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for(f"{base_url}/cache/stats", timeout)
+            first_request = time.perf_counter() - start
+
+            extract_start = time.perf_counter()
+            wait_for(f"{base_url}/extract", timeout, data=page)
+            first_extract = time.perf_counter() - extract_start
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout)
+
+    return first_request, first_extract
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import time of the web app and time to first request of a "
+        "gunicorn server, with and without preloading and warm up after fork"
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    for eager in (False, True):
+        seconds = min(import_seconds(eager) for _ in range(args.repeat))
+        label = "app + extractor" if eager else "app"
+        print(f"import {label:>15}: {seconds * 1000:8.1f} ms")
+
+    page = encode_page(generate_page(800, 600))
+    for name, preload, warm_up in MODES:
+        results = [
+            first_requests(preload, warm_up, args.workers, page, args.timeout)
+            for _ in range(args.repeat)
+        ]
+        first_request = min(result[0] for result in results)
+        first_extract = min(result[1] for result in results)
+        print(
+            f"{name:>17}: first request {first_request * 1000:8.1f} ms, "
+            f"first /extract {first_extract * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.synthetic import VERTICAL, generate_page
+from src.text_extractor.app import TextExtractor
+
+# (width, height, layout) of webtoon strips and double-page scans
+PAGES = (
+    (800, 12000, VERTICAL),
+    (800, 30000, VERTICAL),
+    (9900, 7000, VERTICAL),
+)
+
+TILE_SIZES = (None, 4096, 2048, 1024)
+
+
+def skip_ocr(regions):
+    return [""] * len(regions), 0
+
+
+def bench(page, tile_size):
+    extractor = TextExtractor(tile_size=tile_size)
+    extractor.recognize_regions = skip_ocr
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if extractor.is_tiled(page):
+        extractor.extract_tiled(page)
+    else:
+        processed = extractor.binarize_image(extractor.scale_image(page))
+        extractor.apply_ocr(extractor.draw_contours_and_crop_images(processed))
+        del processed
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return seconds, peak, extractor.region_stats["regions"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Peak memory and latency of whole-frame processing against "
+        "tiled processing of very tall and very large pages, OCR excluded"
+    )
+    parser.parse_args()
+
+    for width, height, layout in PAGES:
+        page = generate_page(width, height, layout=layout)
+
+        for tile_size in TILE_SIZES:
+            seconds, peak, regions = bench(page, tile_size)
+            print(
+                f"{width}x{height} tile {str(tile_size or 'off'):>5}: "
+                f"{seconds * 1000:8.1f} ms, peak {peak / 2**20:8.1f} MiB, "
+                f"{regions} regions"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import string
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+HORIZONTAL = "horizontal"
+VERTICAL = "vertical"
+
+
+def generate_page(width, height, glyph_size=24, density=0.7, layout=HORIZONTAL, seed=0):
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 235, dtype=np.uint8)
+
+    pitch = int(glyph_size * 1.1)
+    line_pitch = int(glyph_size * 1.8)
+    margin = glyph_size * 2
+
+    # Lines run left to right for horizontal text and top to bottom for vertical
+    # text. Density is the share of lines that carry text, the rest are blank
+    # paragraph breaks, and lines end at random lengths like real paragraphs
+    if layout == VERTICAL:
+        line_starts = range(width - margin - glyph_size, margin, -line_pitch)
+        line_length = height - 2 * margin
+    else:
+        line_starts = range(margin, height - margin - glyph_size, line_pitch)
+        line_length = width - 2 * margin
+
+    for line_start in line_starts:
+        if rng.random() > density:
+            continue
+
+        glyphs = int(line_length * rng.uniform(0.5, 1.0)) // pitch
+        for index in range(glyphs):
+            offset = margin + index * pitch
+            if layout == VERTICAL:
+                draw_glyph(page, line_start, offset, glyph_size, rng)
+            else:
+                draw_glyph(page, offset, line_start, glyph_size, rng)
+
+    return page
+
+
+def draw_glyph(page, x, y, size, rng):
+    # A handful of random strokes inside a square cell looks enough like a kanji
+    # to exercise the same thresholding and contour code paths
+    thickness = max(1, size // 12)
+    for _ in range(rng.integers(3, 7)):
+        x1, x2 = x + rng.integers(0, size, 2)
+        y1, y2 = y + rng.integers(0, size, 2)
+        cv2.line(page, (int(x1), int(y1)), (int(x2), int(y2)), (25, 25, 25), thickness)
+
+
+def generate_text_page(
+    lines=6,
+    font_size=28,
+    background=255,
+    ink=0,
+    noise=0.0,
+    blur=0,
+    seed=0,
+):
+    # Pages of real characters with a known transcription, for accuracy checks.
+    # No Japanese font ships with Pillow, so the lines are made of the digits and
+    # capitals its default font draws
+    rng = np.random.default_rng(seed)
+    characters = np.array(list(string.ascii_uppercase + string.digits))
+    font = ImageFont.load_default(size=font_size)
+
+    text = [
+        " ".join(
+            "".join(rng.choice(characters, rng.integers(3, 8)))
+            for _ in range(rng.integers(3, 6))
+        )
+        for _ in range(lines)
+    ]
+
+    line_pitch = int(font_size * 1.8)
+    width = font_size * 24
+    height = line_pitch * (lines + 2)
+    image = Image.new("L", (width, height), background)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(text):
+        draw.text((font_size, line_pitch * (index + 1)), line, fill=ink, font=font)
+
+    page = np.asarray(image, dtype=np.float32)
+    if blur:
+        page = cv2.GaussianBlur(page, (0, 0), blur)
+    if noise:
+        page += rng.normal(0, noise, page.shape)
+    page = np.clip(page, 0, 255).astype(np.uint8)
+
+    return cv2.cvtColor(page, cv2.COLOR_GRAY2BGR), "\n".join(text) + "\n"
+
+
+def encode_page(page, extension=".png"):
+    success, buffer = cv2.imencode(extension, page)
+    if not success:
+        raise ValueError("Synthetic page could not be encoded")
+    return buffer.tobytes()
@@ -0,0 +1,37 @@
+import os
+import shutil
+
+# prometheus_client picks its multiprocess storage at import time, so the
+# directory has to be in the environment before the app is loaded
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/japanese-extractor-metrics"
+)
+
+# A preloaded app is imported before on_starting runs
+os.makedirs(multiproc_dir, exist_ok=True)
+
+# The app starts no threads and opens no pools or connections at import, so workers
+# can be forked from a preloaded app
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def on_starting(server):
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    from src import settings
+
+    # The heavy imports run in each worker, in the background, so a worker answers
+    # requests that do not need the extractor as soon as it is forked
+    if settings.WARM_UP_AFTER_FORK:
+        from src.web_app.app import warm_up
+
+        warm_up()
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src import settings
+from src.logger import get_logger
+from src.text_extractor.cache import ResultCache
+from src.text_extractor.constants import Constants, is_image_name
+from src.text_extractor.engine import available_cpus
+
+logger = get_logger(__name__)
+
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+_extractor = None
+_finished = {}
+
+
+def iter_images(input_dir):
+    for root, directories, files in os.walk(input_dir):
+        directories.sort()
+        for name in sorted(files):
+            if is_image_name(name):
+                yield os.path.relpath(os.path.join(root, name), input_dir)
+
+
+def output_path_for(output_dir, relative_path):
+    return os.path.join(output_dir, f"{relative_path}.txt")
+
+
+def load_manifest(manifest_path):
+    # Every output finished for a key is kept, as images with the same content
+    # each get their own. Only the last record of an output counts, so a failure
+    # followed by a retry that succeeded is finished
+    finished = {}
+    if not os.path.exists(manifest_path):
+        return finished
+
+    with open(manifest_path, encoding="utf-8") as manifest:
+        for line in manifest:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of an interrupted run can be cut short
+                continue
+            outputs = finished.setdefault(record["key"], set())
+            if record["status"] in (DONE, SKIPPED):
+                outputs.add(record["output"])
+            else:
+                outputs.discard(record["output"])
+            if not outputs:
+                del finished[record["key"]]
+
+    return finished
+
+
+def manifest_ends_with_newline(manifest_path):
+    with open(manifest_path, "rb") as manifest:
+        manifest.seek(-1, os.SEEK_END)
+        return manifest.read(1) == b"\n"
+
+
+def init_worker(options, finished):
+    global _extractor, _finished
+    from src.text_extractor.app import TextExtractor
+
+    # Pages are spread over processes, so each one keeps OCR to a single thread
+    # and a single model per language
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    settings.OCR_POOL_SIZE = 1
+    _extractor = TextExtractor(in_memory=True, ocr_workers=1, **options)
+    _finished = finished
+
+
+def process_image(input_dir, output_dir, relative_path):
+    start = time.perf_counter()
+    output_path = output_path_for(output_dir, relative_path)
+    record = {"path": relative_path, "output": output_path}
+
+    try:
+        with open(os.path.join(input_dir, relative_path), "rb") as file:
+            data = file.read()
+        record["key"] = ResultCache.make_key(data, _extractor.cache_config())
+
+        finished_outputs = [
+            path for path in _finished.get(record["key"], ()) if os.path.exists(path)
+        ]
+        if output_path in finished_outputs:
+            # A rerun over the same tree
+            record["status"] = SKIPPED
+        elif finished_outputs:
+            # Same content under another name
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            shutil.copyfile(finished_outputs[0], output_path)
+            record["status"] = SKIPPED
+        else:
+            text = _extractor.run(data)
+            if text is False:
+                raise RuntimeError("Text extraction failed")
+            _extractor.save_text_to_file(text, output_path)
+            record["status"] = DONE
+
+    except Exception as e:
+        logger.error(f"Error when processing {relative_path}: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        record.setdefault("key", None)
+        record["status"] = FAILED
+        record["message"] = str(e)
+
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def run_batch(input_dir, output_dir, manifest_path=None, workers=None, **options):
+    manifest_path = manifest_path or os.path.join(output_dir, "manifest.jsonl")
+    workers = workers or available_cpus()
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+
+    finished = load_manifest(manifest_path)
+    paths = list(iter_images(input_dir))
+    counts = {DONE: 0, SKIPPED: 0, FAILED: 0}
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        # Records never share a line with what an interrupted run cut short
+        if manifest.tell() and not manifest_ends_with_newline(manifest_path):
+            manifest.write("\n")
+
+        def record(result):
+            # One line per image as soon as it finishes, so an interrupted run
+            # resumes from the last completed page. Reruns over finished pages
+            # add nothing
+            if result["output"] not in finished.get(result["key"], ()):
+                manifest.write(json.dumps(result, ensure_ascii=False) + "\n")
+                manifest.flush()
+            counts[result["status"]] += 1
+
+        if workers == 1:
+            init_worker(options, finished)
+            for relative_path in paths:
+                record(process_image(input_dir, output_dir, relative_path))
+            return counts
+
+        with ProcessPoolExecutor(
+            workers, initializer=init_worker, initargs=(options, finished)
+        ) as executor:
+            futures = [
+                executor.submit(process_image, input_dir, output_dir, relative_path)
+                for relative_path in paths
+            ]
+            try:
+                for future in as_completed(futures):
+                    record(future.result())
+            except BaseException:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract the text of every image under a directory tree. Progress "
+        "is recorded in a manifest, so an interrupted run resumes where it stopped."
+    )
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument(
+        "--manifest", help="defaults to manifest.jsonl in the output directory"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="processes, defaults to the available cores"
+    )
+    parser.add_argument(
+        "--profile", choices=Constants.PROFILES, default=settings.PREPROCESSING_PROFILE
+    )
+    parser.add_argument(
+        "--scaling",
+        choices=(Constants.FIXED_SCALING, Constants.ADAPTIVE_SCALING),
+        default=settings.SCALING,
+    )
+    parser.add_argument("--language", default=Constants.JPN_LANGUAGE)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"{args.input_dir} is not a directory")
+
+    start = time.perf_counter()
+    try:
+        counts = run_batch(
+            args.input_dir,
+            args.output_dir,
+            manifest_path=args.manifest,
+            workers=args.workers,
+            language=args.language,
+            profile=args.profile,
+            scaling=args.scaling,
+            tile_size=settings.TILE_SIZE,
+            tile_overlap=settings.TILE_OVERLAP,
+        )
+    except KeyboardInterrupt:
+        print("Interrupted, run the same command again to resume")
+        return 130
+
+    elapsed = time.perf_counter() - start
+    processed = counts[DONE] + counts[FAILED]
+    print(
+        f"{counts[DONE]} done, {counts[SKIPPED]} already done, "
+        f"{counts[FAILED]} failed in {elapsed:.1f} s "
+        f"({processed / elapsed if elapsed else 0:.2f} pages/s)"
+    )
+    return 1 if counts[FAILED] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
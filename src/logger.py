@@ -1,12 +1,14 @@
+import os
 import logging
 from src import settings
 
 log_file = f"{settings.BASE_DIR}/src/logs/app.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s: %(message)s",
-    handlers=[logging.FileHandler(log_file), logging.StreamHandler()],
+    handlers=[logging.FileHandler(log_file, delay=True), logging.StreamHandler()],
 )
 
 
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -10,6 +11,55 @@ class Settings(BaseSettings):
         alias="GITHUB_WORKSPACE",
     )
 
+    OCR_ENGINE: str = "auto"
+    OCR_POOL_SIZE: Optional[int] = None
+    OCR_WORKERS: Optional[int] = None
+    OCR_OMP_THREADS: int = 1
+    STUB_OCR_LATENCY_SECONDS: float = 0.05
+
+    RESULT_CACHE_SIZE: int = 256
+    RESULT_CACHE_DIR: Optional[str] = None
+    RESULT_CACHE_DISK_MAX_ENTRIES: int = 10000
+    REGION_CACHE_SIZE: int = 4096
+    FRAME_CACHE_MAX_BYTES: int = 256 * 1024**2
+    FRAME_CACHE_TTL_SECONDS: float = 120
+    SCALING: str = "adaptive"
+    PREPROCESSING_PROFILE: str = "quality"
+    TILE_SIZE: Optional[int] = None
+    TILE_OVERLAP: int = 256
+    TRACE_DIR: Optional[str] = None
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_SLOW_SECONDS: Optional[float] = None
+    TRACE_MAX_ENTRIES: int = 100
+
+    JOB_STORE: str = "sqlite"
+    JOB_DB_PATH: Optional[str] = None
+    JOB_WORKERS: int = 2
+    JOB_RETENTION_SECONDS: int = 3600
+    JOB_MAX_WAIT_SECONDS: int = 30
+
+    EXTRACT_MAX_BYTES: int = 20 * 1024**2
+    SPOOL_THRESHOLD_BYTES: int = 4 * 1024**2
+    BATCH_MAX_BYTES: int = 1024**3
+    BATCH_WORKERS: int = 2
+
+    ADMISSION_DB_PATH: Optional[str] = None
+    ADMISSION_BUDGET_BYTES: int = 2 * 1024**3
+    ADMISSION_MAX_WAIT_SECONDS: float = 10
+    ADMISSION_RETRY_AFTER_SECONDS: int = 5
+    WARM_UP_AFTER_FORK: bool = True
+    UPLOAD_FOLDER: Optional[str] = None
+    UPLOAD_INDEX_PATH: Optional[str] = None
+    UPLOAD_TTL_SECONDS: int = 600
+    UPLOAD_QUOTA_BYTES: int = 1024**3
+    UPLOAD_SWEEP_INTERVAL_SECONDS: float = 30
+    UPLOAD_SWEEP_BATCH_SIZE: int = 1000
+    UPLOAD_STORAGE: str = "local"
+    UPLOAD_SHARED_DIR: Optional[str] = None
+    UPLOAD_CACHE_DIR: Optional[str] = None
+    UPLOAD_CACHE_MAX_BYTES: int = 512 * 1024**2
+    TESSDATA_PATH: Optional[str] = None
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,19 +1,53 @@
+import io
 import os
 import re
 import cv2
+import time
+import hashlib
 import traceback
-import pytesseract
 import numpy as np
 import tempfile
-import imutils
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
 
 from src import settings
 from src.logger import get_logger
+from src.text_extractor.cache import FrameCache, LRUCache
 from src.text_extractor.constants import Constants
+from src.text_extractor.scaling import (
+    compute_scale,
+    estimate_glyph_height,
+    resize_to_scale,
+)
+from src.text_extractor.layout import (
+    VERTICAL,
+    analyze_layout,
+    block_direction,
+    corners_touch,
+    corners_union,
+    filter_boxes,
+    glyph_size,
+    page_direction,
+    reading_order,
+)
+from src.text_extractor.engine import (
+    default_ocr_workers,
+    get_ocr_engine,
+    resolve_engine_name,
+)
+from src.text_extractor.tracing import tracer as default_tracer
 
 logger = get_logger(__name__)
 
+region_cache = LRUCache(settings.REGION_CACHE_SIZE)
+frame_cache = FrameCache(
+    settings.FRAME_CACHE_MAX_BYTES, settings.FRAME_CACHE_TTL_SECONDS
+)
+
+SHARPEN_KERNEL = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+
 
 class TextExtractor:
 
@@ -22,16 +56,98 @@ class TextExtractor:
         language=Constants.JPN_LANGUAGE,
         vertical_language=Constants.JPN_VERT_LANGUAGE,
         engine_mode=Constants.ENGINE_MODE,
+        in_memory=False,
+        scaling=Constants.FIXED_SCALING,
+        profile=Constants.QUALITY_PROFILE,
+        ocr_engine=None,
+        ocr_workers=None,
+        cache_regions=True,
+        tile_size=None,
+        tile_overlap=Constants.TILE_OVERLAP,
+        tracer=None,
         debug=False,
     ):
+        if profile not in Constants.PROFILES:
+            raise ValueError(f"Unknown preprocessing profile: {profile}")
+        if scaling not in (Constants.FIXED_SCALING, Constants.ADAPTIVE_SCALING):
+            raise ValueError(f"Unknown scaling mode: {scaling}")
+
         self.output_file_path = (
             f"{settings.BASE_DIR}/src/text_extractor/output/recognized.txt"
         )
         self.language = language
         self.vertical_language = vertical_language
         self.engine_mode = engine_mode
+        self.in_memory = in_memory
+        self.scaling = scaling
+        self.scale_factor = None
+        self.profile = profile
+        self.ocr_engine = ocr_engine
+        self.ocr_workers = ocr_workers or settings.OCR_WORKERS or default_ocr_workers()
+        self.cache_regions = cache_regions
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.region_stats = None
+        self.timings = {}
+        self.tracer = tracer or default_tracer
+        self.trace = None
         self.debug = debug
 
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Tiled runs go through every stage once per band
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            if self.trace is not None:
+                self.trace.add_span(name, start, elapsed)
+
+    @contextmanager
+    def traced(self, name):
+        self.region_stats = None
+        self.trace = self.tracer.start_trace(name)
+        self.trace.set(profile=self.profile, scaling=self.scaling)
+        try:
+            yield self.trace
+        except Exception as e:
+            self.trace.set(error=str(e))
+            raise
+        finally:
+            if self.region_stats:
+                self.trace.set(
+                    regions=self.region_stats["regions"],
+                    region_cache_hits=self.region_stats["hits"],
+                )
+            self.tracer.finish(self.trace)
+            self.trace = None
+
+    def keep_artifacts(self, pre_processed_img, cropped_images):
+        if self.trace is None:
+            return
+
+        # The overlay is drawn from the boxes alone, after the request
+        boxes = [{"box": region["box"]} for region in cropped_images]
+        self.trace.keep("preprocessed", pre_processed_img)
+        self.trace.keep("regions", lambda: self.draw_regions(pre_processed_img, boxes))
+
+    def cache_config(self):
+        # The engine is part of the key, so a stand-in engine's output is never
+        # served as recognized text
+        return {
+            "ocr_engine": resolve_engine_name(self.ocr_engine),
+            "language": self.language,
+            "vertical_language": self.vertical_language,
+            "engine_mode": self.engine_mode,
+            "in_memory": self.in_memory,
+            "scaling": self.scaling,
+            "profile": self.profile,
+            "tile_size": self.tile_size,
+            "tile_overlap": self.tile_overlap,
+        }
+
     def load_image(self, input_file):
         absolute_path = os.path.abspath(input_file)
         image = cv2.imread(absolute_path, cv2.IMREAD_COLOR)
@@ -39,6 +155,116 @@ class TextExtractor:
             raise FileNotFoundError(f"Image not found at {input_file}")
         return image
 
+    def check_profile(self):
+        if self.profile not in Constants.PROFILES:
+            raise ValueError(f"Unknown preprocessing profile: {self.profile}")
+
+    def decode_flags(self):
+        self.check_profile()
+
+        # Only the quality profile looks at colour, the others decode straight to
+        # grayscale and scale and filter a single channel
+        if self.profile == Constants.QUALITY_PROFILE:
+            return cv2.IMREAD_COLOR
+        return cv2.IMREAD_GRAYSCALE
+
+    def decode_image(self, input_file):
+        if isinstance(input_file, (bytes, bytearray, memoryview)):
+            buffer = np.frombuffer(input_file, dtype=np.uint8)
+        elif hasattr(input_file, "read"):
+            buffer = np.frombuffer(input_file.read(), dtype=np.uint8)
+        else:
+            absolute_path = os.path.abspath(input_file)
+            if not os.path.exists(absolute_path):
+                raise FileNotFoundError(f"Image not found at {input_file}")
+            buffer = np.fromfile(absolute_path, dtype=np.uint8)
+
+        image = cv2.imdecode(buffer, self.decode_flags())
+        if image is None:
+            raise ValueError("The image could not be decoded")
+        return image
+
+    def decode_cached(self, input_file):
+        if not isinstance(input_file, (str, os.PathLike)):
+            return self.decode_image(input_file)
+
+        # Crops of one upload tend to come in a row, a replaced file gets a new key
+        absolute_path = os.path.abspath(input_file)
+        stat = os.stat(absolute_path)
+        key = (absolute_path, stat.st_mtime_ns, stat.st_size, self.decode_flags())
+
+        frame = frame_cache.get(key)
+        if frame is None:
+            frame = self.decode_image(absolute_path)
+            frame.flags.writeable = False
+            frame_cache.set(key, frame)
+        return frame
+
+    def crop_roi(self, frame, roi):
+        x, y, width, height = roi
+        frame_height, frame_width = frame.shape[:2]
+        left, top = max(x, 0), max(y, 0)
+        right = min(x + width, frame_width)
+        bottom = min(y + height, frame_height)
+        if right <= left or bottom <= top:
+            raise ValueError(f"The region of interest {list(roi)} is outside the image")
+
+        # The later stages work in place and the cached frame must stay intact
+        return frame[top:bottom, left:right].copy()
+
+    def iter_frames(self, input_file):
+        if isinstance(input_file, (bytes, bytearray, memoryview)):
+            input_file = io.BytesIO(input_file)
+
+        # PIL decodes a frame only when it is seeked to, so a multi-page TIFF is
+        # never held in memory as a whole
+        with Image.open(input_file) as image:
+            for index in range(getattr(image, "n_frames", 1)):
+                image.seek(index)
+                if self.decode_flags() == cv2.IMREAD_GRAYSCALE:
+                    yield np.asarray(image.convert("L"))
+                else:
+                    frame = np.asarray(image.convert("RGB"))
+                    yield cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+
+    def upscale_image(self, image):
+        return cv2.resize(
+            image,
+            None,
+            fx=Constants.FIXED_SCALE,
+            fy=Constants.FIXED_SCALE,
+            interpolation=cv2.INTER_LANCZOS4,
+        )
+
+    def choose_scale(self, image):
+        if self.scaling == Constants.FIXED_SCALING:
+            return None
+
+        if self.scaling != Constants.ADAPTIVE_SCALING:
+            raise ValueError(f"Unknown scaling mode: {self.scaling}")
+
+        glyph_height = estimate_glyph_height(image)
+        return compute_scale(
+            glyph_height,
+            Constants.TARGET_GLYPH_HEIGHT,
+            Constants.MIN_SCALE,
+            Constants.MAX_SCALE,
+        )
+
+    def apply_scale(self, image, scale):
+        # Without enough glyphs to measure, fall back to the fixed upscale
+        if scale is None:
+            self.scale_factor = Constants.FIXED_SCALE
+            return self.upscale_image(image)
+
+        self.scale_factor = scale
+        scaled = resize_to_scale(image, scale)
+        # Binarization works in place, it must never get the decoded frame itself
+        return scaled.copy() if scaled is image else scaled
+
+    def scale_image(self, image):
+        return self.apply_scale(image, self.choose_scale(image))
+
     def resize_image(self, image):
         img = Image.open(image)
 
@@ -56,21 +282,28 @@ class TextExtractor:
 
     def pre_process_image(self, image):
 
+        # The temp-file chain is the quality profile with the fixed upscale, any
+        # other profile or scaling only exists in memory
+        if (
+            self.in_memory
+            or self.profile != Constants.QUALITY_PROFILE
+            or self.scaling != Constants.FIXED_SCALING
+        ):
+            return self.pre_process_in_memory(image)
+
         resized_img = self.resize_image(image)
         processed_image = self.load_image(resized_img)
+        if os.path.exists(resized_img):
+            os.remove(resized_img)
 
         # Normalize the image
-        img_shape = np.zeros((processed_image.shape[0], processed_image.shape[1]))
-        processed_image = cv2.normalize(
-            processed_image, img_shape, 0, 255, cv2.NORM_MINMAX
-        )
+        processed_image = cv2.normalize(processed_image, None, 0, 255, cv2.NORM_MINMAX)
 
         # Convert to grayscale
         processed_image = cv2.cvtColor(processed_image, cv2.COLOR_BGR2GRAY)
 
         # Apply Sharpeninng
-        kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-        processed_image = cv2.filter2D(processed_image, -1, kernel)
+        processed_image = cv2.filter2D(processed_image, -1, SHARPEN_KERNEL)
 
         # Apply Gaussian blur
         processed_image = cv2.GaussianBlur(processed_image, (7, 7), 0)
@@ -82,66 +315,213 @@ class TextExtractor:
 
         return processed_image
 
+    def pre_process_in_memory(self, input_file):
+        return self.binarize_image(self.scale_image(self.decode_image(input_file)))
+
+    def binarize_image(self, image):
+        self.check_profile()
+
+        if self.profile == Constants.QUALITY_PROFILE:
+            return self.binarize_quality(image)
+
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        # Sharpening and then blurring mostly cancel each other out, a single light
+        # blur keeps the noise suppression for half the passes
+        if self.profile == Constants.BALANCED_PROFILE:
+            cv2.GaussianBlur(image, (5, 5), 0, dst=image)
+
+        # Otsu picks its threshold from the histogram, a min-max stretch before it
+        # does not change the result
+        cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=image)
+
+        return image
+
+    def binarize_quality(self, image):
+
+        # Normalize the image in place
+        cv2.normalize(image, image, 0, 255, cv2.NORM_MINMAX)
+
+        # Convert to grayscale, from here on only two single channel buffers are used
+        processed_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        del image
+        scratch = np.empty_like(processed_image)
+
+        # Apply Sharpeninng
+        cv2.filter2D(processed_image, -1, SHARPEN_KERNEL, dst=scratch)
+
+        # Apply Gaussian blur
+        cv2.GaussianBlur(scratch, (7, 7), 0, dst=processed_image)
+
+        # Apply Otsu thresholding
+        cv2.threshold(
+            processed_image,
+            0,
+            255,
+            cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+            dst=processed_image,
+        )
+
+        return processed_image
+
     def draw_contours_and_crop_images(self, image):
 
         images = []
         min_area = 100
         min_aspect_ratio = 0.1
+        height, width = image.shape[:2]
+
+        # Text is dark after thresholding, so the glyphs are the components of the
+        # inverted image. Their boxes come back as one array, no per-contour loop
+        ink = cv2.bitwise_not(image)
+        stats = cv2.connectedComponentsWithStats(ink, connectivity=8)[2]
+
+        boxes = filter_boxes(
+            stats[1:, :4],
+            min_area,
+            min_aspect_ratio,
+            max_size=(width // 2, height // 2),
+        )
+        regions, directions = analyze_layout(ink, boxes)
+        size = glyph_size(boxes)
+        padding = max(2, size // 5)
 
-        contours = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        contours = imutils.grab_contours(contours)
-
-        for cnt in contours:
-            x, y, w, h = cv2.boundingRect(cnt)
-
-            # Check if the contour is valid
-            if not w * h > min_area and not w / h > min_aspect_ratio:
-                continue
+        for (x, y, w, h), direction in zip(regions, directions):
 
             image_data = {
                 "image": None,
-                "segmentation": Constants.HORIZONTAL_SEGMENTATION_MODE,
+                "box": (int(x), int(y), int(w), int(h)),
+                # Glyphs about this far apart are merged into one block
+                "gap": size,
             }
+            self.orient_region(image_data, direction)
 
-            # Check if the text is vertical
-            if h > w:
-                image_data["segmentation"] = Constants.VERTICAL_SEGMENTATION_MODE
-
-            # draw contours and crop the image
-            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            cv2.circle(image, (x, y), 8, (255, 255, 0), 8)
-            cropped = image[y : y + h, x : x + w]
-            image_data["image"] = cropped
+            # Crop from the untouched image so boxes never leak into other crops
+            image_data["image"] = self.crop_region(image, (x, y, w, h), padding)
 
             images.append(image_data)
 
         return images
 
-    def apply_ocr(self, cropped_images):
+    def orient_region(self, image_data, direction):
+        image_data["direction"] = direction
+        image_data["segmentation"] = Constants.HORIZONTAL_SEGMENTATION_MODE
+        image_data["language"] = self.language
+
+        # Vertical blocks are read whole by the vertical model, column by column
+        if direction == VERTICAL:
+            image_data["segmentation"] = Constants.VERTICAL_SEGMENTATION_MODE
+            image_data["language"] = self.vertical_language
+
+    def crop_region(self, image, box, padding):
+        x, y, w, h = box
+        return image[
+            max(y - padding, 0) : y + h + padding,
+            max(x - padding, 0) : x + w + padding,
+        ]
+
+    def draw_regions(self, image, regions):
+        overlay = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        for region in regions:
+            x, y, w, h = region["box"]
+            cv2.rectangle(overlay, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.circle(overlay, (x, y), 8, (255, 255, 0), 8)
+        return overlay
+
+    def region_language(self, image):
+        return image.get("language", self.language)
+
+    def region_cache_key(self, image, engine_name, output="text"):
+        pixels = np.ascontiguousarray(image["image"])
+        digest = hashlib.blake2b(pixels, digest_size=16)
+        digest.update(
+            f"{pixels.shape}|{image['segmentation']}|{self.region_language(image)}|"
+            f"{self.engine_mode}|{engine_name}|{output}".encode()
+        )
+        return digest.hexdigest()
 
-        text_data = []
+    def recognize_regions(self, cropped_images):
 
-        for image in cropped_images:
+        engine = get_ocr_engine(self.ocr_engine, self.ocr_workers)
+        engine_name = resolve_engine_name(self.ocr_engine)
 
-            text = pytesseract.image_to_string(
+        def recognize(image):
+            return engine.image_to_string(
                 image["image"],
-                lang=self.language,
-                config=f"{self.engine_mode} {image['segmentation']}",
+                self.region_language(image),
+                self.engine_mode,
+                image["segmentation"],
             )
 
-            text_data.append(text)
+        text_data = [None] * len(cropped_images)
+        pending = []
+
+        for index, image in enumerate(cropped_images):
+            key = None
+            if self.cache_regions:
+                key = self.region_cache_key(image, engine_name)
+                text_data[index] = region_cache.get(key)
+
+            if text_data[index] is None:
+                pending.append((index, key, image))
+
+        workers = min(self.ocr_workers, len(pending))
+        if workers <= 1:
+            recognized = [recognize(image) for _, _, image in pending]
+        else:
+            # Regions are independent, map keeps the results in region order
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                recognized = list(
+                    executor.map(recognize, [image for _, _, image in pending])
+                )
+
+        for (index, key, _), text in zip(pending, recognized):
+            text_data[index] = text
+            if key is not None:
+                region_cache.set(key, text)
+
+        return text_data, len(cropped_images) - len(pending)
+
+    def apply_ocr(self, cropped_images):
+
+        text_data, hits = self.recognize_regions(cropped_images)
+        self.region_stats = self.build_region_stats(len(cropped_images), hits)
 
         return text_data
 
+    def build_region_stats(self, regions, hits):
+        stats = {
+            "regions": regions,
+            "hits": hits,
+            "misses": regions - hits,
+            "hit_ratio": hits / regions if regions else 0.0,
+        }
+
+        if self.cache_regions:
+            logger.info(
+                f"Region cache: {hits}/{regions} regions reused "
+                f"({stats['hit_ratio']:.0%})"
+            )
+
+        return stats
+
     def normalize_text(self, text_data):
         normalized_text = ""
         for text in text_data:
             normalized_text += re.sub(r"\s+", " ", text) + "\n"
         return normalized_text
 
-    def save_text_to_file(self, text):
-        with open(self.output_file_path, "w") as file:
+    def save_text_to_file(self, text, output_path=None):
+        output_path = output_path or self.output_file_path
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        # Written next to the target and renamed, so an interrupted run never
+        # leaves a truncated result behind
+        temp_path = f"{output_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
             file.write(text)
+        os.replace(temp_path, output_path)
 
     def display_images(self, images):
         for window_name, image in images.items():
@@ -150,22 +530,454 @@ class TextExtractor:
         cv2.waitKey(0)
         cv2.destroyAllWindows()
 
-    def run(self, input_file):
-
-        try:
-            pre_processed_img = self.pre_process_image(input_file)
+    def is_tiled(self, image):
+        if not self.tile_size:
+            return False
+        return max(image.shape[:2]) > self.tile_size + 2 * self.tile_overlap
+
+    def blank_line(self, image, axis, start, end, last=False):
+        length = image.shape[axis]
+        start, end = min(max(start, 0), length), min(max(end, 0), length)
+        if end <= start:
+            return start
+
+        window = image[start:end] if axis == 0 else image[:, start:end]
+        if window.ndim == 3:
+            window = cv2.cvtColor(window, cv2.COLOR_BGR2GRAY)
+        ink = cv2.threshold(window, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+
+        # The row or column with the least ink, the furthest out of equals so that
+        # the bands overlap as much as they can
+        profile = np.count_nonzero(ink, axis=1 - axis)
+        emptiest = np.flatnonzero(profile == profile.min())
+        return start + int(emptiest[-1] if last else emptiest[0])
+
+    def band_spans(self, image):
+        height, width = image.shape[:2]
+
+        # Bands are cut across the long side, so each one spans the short side whole
+        axis = 0 if height >= width else 1
+        length = image.shape[axis]
+        overlap, half = self.tile_overlap, self.tile_overlap // 2
+
+        # Band edges are put on the emptiest line of the outer half of the overlap,
+        # so they run between the glyphs wherever the page leaves room
+        cuts = range(self.tile_size, length, self.tile_size)
+        starts = [0] + [
+            self.blank_line(image, axis, cut - overlap, cut - half) for cut in cuts
+        ]
+        ends = [
+            self.blank_line(image, axis, cut + half, cut + overlap, last=True)
+            for cut in cuts
+        ] + [length]
+
+        return axis, list(zip(starts, ends))
+
+    def place_regions(self, regions, axis, length, shift, first, last):
+        for region in regions:
+            x, y, w, h = region["box"]
+            start, end = (y, y + h) if axis == 0 else (x, x + w)
+
+            # A region that touches an edge between two bands may go on past it
+            region["whole"] = (first or start > 0) and (last or end < length)
+            # Copied out, so the band buffers are released before OCR is done
+            region["image"] = region["image"].copy()
+            region["box"] = (x, y + shift, w, h) if axis == 0 else (x + shift, y, w, h)
+
+    def join_pieces(self, blocks, regions):
+        for region in regions:
+            x, y, w, h = region["box"]
+            block = {"corners": (x, y, x + w, y + h), "pieces": [region]}
+
+            # Neighbouring bands both hold the rows or columns they overlap on, so
+            # the pieces of one block found by each of them meet there
+            joined = True
+            while joined:
+                joined = False
+                for other in blocks:
+                    if corners_touch(block["corners"], other["corners"]):
+                        blocks.remove(other)
+                        block = {
+                            "corners": corners_union(
+                                block["corners"], other["corners"]
+                            ),
+                            "pieces": other["pieces"] + block["pieces"],
+                        }
+                        joined = True
+                        break
+
+            blocks.append(block)
+
+        return blocks
+
+    def join_block(self, image, scale, block):
+        x0, y0, x1, y1 = block["corners"]
+        box = (x0, y0, x1 - x0, y1 - y0)
+        for piece in block["pieces"]:
+            if piece["whole"] and piece["box"] == box:
+                return piece
+
+        # No band holds the block whole, it is cut again from the source image
+        # across all the bands it runs through
+        region = dict(block["pieces"][0], box=box, whole=True)
+        padding = max(2, region["gap"] // 5)
+        factor = self.scale_factor
+        height, width = image.shape[:2]
+        left = max(int((x0 - padding) / factor), 0)
+        top = max(int((y0 - padding) / factor), 0)
+        right = min(int(np.ceil((x1 + padding) / factor)), width)
+        bottom = min(int(np.ceil((y1 + padding) / factor)), height)
+
+        pre_processed_block = self.binarize_image(
+            self.apply_scale(image[top:bottom, left:right], scale)
+        )
+        x, y = x0 - int(round(left * factor)), y0 - int(round(top * factor))
+        region["image"] = self.crop_region(
+            pre_processed_block, (x, y, box[2], box[3]), padding
+        ).copy()
+
+        # Its pieces were each too short to tell a line from a column
+        ink = cv2.bitwise_not(region["image"])
+        self.orient_region(region, block_direction(ink, max(1, region["gap"] // 2)))
+
+        return region
+
+    def iter_band_regions(self, image):
+
+        scale = self.choose_scale(image)
+        axis, spans = self.band_spans(image)
+        length = image.shape[axis]
+        blocks = []
+
+        for index, (start, end) in enumerate(spans):
+            band = image[start:end] if axis == 0 else image[:, start:end]
+            with self.stage("preprocess"):
+                pre_processed_band = self.binarize_image(self.apply_scale(band, scale))
+            with self.stage("segmentation"):
+                ratio = pre_processed_band.shape[axis] / band.shape[axis]
+                regions = self.draw_contours_and_crop_images(pre_processed_band)
+                self.place_regions(
+                    regions,
+                    axis,
+                    pre_processed_band.shape[axis],
+                    int(round(start * ratio)),
+                    start == 0,
+                    end == length,
+                )
+                blocks = self.join_pieces(blocks, regions)
+
+                # A block is finished once the next band no longer reaches it
+                if index + 1 < len(spans):
+                    limit = spans[index + 1][0] * ratio
+                else:
+                    limit = np.inf
+                finished = [
+                    block for block in blocks if block["corners"][3 - axis] < limit
+                ]
+                blocks = [
+                    block for block in blocks if block["corners"][3 - axis] >= limit
+                ]
+                band_regions = [
+                    self.join_block(image, scale, block) for block in finished
+                ]
+            del band, pre_processed_band
+
+            yield band_regions
+
+    def page_order(self, regions):
+        boxes = np.array([region["box"] for region in regions]).reshape(-1, 4)
+        directions = [region["direction"] for region in regions]
+        return reading_order(boxes, page_direction(directions))
+
+    def recognize_band(self, regions):
+        with self.stage("ocr"):
+            return regions, *self.recognize_regions(regions)
+
+    def extract_tiled(self, image):
+
+        regions = []
+        text_data = []
+        hits = 0
+        pending = deque()
+
+        def collect(future):
+            nonlocal hits
+            band_regions, band_text, band_hits = future.result()
+            # Only the boxes are kept once recognized, for the reading order
+            regions.extend(
+                {"box": region["box"], "direction": region["direction"]}
+                for region in band_regions
+            )
+            text_data.extend(band_text)
+            hits += band_hits
+
+        # The OCR of a band overlaps the preprocessing of the next one, and only a
+        # few bands are in flight, so memory depends on the tile size alone
+        with ThreadPoolExecutor(max_workers=1) as recognizer:
+            for band_regions in self.iter_band_regions(image):
+                pending.append(recognizer.submit(self.recognize_band, band_regions))
+                while len(pending) > Constants.MAX_PENDING_TILES:
+                    collect(pending.popleft())
+
+            while pending:
+                collect(pending.popleft())
+
+        self.region_stats = self.build_region_stats(len(regions), hits)
+
+        # Blocks are finished band by band, the page is only put in reading order
+        # once all of them are known
+        return [text_data[index] for index in self.page_order(regions)]
+
+    def iter_segments(self, input_file):
+
+        with self.stage("preprocess"):
+            frame = self.decode_image(input_file)
+
+        if self.is_tiled(frame):
+            if self.trace is not None:
+                self.trace.set(tiled=True)
+            # The index of a region is its place in the reading order of the page,
+            # known once every band is segmented
+            regions = [
+                region
+                for band_regions in self.iter_band_regions(frame)
+                for region in band_regions
+            ]
+            yield [regions[index] for index in self.page_order(regions)]
+            return
+
+        with self.stage("preprocess"):
+            pre_processed_img = self.binarize_image(self.scale_image(frame))
+        del frame
+        with self.stage("segmentation"):
             cropped_images = self.draw_contours_and_crop_images(pre_processed_img)
-            text_data = self.apply_ocr(cropped_images)
-            normalized_text = self.normalize_text(text_data)
+        self.keep_artifacts(pre_processed_img, cropped_images)
+
+        yield cropped_images
+
+    def recognize_region(self, engine, engine_name, index, image):
+
+        key = None
+        result = None
+        if self.cache_regions:
+            key = self.region_cache_key(image, engine_name, "confidence")
+            result = region_cache.get(key)
+
+        hit = result is not None
+        if not hit:
+            result = engine.recognize(
+                image["image"],
+                self.region_language(image),
+                self.engine_mode,
+                image["segmentation"],
+            )
+            if key is not None:
+                region_cache.set(key, result)
+
+        text, confidence = result
+        # Boxes are reported on the image as it was submitted, before scaling
+        scale = self.scale_factor or 1.0
+        x, y, w, h = image["box"]
+
+        region = {
+            "index": index,
+            "text": re.sub(r"\s+", " ", text).strip(),
+            "box": [int(round(value / scale)) for value in (x, y, w, h)],
+            "segmentation": image["segmentation"],
+            "language": self.region_language(image),
+            "confidence": confidence,
+        }
+        return region, hit
+
+    def iter_regions(self, input_file):
+
+        self.timings = {}
+        engine = get_ocr_engine(self.ocr_engine, self.ocr_workers)
+        engine_name = resolve_engine_name(self.ocr_engine)
+        count = hits = 0
+        pending = set()
+
+        def finished(futures):
+            nonlocal hits
+            for future in futures:
+                region, hit = future.result()
+                hits += hit
+                yield region
+
+        # Regions are yielded as soon as they are recognized, in completion order,
+        # their index gives the reading order
+        with self.traced("regions"), ThreadPoolExecutor(
+            max_workers=self.ocr_workers
+        ) as executor:
+            try:
+                for cropped_images in self.iter_segments(input_file):
+                    for image in cropped_images:
+                        pending.add(
+                            executor.submit(
+                                self.recognize_region, engine, engine_name, count, image
+                            )
+                        )
+                        count += 1
+
+                    done = {future for future in pending if future.done()}
+                    pending -= done
+                    yield from finished(done)
+
+                yield from finished(as_completed(pending))
+
+            finally:
+                # A consumer that stops early does not wait for the remaining regions
+                for future in pending:
+                    future.cancel()
+
+            self.region_stats = self.build_region_stats(count, hits)
+
+    def run_structured(self, input_file):
 
-            if self.debug:
-                images = {"Pre-processed Image": pre_processed_img}
-                self.display_images(images)
-                self.save_text_to_file(normalized_text)
+        try:
+            regions = sorted(self.iter_regions(input_file), key=lambda r: r["index"])
+            with self.stage("normalize"):
+                normalized_text = self.normalize_text(
+                    [region["text"] for region in regions]
+                )
 
-            return normalized_text
+            return {"text": normalized_text, "regions": regions}
 
         except Exception as e:
             logger.error(f"Error when running text extractor: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             return False
+
+    def extract_frame(self, frame):
+
+        self.timings = {}
+
+        with self.traced("page"):
+            return self.extract_image(frame)
+
+    def extract_image(self, frame):
+
+        if self.is_tiled(frame):
+            if self.trace is not None:
+                self.trace.set(tiled=True)
+            text_data = self.extract_tiled(frame)
+            with self.stage("normalize"):
+                return self.normalize_text(text_data)
+
+        with self.stage("preprocess"):
+            pre_processed_img = self.binarize_image(self.scale_image(frame))
+        with self.stage("segmentation"):
+            cropped_images = self.draw_contours_and_crop_images(pre_processed_img)
+        self.keep_artifacts(pre_processed_img, cropped_images)
+        with self.stage("ocr"):
+            text_data = self.apply_ocr(cropped_images)
+        with self.stage("normalize"):
+            normalized_text = self.normalize_text(text_data)
+
+        return normalized_text
+
+    def run_rois(self, input_file, rois):
+
+        self.timings = {}
+
+        with self.traced("rois") as trace:
+            try:
+                trace.set(rois=len(rois))
+                with self.stage("preprocess"):
+                    frame = self.decode_cached(input_file)
+
+                # Only the requested rectangles are scaled, binarized and read
+                texts = []
+                regions = hits = 0
+                for roi in rois:
+                    texts.append(self.extract_image(self.crop_roi(frame, roi)))
+                    regions += self.region_stats["regions"]
+                    hits += self.region_stats["hits"]
+                self.region_stats = self.build_region_stats(regions, hits)
+
+                return "\n".join(texts)
+
+            except Exception as e:
+                trace.set(error=str(e))
+                logger.error(f"Error when running text extractor: {e}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                return False
+
+    def run_pages(self, input_file):
+
+        frames = self.iter_frames(input_file)
+
+        # Decode the next frame on another thread while the current one is recognized
+        with ThreadPoolExecutor(max_workers=1) as decoder:
+            next_frame = decoder.submit(next, frames, None)
+            page = 0
+
+            while True:
+                frame = next_frame.result()
+                if frame is None:
+                    break
+                next_frame = decoder.submit(next, frames, None)
+
+                try:
+                    normalized_text = self.extract_frame(frame)
+                except Exception as e:
+                    logger.error(
+                        f"Error when running text extractor on page {page}: {e}"
+                    )
+                    logger.error(f"Traceback: {traceback.format_exc()}")
+                    normalized_text = False
+
+                del frame
+                yield page, normalized_text
+                page += 1
+
+    def run(self, input_file):
+
+        self.timings = {}
+
+        with self.traced("run") as trace:
+            try:
+                if not self.tile_size:
+                    with self.stage("preprocess"):
+                        pre_processed_img = self.pre_process_image(input_file)
+                else:
+                    with self.stage("preprocess"):
+                        frame = self.decode_image(input_file)
+
+                    if self.is_tiled(frame):
+                        trace.set(tiled=True)
+                        text_data = self.extract_tiled(frame)
+                        with self.stage("normalize"):
+                            normalized_text = self.normalize_text(text_data)
+                        if self.debug:
+                            self.save_text_to_file(normalized_text)
+                        return normalized_text
+
+                    with self.stage("preprocess"):
+                        pre_processed_img = self.binarize_image(self.scale_image(frame))
+
+                with self.stage("segmentation"):
+                    cropped_images = self.draw_contours_and_crop_images(
+                        pre_processed_img
+                    )
+                self.keep_artifacts(pre_processed_img, cropped_images)
+                with self.stage("ocr"):
+                    text_data = self.apply_ocr(cropped_images)
+                with self.stage("normalize"):
+                    normalized_text = self.normalize_text(text_data)
+
+                if self.debug:
+                    images = {
+                        "Pre-processed Image": pre_processed_img,
+                        "Regions": self.draw_regions(pre_processed_img, cropped_images),
+                    }
+                    self.display_images(images)
+                    self.save_text_to_file(normalized_text)
+
+                return normalized_text
+
+            except Exception as e:
+                trace.set(error=str(e))
+                logger.error(f"Error when running text extractor: {e}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                return False
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import traceback
+from collections import OrderedDict
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LRUCache:
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return default
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class FrameCache:
+
+    def __init__(self, max_bytes, ttl_seconds):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def remove(self, key):
+        _, frame = self.entries.pop(key)
+        self.size -= frame.nbytes
+
+    def expire(self, now):
+        for key in [key for key, entry in self.entries.items() if entry[0] <= now]:
+            self.remove(key)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self.lock:
+            self.expire(now)
+            if key not in self.entries:
+                self.misses += 1
+                return default
+
+            # Every use keeps the frame for another ttl, while it is being cropped
+            frame = self.entries[key][1]
+            self.entries[key] = (now + self.ttl_seconds, frame)
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def set(self, key, frame):
+        if frame.nbytes > self.max_bytes:
+            return
+
+        now = time.monotonic()
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (now + self.ttl_seconds, frame)
+            self.size += frame.nbytes
+            self.expire(now)
+
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class DiskCache:
+
+    PRUNE_INTERVAL = 64
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key, default=None):
+        path = self.path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                value = json.load(file)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return default
+
+        with self.lock:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        # Write to a temp file and rename so other workers never read a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(value, file, ensure_ascii=False)
+            os.replace(temp_path, self.path(key))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self.lock:
+            self.writes += 1
+            prune = self.writes % self.PRUNE_INTERVAL == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith(".json")
+            ]
+            overflow = len(entries) - self.max_entries
+            if overflow <= 0:
+                return
+
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:overflow]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+        except Exception as e:
+            logger.error(f"Error when pruning disk cache: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "directory": self.directory,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class ResultCache:
+
+    def __init__(self, max_entries, directory=None, disk_max_entries=10000):
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(directory, disk_max_entries) if directory else None
+
+    @staticmethod
+    def make_key(data, config):
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except Exception as e:
+                logger.error(f"Error when writing to disk cache: {e}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+
+    def stats(self):
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk else None
+        hits = memory["hits"] + (disk["hits"] if disk else 0)
+
+        return {
+            "hits": hits,
+            "misses": memory["misses"] - (disk["hits"] if disk else 0),
+            "memory": memory,
+            "disk": disk,
+        }
@@ -1,3 +1,6 @@
+import os
+
+
 class Constants:
 
     JPN_LANGUAGE: str = "jpn"
@@ -5,3 +8,27 @@ class Constants:
     HORIZONTAL_SEGMENTATION_MODE: str = "--psm 6"
     VERTICAL_SEGMENTATION_MODE: str = "--psm 5"
     ENGINE_MODE: str = "--oem 1"
+    AUTO_ENGINE: str = "auto"
+    PYTESSERACT_ENGINE: str = "pytesseract"
+    TESSEROCR_ENGINE: str = "tesserocr"
+    STUB_ENGINE: str = "stub"
+    FIXED_SCALING: str = "fixed"
+    ADAPTIVE_SCALING: str = "adaptive"
+    FIXED_SCALE: float = 2.0
+    TARGET_GLYPH_HEIGHT: int = 40
+    MIN_SCALE: float = 0.25
+    MAX_SCALE: float = 4.0
+    TILE_OVERLAP: int = 256
+    MAX_PENDING_TILES: int = 2
+    MAX_ROIS: int = 32
+    FAST_PROFILE: str = "fast"
+    BALANCED_PROFILE: str = "balanced"
+    QUALITY_PROFILE: str = "quality"
+    PROFILES: tuple = (FAST_PROFILE, BALANCED_PROFILE, QUALITY_PROFILE)
+    IMAGE_EXTENSIONS: frozenset = frozenset(
+        {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp"}
+    )
+
+
+def is_image_name(name):
+    return os.path.splitext(name)[1].lower() in Constants.IMAGE_EXTENSIONS
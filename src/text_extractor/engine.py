@@ -0,0 +1,287 @@
+import os
+import re
+import time
+import zlib
+import queue
+import threading
+import numpy as np
+import pytesseract
+
+from src import settings
+from src.logger import get_logger
+from src.text_extractor.constants import Constants
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+logger = get_logger(__name__)
+
+STUB_CHARACTERS = "あいうえおかきくけこさしすせそたちつてとなにぬねの"
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_ocr_workers():
+    # Every Tesseract call can itself spread over OMP_THREAD_LIMIT OpenMP threads
+    omp_threads = int(os.environ.get("OMP_THREAD_LIMIT", settings.OCR_OMP_THREADS))
+    return max(1, available_cpus() // max(1, omp_threads))
+
+
+def parse_tesseract_option(config, option):
+    match = re.search(rf"--{option}\s+(\d+)", config)
+    if match is None:
+        raise ValueError(f"Missing --{option} in Tesseract config: {config}")
+    return int(match.group(1))
+
+
+def words_to_text(data):
+    # Words of a line are joined by spaces and lines by newlines, as in Tesseract's
+    # text output. Empty words carry no confidence worth averaging
+    lines = {}
+    confidences = []
+    for index, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        line = (
+            data["block_num"][index],
+            data["par_num"][index],
+            data["line_num"][index],
+        )
+        lines.setdefault(line, []).append(word)
+        confidences.append(float(data["conf"][index]))
+
+    text = "".join(" ".join(words) + "\n" for words in lines.values())
+    if not confidences:
+        return text, None
+    return text, sum(confidences) / len(confidences)
+
+
+class PytesseractEngine:
+
+    name = Constants.PYTESSERACT_ENGINE
+
+    def image_to_string(self, image, language, engine_mode, segmentation):
+        return pytesseract.image_to_string(
+            image,
+            lang=language,
+            config=f"{engine_mode} {segmentation}",
+        )
+
+    def recognize(self, image, language, engine_mode, segmentation):
+        # A single Tesseract run gives both the words and their confidences
+        data = pytesseract.image_to_data(
+            image,
+            lang=language,
+            config=f"{engine_mode} {segmentation}",
+            output_type=pytesseract.Output.DICT,
+        )
+        return words_to_text(data)
+
+    def reserve(self, size):
+        pass
+
+    def warm_up(self, languages, engine_mode):
+        pass
+
+    def close(self):
+        pass
+
+
+class TesseractEnginePool:
+
+    name = Constants.TESSEROCR_ENGINE
+
+    def __init__(self, size, tessdata_path=None):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+
+        self.size = size
+        self.tessdata_path = tessdata_path
+        self.pools = {}
+        self.created = {}
+        self.lock = threading.Lock()
+
+    def create_api(self, language, oem):
+        kwargs = {"lang": language, "oem": tesserocr.OEM(oem)}
+        if self.tessdata_path:
+            kwargs["path"] = self.tessdata_path
+
+        logger.info(f"Loading Tesseract model {language} (oem {oem})")
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    def acquire(self, language, oem):
+        key = (language, oem)
+
+        with self.lock:
+            pool = self.pools.setdefault(key, queue.LifoQueue())
+            try:
+                return pool.get_nowait()
+            except queue.Empty:
+                pass
+
+            create = self.created.get(key, 0) < self.size
+            if create:
+                self.created[key] = self.created.get(key, 0) + 1
+
+        if not create:
+            return pool.get()
+
+        try:
+            return self.create_api(language, oem)
+        except Exception:
+            with self.lock:
+                self.created[key] -= 1
+            raise
+
+    def release(self, language, oem, api):
+        with self.lock:
+            pool = self.pools.setdefault((language, oem), queue.LifoQueue())
+        pool.put(api)
+
+    def reserve(self, size):
+        # The pool grows to the largest concurrency asked of it, models are still
+        # only loaded when a region needs one
+        with self.lock:
+            self.size = max(self.size, size)
+
+    def warm_up(self, languages, engine_mode):
+        # One model per language is loaded up front, so the first page does not
+        # wait for it. Parallel pages load the others as they need them
+        oem = parse_tesseract_option(engine_mode, "oem")
+        for language in languages:
+            key = (language, oem)
+            with self.lock:
+                if self.created.get(key, 0):
+                    continue
+                self.created[key] = 1
+
+            try:
+                api = self.create_api(language, oem)
+            except Exception:
+                with self.lock:
+                    self.created[key] -= 1
+                raise
+            self.release(language, oem, api)
+
+    def image_to_string(self, image, language, engine_mode, segmentation):
+        return self.recognize(image, language, engine_mode, segmentation)[0]
+
+    def recognize(self, image, language, engine_mode, segmentation):
+        oem = parse_tesseract_option(engine_mode, "oem")
+        psm = parse_tesseract_option(segmentation, "psm")
+
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        api = self.acquire(language, oem)
+        try:
+            api.SetPageSegMode(tesserocr.PSM(psm))
+            api.SetImageBytes(
+                image.tobytes(), width, height, channels, width * channels
+            )
+            text = api.GetUTF8Text()
+            # MeanTextConf is 0 when nothing was recognized
+            confidence = float(api.MeanTextConf()) if text.strip() else None
+            return text, confidence
+        finally:
+            api.Clear()
+            self.release(language, oem, api)
+
+    def close(self):
+        with self.lock:
+            for pool in self.pools.values():
+                while not pool.empty():
+                    pool.get_nowait().End()
+            self.pools = {}
+            self.created = {}
+
+
+class StubEngine:
+
+    name = Constants.STUB_ENGINE
+
+    def __init__(self, latency_seconds):
+        self.latency_seconds = latency_seconds
+
+    def image_to_string(self, image, language, engine_mode, segmentation):
+        return self.recognize(image, language, engine_mode, segmentation)[0]
+
+    def recognize(self, image, language, engine_mode, segmentation):
+        # Deterministic stand-in for load tests: the text only depends on the
+        # region pixels and the latency replaces Tesseract time on any host
+        pixels = np.ascontiguousarray(image)
+        height, width = pixels.shape[:2]
+        checksum = zlib.crc32(pixels.tobytes())
+        length = max(width, height) // max(1, min(width, height)) + 1
+        text = "".join(
+            STUB_CHARACTERS[(checksum >> index) % len(STUB_CHARACTERS)]
+            for index in range(length)
+        )
+
+        time.sleep(self.latency_seconds)
+        return f"{text}\n", 90.0
+
+    def reserve(self, size):
+        pass
+
+    def warm_up(self, languages, engine_mode):
+        pass
+
+    def close(self):
+        pass
+
+
+def resolve_engine_name(name=None):
+    name = name or settings.OCR_ENGINE
+    if name == Constants.AUTO_ENGINE:
+        if tesserocr is not None:
+            return Constants.TESSEROCR_ENGINE
+        return Constants.PYTESSERACT_ENGINE
+    return name
+
+
+def create_ocr_engine(name, size=1):
+    if name == Constants.PYTESSERACT_ENGINE:
+        return PytesseractEngine()
+    if name == Constants.TESSEROCR_ENGINE:
+        return TesseractEnginePool(size, settings.TESSDATA_PATH)
+    if name == Constants.STUB_ENGINE:
+        return StubEngine(settings.STUB_OCR_LATENCY_SECONDS)
+    raise ValueError(f"Unknown OCR engine: {name}")
+
+
+def get_ocr_engine(name=None, workers=1):
+    name = resolve_engine_name(name)
+    # A pool larger than the threads that use it only holds idle models
+    size = settings.OCR_POOL_SIZE or workers
+
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            engine = create_ocr_engine(name, size)
+            engine.warm_up(
+                [Constants.JPN_LANGUAGE, Constants.JPN_VERT_LANGUAGE],
+                Constants.ENGINE_MODE,
+            )
+            _engines[name] = engine
+        else:
+            engine.reserve(size)
+
+    return engine
+
+
+def close_ocr_engines():
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.close()
+        _engines.clear()
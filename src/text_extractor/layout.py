@@ -0,0 +1,195 @@
+import numpy as np
+
+HORIZONTAL = "horizontal"
+VERTICAL = "vertical"
+
+
+def to_corners(boxes):
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    return np.column_stack(
+        (boxes[:, 0], boxes[:, 1], boxes[:, 0] + boxes[:, 2], boxes[:, 1] + boxes[:, 3])
+    )
+
+
+def to_boxes(corners):
+    return np.column_stack(
+        (
+            corners[:, 0],
+            corners[:, 1],
+            corners[:, 2] - corners[:, 0],
+            corners[:, 3] - corners[:, 1],
+        )
+    )
+
+
+def corners_touch(first, second):
+    return (
+        first[0] <= second[2]
+        and second[0] <= first[2]
+        and first[1] <= second[3]
+        and second[1] <= first[3]
+    )
+
+
+def corners_union(first, second):
+    return (
+        min(first[0], second[0]),
+        min(first[1], second[1]),
+        max(first[2], second[2]),
+        max(first[3], second[3]),
+    )
+
+
+def filter_boxes(boxes, min_area, min_aspect_ratio, max_size=None):
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    widths, heights = boxes[:, 2], boxes[:, 3]
+
+    keep = (widths * heights > min_area) & (
+        widths > min_aspect_ratio * np.maximum(heights, 1)
+    )
+    if max_size is not None:
+        # Panel borders and frames span most of the page, they are not text
+        keep &= ~((widths > max_size[0]) & (heights > max_size[1]))
+
+    return boxes[keep]
+
+
+def candidate_pairs(corners, gap_x, gap_y):
+    # Sweep and prune: with the boxes sorted by left edge, the boxes that can touch
+    # box i horizontally are a contiguous run found with a single searchsorted
+    order = np.argsort(corners[:, 0], kind="stable")
+    sorted_corners = corners[order]
+    left_edges = sorted_corners[:, 0]
+
+    ends = np.searchsorted(left_edges, sorted_corners[:, 2] + gap_x, side="right")
+    starts = np.arange(len(corners)) + 1
+    counts = np.maximum(ends - starts, 0)
+
+    first = np.repeat(np.arange(len(corners)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = first + 1 + offsets
+
+    a, b = sorted_corners[first], sorted_corners[second]
+    touching = (b[:, 1] <= a[:, 3] + gap_y) & (a[:, 1] <= b[:, 3] + gap_y)
+
+    return order[first[touching]], order[second[touching]]
+
+
+def connected_labels(count, first, second):
+    labels = np.arange(count)
+    while True:
+        previous = labels.copy()
+        low = np.minimum(labels[first], labels[second])
+        np.minimum.at(labels, first, low)
+        np.minimum.at(labels, second, low)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def merge_boxes(boxes, gap_x=0, gap_y=0):
+    corners = to_corners(boxes)
+
+    while len(corners) > 1:
+        first, second = candidate_pairs(corners, gap_x, gap_y)
+        if len(first) == 0:
+            break
+
+        _, labels = np.unique(
+            connected_labels(len(corners), first, second), return_inverse=True
+        )
+        groups = labels.max() + 1
+
+        merged = np.empty((groups, 4), dtype=np.int64)
+        merged[:, :2] = np.iinfo(np.int64).max
+        merged[:, 2:] = np.iinfo(np.int64).min
+        np.minimum.at(merged[:, 0], labels, corners[:, 0])
+        np.minimum.at(merged[:, 1], labels, corners[:, 1])
+        np.maximum.at(merged[:, 2], labels, corners[:, 2])
+        np.maximum.at(merged[:, 3], labels, corners[:, 3])
+
+        if groups == len(corners):
+            break
+        # Merged boxes can reach boxes that none of their parts touched
+        corners = merged
+
+    return to_boxes(corners)
+
+
+def glyph_size(boxes):
+    if len(boxes) == 0:
+        return 0
+    return int(np.median(np.maximum(boxes[:, 2], boxes[:, 3])))
+
+
+def profile_runs(profile, min_gap):
+    # Bounds of the inked runs of a projection profile, runs closer than min_gap
+    # are one run: the spacing between glyphs of a line is not a line break
+    inked = np.concatenate(([False], profile > 0, [False]))
+    edges = np.flatnonzero(np.diff(inked.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    if len(starts) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    first = np.flatnonzero(np.concatenate(([True], starts[1:] - ends[:-1] >= min_gap)))
+    last = np.append(first[1:], len(ends)) - 1
+    return np.column_stack((starts[first], ends[last]))
+
+
+def longest_run(runs):
+    return (runs[:, 1] - runs[:, 0]).max(initial=0)
+
+
+def block_direction(ink, min_gap):
+    rows = profile_runs(np.count_nonzero(ink, axis=1), min_gap)
+    columns = profile_runs(np.count_nonzero(ink, axis=0), min_gap)
+
+    # Text runs on along its lines and is only a glyph thick across them, so the
+    # axis with the far longer runs is the writing direction. Run counts are no
+    # guide: blank stretches split a column into many runs down the rows
+    tallest, widest = longest_run(rows), longest_run(columns)
+    if tallest > 1.5 * widest:
+        return VERTICAL
+    if widest > 1.5 * tallest:
+        return HORIZONTAL
+
+    # Runs about as long both ways, such as a few spaced glyphs, the shape of the
+    # inked area tells a line and a column apart
+    if len(rows) == 0:
+        return HORIZONTAL
+    height = rows[-1, 1] - rows[0, 0]
+    width = columns[-1, 1] - columns[0, 0]
+    return VERTICAL if height > width else HORIZONTAL
+
+
+def analyze_layout(ink, boxes, block_gap=1.0):
+    # Nested and overlapping boxes are the same glyph or glyph parts
+    boxes = merge_boxes(boxes)
+    if len(boxes) == 0:
+        return boxes, []
+
+    size = glyph_size(boxes)
+    gap = int(size * block_gap)
+    blocks = merge_boxes(boxes, gap_x=gap, gap_y=gap)
+    min_gap = max(1, size // 2)
+
+    directions = [
+        block_direction(ink[y : y + h, x : x + w], min_gap) for x, y, w, h in blocks
+    ]
+
+    order = reading_order(blocks, page_direction(directions))
+
+    return blocks[order], [directions[index] for index in order]
+
+
+def page_direction(directions):
+    # The page is read in the direction most of its blocks are written in
+    vertical = np.array(directions) == VERTICAL
+    return VERTICAL if vertical.sum() * 2 > len(directions) else HORIZONTAL
+
+
+def reading_order(boxes, direction):
+    if direction == VERTICAL:
+        # Right to left, then top to bottom
+        return np.lexsort((boxes[:, 1], -(boxes[:, 0] + boxes[:, 2])))
+    return np.lexsort((boxes[:, 0], boxes[:, 1]))
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+ESTIMATE_MAX_SIDE = 1000
+MIN_COMPONENTS = 5
+
+
+def estimate_glyph_height(image, max_side=ESTIMATE_MAX_SIDE):
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    # Bound the pixel count rather than the long side, so long strips keep
+    # enough resolution for their glyphs to survive the downscale
+    height, width = image.shape[:2]
+    scale = min(1.0, max_side / np.sqrt(height * width))
+    if scale < 1.0:
+        image = cv2.resize(
+            image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+
+    # Close small gaps so the strokes of one glyph count as one component
+    binary = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, np.ones((2, 2), dtype=np.uint8))
+    stats = cv2.connectedComponentsWithStats(binary, connectivity=8)[2][1:]
+
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    widths = stats[:, cv2.CC_STAT_WIDTH]
+    plausible = (
+        (heights >= 2)
+        & (heights < image.shape[0] * 0.2)
+        & (widths < image.shape[1] * 0.2)
+        & (stats[:, cv2.CC_STAT_AREA] >= 4)
+    )
+    if plausible.sum() < MIN_COMPONENTS:
+        return None
+
+    return float(np.percentile(heights[plausible], 70)) / scale
+
+
+def compute_scale(glyph_height, target_height, min_scale, max_scale, tolerance=0.15):
+    if not glyph_height:
+        return None
+
+    scale = float(np.clip(target_height / glyph_height, min_scale, max_scale))
+    if abs(scale - 1.0) < tolerance:
+        return 1.0
+    return scale
+
+
+def interpolation_for(scale):
+    if scale < 1.0:
+        return cv2.INTER_AREA
+    if scale <= 1.5:
+        return cv2.INTER_LINEAR
+    return cv2.INTER_CUBIC
+
+
+def resize_to_scale(image, scale):
+    if scale == 1.0:
+        return image
+    return cv2.resize(
+        image, None, fx=scale, fy=scale, interpolation=interpolation_for(scale)
+    )
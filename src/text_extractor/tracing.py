@@ -0,0 +1,154 @@
+import os
+import cv2
+import json
+import time
+import uuid
+import queue
+import random
+import shutil
+import threading
+import traceback
+
+from src import settings
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Trace:
+
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+        self.attributes = {}
+        self.artifacts = {}
+
+    def add_span(self, name, start, seconds):
+        self.spans.append(
+            {"name": name, "offset": start - self.start, "seconds": seconds}
+        )
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def keep(self, name, image):
+        # Only a reference is kept: images, or callables rendering them, are
+        # turned into files on the tracer thread and only for the saved traces
+        self.artifacts[name] = image
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "spans": self.spans,
+            "attributes": self.attributes,
+            "artifacts": [f"{name}.png" for name in self.artifacts],
+        }
+
+
+class Tracer:
+
+    def __init__(
+        self,
+        directory,
+        sample_rate=0.0,
+        slow_seconds=None,
+        max_entries=100,
+        queue_size=16,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.max_entries = max_entries
+        self.queue = queue.Queue(queue_size)
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def start_trace(self, name):
+        return Trace(name)
+
+    def should_save(self, trace):
+        if self.slow_seconds is not None and trace.seconds >= self.slow_seconds:
+            return True
+        return random.random() < self.sample_rate
+
+    def finish(self, trace):
+        trace.seconds = time.perf_counter() - trace.start
+        if not self.directory or not self.should_save(trace):
+            return False
+
+        self.start()
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            # Saving is best effort, a burst of slow requests must not slow them
+            # down further
+            logger.warning(f"Trace {trace.trace_id} dropped, the trace queue is full")
+            return False
+        return True
+
+    def start(self):
+        with self.lock:
+            # Threads do not survive a fork, so a forked worker starts its own
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+
+            threading.Thread(target=self.run, name="tracer", daemon=True).start()
+
+    def run(self):
+        while True:
+            trace = self.queue.get()
+            try:
+                self.save(trace)
+            except Exception as e:
+                logger.error(f"Error when saving trace {trace.trace_id}: {e}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        self.queue.join()
+
+    def save(self, trace):
+        started_at = time.strftime("%Y%m%dT%H%M%S", time.gmtime(trace.started_at))
+        started_at += f".{int(trace.started_at * 1e6) % 1000000:06d}"
+        trace_path = os.path.join(self.directory, f"{started_at}-{trace.trace_id}")
+
+        # Written aside and renamed, so a listed trace is always complete
+        temp_path = f"{trace_path}.tmp"
+        os.makedirs(temp_path)
+        for name, image in trace.artifacts.items():
+            if callable(image):
+                image = image()
+            cv2.imwrite(os.path.join(temp_path, f"{name}.png"), image)
+        with open(os.path.join(temp_path, "trace.json"), "w") as file:
+            json.dump(trace.to_dict(), file, indent=2, default=str)
+        os.replace(temp_path, trace_path)
+
+        logger.info(
+            f"Saved trace {trace.trace_id} ({trace.seconds:.2f} s) to {trace_path}"
+        )
+        self.prune()
+
+    def prune(self):
+        # Names start with the start time, so the oldest traces sort first
+        traces = sorted(
+            name for name in os.listdir(self.directory) if not name.endswith(".tmp")
+        )
+        for name in traces[: max(0, len(traces) - self.max_entries)]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+tracer = Tracer(
+    settings.TRACE_DIR or f"{settings.BASE_DIR}/src/logs/traces",
+    settings.TRACE_SAMPLE_RATE,
+    settings.TRACE_SLOW_SECONDS,
+    settings.TRACE_MAX_ENTRIES,
+)
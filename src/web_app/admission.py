@@ -0,0 +1,203 @@
+import io
+import os
+import time
+import uuid
+import sqlite3
+from contextlib import contextmanager
+
+from src import settings
+from src.logger import get_logger
+from src.text_extractor.constants import Constants
+from src.web_app.jobs import pid_alive
+
+logger = get_logger(__name__)
+
+# The decoded BGR frame, per pixel of the original image
+FRAME_BYTES_PER_PIXEL = 3
+# The scaled BGR frame and the two single channel buffers of the in-memory pipeline,
+# per pixel of the scaled image
+SCALED_BYTES_PER_PIXEL = 3 + 2
+
+COUNTERS = ("admitted", "queued", "rejected")
+
+
+class AdmissionRejected(Exception):
+
+    def __init__(self, message, retry_after, status_code=429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+def max_scale():
+    # Adaptive scaling goes up to MAX_SCALE, and falls back to the fixed upscale
+    # when a page has too few glyphs to measure
+    if settings.SCALING == Constants.ADAPTIVE_SCALING:
+        return max(Constants.MAX_SCALE, Constants.FIXED_SCALE)
+    return Constants.FIXED_SCALE
+
+
+def pipeline_cost(width, height, scale, tile_size=None, tile_overlap=0):
+    processed = width * height
+    band = tile_size + 2 * tile_overlap if tile_size else None
+    if band and max(width, height) > band:
+        # A tiled page is scaled and filtered one band at a time, each band spans
+        # the short side whole
+        processed = min(width, height) * band
+
+    return width * height * FRAME_BYTES_PER_PIXEL + int(
+        processed * scale**2 * SCALED_BYTES_PER_PIXEL
+    )
+
+
+def estimate_cost(source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    # PIL is imported on first use, it is not needed to start a worker
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        # Only the header is read here, the pixels are not decoded
+        with Image.open(source) as image:
+            width, height = image.size
+    except (UnidentifiedImageError, OSError):
+        return 0
+    return pipeline_cost(
+        width, height, max_scale(), settings.TILE_SIZE, settings.TILE_OVERLAP
+    )
+
+
+class AdmissionController:
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, path, budget_bytes, max_wait_seconds, retry_after_seconds):
+        self.path = path
+        self.budget_bytes = budget_bytes
+        self.max_wait_seconds = max_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    id TEXT PRIMARY KEY,
+                    pid INTEGER NOT NULL,
+                    cost INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """)
+            # Counted in the ledger, so every worker reports the totals of the host
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+                """)
+            connection.executemany(
+                "INSERT OR IGNORE INTO counters VALUES (?, 0)",
+                [(name,) for name in COUNTERS],
+            )
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def count(self, name, connection=None):
+        if connection is not None:
+            connection.execute(
+                "UPDATE counters SET value = value + 1 WHERE name = ?", (name,)
+            )
+            return
+
+        with self.connect() as connection:
+            self.count(name, connection)
+
+    def try_acquire(self, cost):
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+
+            # Leases of worker processes that died mid-request are released
+            for lease_id, pid in connection.execute(
+                "SELECT id, pid FROM leases"
+            ).fetchall():
+                if not pid_alive(pid):
+                    connection.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+            in_use = connection.execute(
+                "SELECT COALESCE(SUM(cost), 0) FROM leases"
+            ).fetchone()[0]
+
+            lease_id = None
+            if in_use + cost <= self.budget_bytes:
+                lease_id = uuid.uuid4().hex
+                connection.execute(
+                    "INSERT INTO leases (id, pid, cost, created_at) VALUES (?, ?, ?, ?)",
+                    (lease_id, os.getpid(), cost, time.time()),
+                )
+                self.count("admitted", connection)
+
+            connection.execute("COMMIT")
+            return lease_id
+        finally:
+            connection.close()
+
+    def release(self, lease_id):
+        with self.connect() as connection:
+            connection.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+    def acquire(self, cost, max_wait_seconds=None):
+        if cost > self.budget_bytes:
+            self.count("rejected")
+            raise AdmissionRejected(
+                "The image is too large to be processed.", None, status_code=413
+            )
+
+        if max_wait_seconds is None:
+            max_wait_seconds = self.max_wait_seconds
+
+        deadline = time.time() + max_wait_seconds
+        queued = False
+
+        while True:
+            lease_id = self.try_acquire(cost)
+            if lease_id is not None:
+                return lease_id
+
+            if not queued:
+                queued = True
+                self.count("queued")
+
+            if time.time() >= deadline:
+                self.count("rejected")
+                logger.info(f"Rejected request costing {cost} bytes, budget exhausted")
+                raise AdmissionRejected(
+                    "The server is busy, please try again later.",
+                    self.retry_after_seconds,
+                )
+
+            time.sleep(self.POLL_INTERVAL)
+
+    @contextmanager
+    def admit(self, cost, max_wait_seconds=None):
+        lease_id = self.acquire(cost, max_wait_seconds)
+        try:
+            yield
+        finally:
+            self.release(lease_id)
+
+    def stats(self):
+        with self.connect() as connection:
+            in_use, active = connection.execute(
+                "SELECT COALESCE(SUM(cost), 0), COUNT(*) FROM leases"
+            ).fetchone()
+            counters = dict(connection.execute("SELECT name, value FROM counters"))
+
+        return {
+            **counters,
+            "active": active,
+            "in_use_bytes": in_use,
+            "budget_bytes": self.budget_bytes,
+        }
@@ -1,17 +1,193 @@
 import os
+import json
+import threading
 import traceback
-from flask import Flask, render_template, request, jsonify, send_from_directory, url_for
-from src.web_app.utils import schedule_file_delete
-from src.text_extractor.app import TextExtractor
+from functools import partial
+from flask import (
+    Flask,
+    Response,
+    abort,
+    render_template,
+    request,
+    jsonify,
+    send_file,
+    stream_with_context,
+    url_for,
+)
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.web_app.utils import UPLOAD_FOLDER, schedule_file_delete, storage, sweeper
+from src.web_app.storage import LocalStorage
+from src.web_app.jobs import JobQueue, create_job_store
+from src.web_app.admission import AdmissionController, AdmissionRejected, estimate_cost
+from src.web_app.upload_request import UploadRequest, read_upload
+from src.web_app.metrics import init_metrics, observe_extractor
+from src.web_app.batch import iter_batch_results, iter_uploaded_pages
+from src.text_extractor.cache import ResultCache
+from src.text_extractor.constants import Constants
 from src.logger import get_logger
 from src import settings
 
 flask_app = Flask(__name__)
-flask_app.config["UPLOAD_FOLDER"] = f"{settings.BASE_DIR}/src/web_app/uploads"
+flask_app.request_class = UploadRequest
+init_metrics(flask_app)
+flask_app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
 logger = get_logger(__name__)
 
 
+def import_extractor():
+    # cv2, numpy and the OCR engine are most of a worker's start up, so the extractor
+    # is imported on first use: after the fork when the app is preloaded
+    from src.text_extractor.app import TextExtractor
+
+    return TextExtractor
+
+
+def warm_up():
+    threading.Thread(target=import_extractor, name="warm-up", daemon=True).start()
+
+
+result_cache = ResultCache(
+    settings.RESULT_CACHE_SIZE,
+    settings.RESULT_CACHE_DIR,
+    settings.RESULT_CACHE_DISK_MAX_ENTRIES,
+)
+
+admission = AdmissionController(
+    settings.ADMISSION_DB_PATH or f"{settings.BASE_DIR}/src/web_app/admission.sqlite3",
+    settings.ADMISSION_BUDGET_BYTES,
+    settings.ADMISSION_MAX_WAIT_SECONDS,
+    settings.ADMISSION_RETRY_AFTER_SECONDS,
+)
+
+
+def create_extractor(profile=None):
+    from src.text_extractor.app import TextExtractor
+
+    return TextExtractor(
+        in_memory=True,
+        scaling=settings.SCALING,
+        profile=profile or settings.PREPROCESSING_PROFILE,
+        tile_size=settings.TILE_SIZE,
+        tile_overlap=settings.TILE_OVERLAP,
+    )
+
+
+def request_profile():
+    return request.args.get("profile", settings.PREPROCESSING_PROFILE)
+
+
+def invalid_profile_response(profile):
+    message = (
+        f"Unknown preprocessing profile: {profile}, "
+        f"expected one of {', '.join(Constants.PROFILES)}"
+    )
+    return jsonify(success=False, message=message), 400
+
+
+def request_rois():
+    # Crop rectangles in source image pixels, optional in the JSON body
+    rois = (request.get_json(silent=True) or {}).get("rois")
+    if rois is None:
+        return None
+
+    if not isinstance(rois, list) or not 0 < len(rois) <= Constants.MAX_ROIS:
+        raise ValueError(f"rois must be a list of 1 to {Constants.MAX_ROIS} rectangles")
+
+    parsed = []
+    for roi in rois:
+        try:
+            x, y, width, height = (
+                int(roi[key]) for key in ("x", "y", "width", "height")
+            )
+        except (TypeError, KeyError, ValueError):
+            raise ValueError("Each roi needs integer x, y, width and height")
+        if width <= 0 or height <= 0:
+            raise ValueError("Each roi needs a positive width and height")
+        parsed.append([x, y, width, height])
+
+    return parsed
+
+
+def result_cache_key(extractor_app, source, rois=None):
+    data = source
+    if not isinstance(source, bytes):
+        with open(source, "rb") as file:
+            data = file.read()
+
+    config = extractor_app.cache_config()
+    if rois:
+        config["rois"] = rois
+    return result_cache.make_key(data, config), data
+
+
+def extract_text(source, profile=None, rois=None, max_wait_seconds=None):
+    extractor_app = create_extractor(profile)
+    cache_key, data = result_cache_key(extractor_app, source, rois)
+
+    processed_text = result_cache.get(cache_key)
+    if processed_text is None:
+        # Only a page that has to run takes budget, a cached one is served at once
+        with admission.admit(estimate_cost(data), max_wait_seconds):
+            if rois:
+                processed_text = extractor_app.run_rois(source, rois)
+            else:
+                processed_text = extractor_app.run(source)
+        observe_extractor(extractor_app)
+
+        if processed_text:
+            result_cache.set(cache_key, processed_text)
+
+    return processed_text
+
+
+def admission_rejected_response(error):
+    response = jsonify(success=False, message=str(error))
+    response.status_code = error.status_code
+    if error.retry_after:
+        response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+def upload_storage():
+    # Local uploads follow UPLOAD_FOLDER, which deployments and tests can move
+    if isinstance(storage, LocalStorage):
+        return LocalStorage(flask_app.config["UPLOAD_FOLDER"])
+    return storage
+
+
+# The sweeper tracks and deletes uploads where the routes store them
+sweeper.get_storage = upload_storage
+
+
+def run_job(payload):
+    # Jobs queued before uploads were named by their storage carry a path
+    file_path = payload.get("file_path")
+    try:
+        if file_path is None:
+            file_path = upload_storage().local_path(payload["filename"])
+        elif not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+    except FileNotFoundError:
+        raise FileNotFoundError("The image was not found, please reupload it.")
+
+    # Queued jobs wait for budget instead of being rejected
+    return extract_text(
+        file_path, payload.get("profile"), payload.get("rois"), max_wait_seconds=3600
+    )
+
+
+job_queue = JobQueue(
+    create_job_store(
+        settings.JOB_STORE,
+        settings.JOB_DB_PATH or f"{settings.BASE_DIR}/src/web_app/jobs.sqlite3",
+        settings.JOB_RETENTION_SECONDS,
+    ),
+    settings.JOB_WORKERS,
+    run_job,
+)
+
+
 @flask_app.route("/")
 def index():
     return render_template("index.html")
@@ -28,11 +204,10 @@ def upload_file():
             return jsonify(success=False, message="No selected file")
 
         if file:
-            file_path = os.path.join(flask_app.config["UPLOAD_FOLDER"], file.filename)
-            file.save(file_path)
+            upload_storage().save(file.filename, file.stream)
             file_url = url_for("uploaded_file", filename=file.filename)
 
-            schedule_file_delete(file_path)
+            schedule_file_delete(file.filename)
 
             return jsonify(
                 success=True,
@@ -62,11 +237,10 @@ def upload_cropped_file(filename):
             return jsonify(success=False, message="No selected file")
 
         if file:
-            file_path = os.path.join(flask_app.config["UPLOAD_FOLDER"], file.filename)
-            file.save(file_path)
+            upload_storage().save(file.filename, file.stream)
             file_url = url_for("uploaded_file", filename=filename)
 
-            schedule_file_delete(file_path)
+            schedule_file_delete(file.filename)
 
             return jsonify(
                 success=True,
@@ -87,20 +261,46 @@ def upload_cropped_file(filename):
 
 @flask_app.route("/uploads/<path:filename>")
 def uploaded_file(filename):
-    return send_from_directory(flask_app.config["UPLOAD_FOLDER"], filename)
+    try:
+        return send_file(upload_storage().local_path(filename))
+    except FileNotFoundError:
+        abort(404)
 
 
 @flask_app.route("/process/<path:filename>", methods=["POST"])
 def process_file(filename):
     try:
-        file_path = os.path.join(flask_app.config["UPLOAD_FOLDER"], filename)
-        if not os.path.exists(file_path):
+        try:
+            file_path = upload_storage().local_path(filename)
+        except FileNotFoundError:
             return jsonify(
                 success=False, message="The image was not found, please reupload it."
             )
 
-        extractor_app = TextExtractor()
-        processed_text = extractor_app.run(file_path)
+        profile = request_profile()
+        if profile not in Constants.PROFILES:
+            return invalid_profile_response(profile)
+
+        try:
+            rois = request_rois()
+        except ValueError as e:
+            return jsonify(success=False, message=str(e)), 400
+
+        if request.args.get("async", "").lower() in ("1", "true"):
+            job_id = job_queue.submit(
+                {"filename": filename, "profile": profile, "rois": rois}
+            )
+            return (
+                jsonify(
+                    success=True,
+                    message="Processing queued",
+                    job_id=job_id,
+                    status_url=url_for("job_status", job_id=job_id),
+                ),
+                202,
+            )
+
+        processed_text = extract_text(file_path, profile, rois)
 
         if not processed_text:
             return jsonify(
@@ -113,9 +313,259 @@ def process_file(filename):
             result=processed_text,
         )
 
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+
     except Exception as e:
         logger.error(f"Error when processing file: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         return jsonify(
             success=False, message="Internal server error, please try again."
         )
+
+
+@flask_app.route("/process_pages/<path:filename>", methods=["POST"])
+def process_pages(filename):
+    try:
+        try:
+            file_path = upload_storage().local_path(filename)
+        except FileNotFoundError:
+            return jsonify(
+                success=False, message="The image was not found, please reupload it."
+            )
+
+        profile = request_profile()
+        if profile not in Constants.PROFILES:
+            return invalid_profile_response(profile)
+
+        # Every frame has the size of the first one in the vast majority of volumes
+        lease_id = admission.acquire(estimate_cost(file_path))
+
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+
+    except Exception as e:
+        logger.error(f"Error when processing pages: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return jsonify(
+            success=False, message="Internal server error, please try again."
+        )
+
+    def stream_pages():
+        pages = 0
+        try:
+            extractor_app = create_extractor(profile)
+            for page, processed_text in extractor_app.run_pages(file_path):
+                pages += 1
+                line = {"page": page, "success": bool(processed_text)}
+                if processed_text:
+                    line["result"] = processed_text
+                else:
+                    line["message"] = "Processing failed,  please try again."
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+
+            yield json.dumps({"done": True, "pages": pages}) + "\n"
+
+        except Exception as e:
+            logger.error(f"Error when processing pages: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            yield json.dumps({"done": True, "pages": pages, "error": str(e)}) + "\n"
+
+        finally:
+            admission.release(lease_id)
+
+    return Response(stream_pages(), mimetype="application/x-ndjson")
+
+
+def server_sent_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@flask_app.route("/process_stream/<path:filename>")
+def process_stream(filename):
+    try:
+        try:
+            file_path = upload_storage().local_path(filename)
+        except FileNotFoundError:
+            return jsonify(
+                success=False, message="The image was not found, please reupload it."
+            )
+
+        profile = request_profile()
+        if profile not in Constants.PROFILES:
+            return invalid_profile_response(profile)
+
+        extractor_app = create_extractor(profile)
+        cache_key, _ = result_cache_key(extractor_app, file_path)
+        cached_text = result_cache.get(cache_key)
+
+        # A resubmitted page is answered at once, without taking budget
+        if cached_text is None:
+            lease_id = admission.acquire(estimate_cost(file_path))
+
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+
+    except Exception as e:
+        logger.error(f"Error when streaming file: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return jsonify(
+            success=False, message="Internal server error, please try again."
+        )
+
+    def stream_cached():
+        yield server_sent_event(
+            "done",
+            {
+                "success": True,
+                "message": "Processing completed successfully",
+                "result": cached_text,
+            },
+        )
+
+    def stream_regions():
+        regions = []
+        try:
+            for region in extractor_app.iter_regions(file_path):
+                regions.append(region)
+                yield server_sent_event("region", region)
+
+            regions.sort(key=lambda region: region["index"])
+            processed_text = extractor_app.normalize_text(
+                [region["text"] for region in regions]
+            )
+            observe_extractor(extractor_app)
+            if processed_text:
+                result_cache.set(cache_key, processed_text)
+
+            yield server_sent_event(
+                "done",
+                {
+                    "success": True,
+                    "message": "Processing completed successfully",
+                    "result": processed_text,
+                    "regions": len(regions),
+                },
+            )
+
+        except Exception as e:
+            logger.error(f"Error when streaming file: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            yield server_sent_event(
+                "failed",
+                {"success": False, "message": "Processing failed,  please try again."},
+            )
+
+        finally:
+            admission.release(lease_id)
+
+    # Proxies must pass every event through as soon as it is written
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    events = stream_regions() if cached_text is None else stream_cached()
+    return Response(events, mimetype="text/event-stream", headers=headers)
+
+
+@flask_app.route("/extract", methods=["POST"])
+def extract_file():
+    try:
+        profile = request_profile()
+        if profile not in Constants.PROFILES:
+            return invalid_profile_response(profile)
+
+        data = read_upload(request)
+        if data is None:
+            return jsonify(success=False, message="No selected file")
+
+        processed_text = extract_text(data, profile)
+
+        if not processed_text:
+            return jsonify(
+                success=False, message="Processing failed,  please try again."
+            )
+
+        return jsonify(
+            success=True,
+            message="Processing completed successfully",
+            result=processed_text,
+        )
+
+    except RequestEntityTooLarge:
+        return jsonify(success=False, message="The image is too large."), 413
+
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+
+    except Exception as e:
+        logger.error(f"Error when extracting file: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return jsonify(
+            success=False, message="Internal server error, please try again."
+        )
+
+
+def extract_admitted(data, profile=None):
+    # Batch pages wait for budget instead of failing the whole batch
+    return extract_text(data, profile, max_wait_seconds=3600)
+
+
+@flask_app.route("/batch", methods=["POST"])
+def batch_extract():
+    profile = request_profile()
+    if profile not in Constants.PROFILES:
+        return invalid_profile_response(profile)
+
+    # Check the size limit before the response starts streaming
+    too_large = jsonify(success=False, message="The batch is too large."), 413
+    if (request.content_length or 0) > request.max_content_length:
+        return too_large
+
+    try:
+        if request.mimetype == "multipart/form-data":
+            request.files
+    except RequestEntityTooLarge:
+        return too_large
+
+    pages = iter_uploaded_pages(request)
+    results = iter_batch_results(
+        pages, partial(extract_admitted, profile=profile), settings.BATCH_WORKERS
+    )
+
+    return Response(stream_with_context(results), mimetype="application/x-ndjson")
+
+
+@flask_app.route("/cache/stats")
+def cache_stats():
+    from src.text_extractor.app import frame_cache, region_cache
+
+    return jsonify(
+        success=True,
+        stats=result_cache.stats(),
+        regions=region_cache.stats(),
+        frames=frame_cache.stats(),
+    )
+
+
+@flask_app.route("/jobs/<job_id>")
+def job_status(job_id):
+    try:
+        wait = min(
+            request.args.get("wait", 0, type=float), settings.JOB_MAX_WAIT_SECONDS
+        )
+        job = job_queue.get(job_id, wait=wait)
+
+        if job is None:
+            return jsonify(success=False, message="Job not found"), 404
+
+        return jsonify(success=True, job=job)
+
+    except Exception as e:
+        logger.error(f"Error when fetching job: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return jsonify(
+            success=False, message="Internal server error, please try again."
+        )
+
+
+@flask_app.route("/admission/stats")
+def admission_stats():
+    return jsonify(success=True, stats=admission.stats())
@@ -0,0 +1,123 @@
+import json
+import shutil
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src import settings
+from src.logger import get_logger
+from src.text_extractor.constants import is_image_name
+from src.web_app.upload_request import spooled_file
+
+logger = get_logger(__name__)
+
+ZIP_MIMETYPES = {"application/zip", "application/x-zip-compressed"}
+
+
+def iter_zip_pages(archive):
+    with zipfile.ZipFile(archive) as zip_file:
+        for info in sorted(zip_file.infolist(), key=lambda info: info.filename):
+            if info.is_dir() or not is_image_name(info.filename):
+                continue
+
+            # Pages are only read when the pool has room for them
+            def read(info=info):
+                if info.file_size > settings.EXTRACT_MAX_BYTES:
+                    raise ValueError("The image is too large.")
+                with zip_file.open(info) as file:
+                    return file.read()
+
+            yield info.filename, read
+
+
+def iter_uploaded_pages(request):
+    if request.mimetype in ZIP_MIMETYPES:
+        with spooled_file(0) as body:
+            shutil.copyfileobj(request.stream, body)
+            body.seek(0)
+            yield from iter_zip_pages(body)
+        return
+
+    for file in request.files.getlist("files"):
+        if file.filename == "":
+            continue
+
+        if file.mimetype in ZIP_MIMETYPES or file.filename.lower().endswith(".zip"):
+            yield from iter_zip_pages(file.stream)
+        else:
+            yield file.filename, file.stream.read
+
+
+def load_page(read):
+    # Pages are read by the request thread, while the archive they come from is still
+    # open, and the workers only get their bytes or their error
+    try:
+        data = read()
+    except Exception as e:
+        error = e
+
+        def fail():
+            raise error
+
+        return fail
+    return lambda: data
+
+
+def process_page(handler, index, filename, read):
+    start = time.perf_counter()
+    line = {"index": index, "filename": filename}
+
+    try:
+        text = handler(read())
+        if text is False or text is None:
+            line.update(success=False, message="Processing failed,  please try again.")
+        else:
+            line.update(success=True, result=text)
+    except Exception as e:
+        logger.error(f"Error when processing batch page {filename}: {e}")
+        line.update(success=False, message=str(e))
+
+    line["seconds"] = time.perf_counter() - start
+    return line
+
+
+def iter_batch_results(pages, handler, workers):
+    processed = 0
+    failed = 0
+    error = None
+
+    def finished(futures):
+        nonlocal processed, failed
+        for future in futures:
+            line = future.result()
+            processed += 1
+            failed += not line["success"]
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    # At most `workers` pages are read and in flight at once, so memory does not
+    # grow with the size of the batch
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        try:
+            for index, (filename, read) in enumerate(pages):
+                if len(pending) >= workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from finished(done)
+                pending.add(
+                    executor.submit(
+                        process_page, handler, index, filename, load_page(read)
+                    )
+                )
+        except Exception as e:
+            # A broken archive stops the batch, pages already submitted still finish
+            logger.error(f"Error when reading batch: {e}")
+            error = str(e)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from finished(done)
+
+    summary = {"done": True, "pages": processed, "failed": failed}
+    if error is not None:
+        summary["error"] = error
+    yield json.dumps(summary) + "\n"
@@ -0,0 +1,360 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+from collections import deque
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def describe_job(job, queue_position):
+    now = time.time()
+    started_at = job["started_at"]
+    finished_at = job["finished_at"]
+
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "queue_position": queue_position,
+        "submitted_at": job["submitted_at"],
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "queue_seconds": (started_at or now) - job["submitted_at"],
+        "run_seconds": (finished_at or now) - started_at if started_at else None,
+        "result": job["result"],
+        "error": job["error"],
+    }
+
+
+def new_job(payload):
+    return {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "payload": payload,
+        "result": None,
+        "error": None,
+        "submitted_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+class MemoryJobStore:
+
+    def __init__(self, retention_seconds):
+        self.retention_seconds = retention_seconds
+        self.jobs = {}
+        self.queue = deque()
+        self.condition = threading.Condition()
+
+    def submit(self, payload):
+        job = new_job(payload)
+        with self.condition:
+            self.jobs[job["id"]] = job
+            self.queue.append(job["id"])
+            self.condition.notify_all()
+        return job["id"]
+
+    def claim(self, timeout):
+        with self.condition:
+            if not self.queue:
+                self.condition.wait(timeout)
+            if not self.queue:
+                return None
+
+            job = self.jobs[self.queue.popleft()]
+            job["status"] = RUNNING
+            job["started_at"] = time.time()
+            return dict(job)
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self.condition:
+            job = self.jobs[job_id]
+            job.update(
+                status=status, result=result, error=error, finished_at=time.time()
+            )
+            self.condition.notify_all()
+
+    def get(self, job_id):
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+
+            position = None
+            if job["status"] == QUEUED:
+                position = self.queue.index(job_id)
+            return describe_job(job, position)
+
+    def wait(self, job_id, timeout):
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                job = self.jobs.get(job_id)
+                remaining = deadline - time.time()
+                if job is None or job["status"] in (DONE, FAILED) or remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+        return self.get(job_id)
+
+    def purge(self):
+        cutoff = time.time() - self.retention_seconds
+        with self.condition:
+            for job_id, job in list(self.jobs.items()):
+                if job["finished_at"] and job["finished_at"] < cutoff:
+                    del self.jobs[job_id]
+
+    def requeue_orphans(self):
+        pass
+
+
+class SqliteJobStore:
+
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, path, retention_seconds):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT UNIQUE NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    pid INTEGER,
+                    submitted_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_seq ON jobs (status, seq)"
+            )
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def row_to_job(self, row):
+        job = dict(
+            zip(
+                (
+                    "seq",
+                    "id",
+                    "status",
+                    "payload",
+                    "result",
+                    "error",
+                    "pid",
+                    "submitted_at",
+                    "started_at",
+                    "finished_at",
+                ),
+                row,
+            )
+        )
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, payload):
+        job = new_job(payload)
+        with self.connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, status, payload, submitted_at) VALUES (?, ?, ?, ?)",
+                (job["id"], QUEUED, json.dumps(payload), job["submitted_at"]),
+            )
+        return job["id"]
+
+    def claim(self, timeout):
+        deadline = time.time() + timeout
+        while True:
+            connection = self.connect()
+            try:
+                # BEGIN IMMEDIATE takes the write lock so two workers never claim the same job
+                connection.execute("BEGIN IMMEDIATE")
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY seq LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is not None:
+                    job = self.row_to_job(row)
+                    job["started_at"] = time.time()
+                    connection.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, pid = ? WHERE id = ?",
+                        (RUNNING, job["started_at"], os.getpid(), job["id"]),
+                    )
+                connection.execute("COMMIT")
+            finally:
+                connection.close()
+
+            if row is not None:
+                job["status"] = RUNNING
+                return job
+            if time.time() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ?",
+                (status, json.dumps(result), error, time.time(), job_id),
+            )
+
+    def get(self, job_id):
+        with self.connect() as connection:
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            job = self.row_to_job(row)
+            position = None
+            if job["status"] == QUEUED:
+                position = connection.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND seq < ?",
+                    (QUEUED, job["seq"]),
+                ).fetchone()[0]
+        return describe_job(job, position)
+
+    def wait(self, job_id, timeout):
+        deadline = time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if (
+                job is None
+                or job["status"] in (DONE, FAILED)
+                or time.time() >= deadline
+            ):
+                return job
+            time.sleep(self.POLL_INTERVAL)
+
+    def purge(self):
+        cutoff = time.time() - self.retention_seconds
+        with self.connect() as connection:
+            connection.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (cutoff,),
+            )
+
+    def requeue_orphans(self):
+        # Jobs left running by a worker process that no longer exists go back to the queue
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT id, pid FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            for job_id, pid in rows:
+                if pid is not None and not pid_alive(pid):
+                    connection.execute(
+                        "UPDATE jobs SET status = ?, started_at = NULL, pid = NULL "
+                        "WHERE id = ? AND status = ?",
+                        (QUEUED, job_id, RUNNING),
+                    )
+                    logger.info(f"Requeued orphaned job: {job_id}")
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+
+    CLAIM_TIMEOUT = 1.0
+    PURGE_INTERVAL = 60
+
+    def __init__(self, store, workers, handler):
+        self.store = store
+        self.workers = workers
+        self.handler = handler
+        self.threads = []
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def start(self):
+        with self.lock:
+            # Threads do not survive a fork, so a forked worker starts its own
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.store.requeue_orphans()
+
+            self.threads = [
+                threading.Thread(
+                    target=self.work, name=f"job-worker-{index}", daemon=True
+                )
+                for index in range(self.workers)
+            ]
+            for thread in self.threads:
+                thread.start()
+
+    def submit(self, payload):
+        self.start()
+        return self.store.submit(payload)
+
+    def get(self, job_id, wait=0):
+        self.start()
+        if wait > 0:
+            return self.store.wait(job_id, wait)
+        return self.store.get(job_id)
+
+    def work(self):
+        last_purge = time.time()
+        while True:
+            try:
+                job = self.store.claim(self.CLAIM_TIMEOUT)
+                if job is not None:
+                    self.run(job)
+
+                if time.time() - last_purge > self.PURGE_INTERVAL:
+                    self.store.purge()
+                    last_purge = time.time()
+            except Exception as e:
+                logger.error(f"Error in job worker: {e}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                time.sleep(self.CLAIM_TIMEOUT)
+
+    def run(self, job):
+        try:
+            result = self.handler(job["payload"])
+        except Exception as e:
+            logger.error(f"Error when running job {job['id']}: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            self.store.finish(job["id"], FAILED, error=str(e))
+            return
+
+        if result is False:
+            self.store.finish(job["id"], FAILED, error="Processing failed")
+        else:
+            self.store.finish(job["id"], DONE, result=result)
+
+
+def create_job_store(backend, path, retention_seconds):
+    if backend == "memory":
+        return MemoryJobStore(retention_seconds)
+    if backend == "sqlite":
+        return SqliteJobStore(path, retention_seconds)
+    raise ValueError(f"Unknown job store: {backend}")
@@ -0,0 +1,121 @@
+import os
+import time
+import traceback
+from flask import Response, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+UPLOAD_ENDPOINTS = {"upload_file", "upload_cropped_file", "extract_file"}
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route",
+    ["route", "method", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being handled",
+    multiprocess_mode="livesum",
+)
+UPLOAD_SIZE = Histogram(
+    "upload_size_bytes",
+    "Size of uploaded request bodies",
+    ["route"],
+    buckets=(1e4, 5e4, 1e5, 5e5, 1e6, 2e6, 5e6, 1e7, 2e7, 5e7),
+)
+STAGE_LATENCY = Histogram(
+    "text_extractor_stage_duration_seconds",
+    "Time spent in each TextExtractor stage",
+    ["stage"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+TESSERACT_CALLS = Counter(
+    "tesseract_calls_total",
+    "Regions sent to Tesseract",
+)
+REGIONS_PER_PAGE = Histogram(
+    "text_extractor_regions_per_page",
+    "Text regions found per page",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+PENDING_DELETIONS = Gauge(
+    "pending_file_deletions",
+    "Uploaded files waiting to be deleted",
+    multiprocess_mode="livemax",
+)
+UPLOAD_BYTES = Gauge(
+    "upload_folder_bytes",
+    "Bytes used by uploaded files waiting to be deleted",
+    multiprocess_mode="livemax",
+)
+SWEPT_FILES = Counter(
+    "swept_upload_files_total",
+    "Uploaded files deleted by the sweeper",
+    ["reason"],
+)
+
+
+def observe_extractor(extractor):
+    # Metrics must never fail a request
+    try:
+        for stage, seconds in extractor.timings.items():
+            STAGE_LATENCY.labels(stage).observe(seconds)
+
+        if extractor.region_stats:
+            REGIONS_PER_PAGE.observe(extractor.region_stats["regions"])
+            TESSERACT_CALLS.inc(extractor.region_stats["misses"])
+    except Exception as e:
+        logger.error(f"Error when recording extractor metrics: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+
+
+def before_request():
+    request.metrics_start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+
+
+def after_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_LATENCY.labels(route, request.method, response.status_code).observe(
+        time.perf_counter() - request.metrics_start
+    )
+
+    if request.endpoint in UPLOAD_ENDPOINTS and request.content_length:
+        UPLOAD_SIZE.labels(route).observe(request.content_length)
+
+    return response
+
+
+def teardown_request(error=None):
+    REQUESTS_IN_FLIGHT.dec()
+
+
+def metrics():
+    registry = REGISTRY
+
+    # Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR,
+    # whichever worker serves the scrape aggregates all of them
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
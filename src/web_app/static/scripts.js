@@ -11,6 +11,7 @@ const clearButton = document.getElementById('clear-button');
 const resultInput = document.getElementById('result-input');
 let uploadedFileName = '';
 let cropper;
+let roi = null;
 
 uploadContainer.addEventListener('click', () => fileInput.click());
 
@@ -56,6 +57,7 @@ function handleFileUpload(file) {
             processButton.style.display = 'inline-block';
             clearButton.style.display = 'inline-block';
             uploadedFileName = data.filename;
+            roi = null;
         } else {
             messageDiv.textContent = data.message;
         }
@@ -91,42 +93,34 @@ cropButton.addEventListener('click', () => {
 });
 
 FinishCropButton.addEventListener('click', () => {
-    const canvas = cropper.getCroppedCanvas();
-    canvas.toBlob((blob) => {
-        const formData = new FormData();
-        formData.append('croppedImage', blob, uploadedFileName);
-
-        fetch(`/upload_cropped/${uploadedFileName}`, {
-            method: 'POST',
-            body: formData,
-        })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                messageDiv.textContent = data.message;
-                imagePreview.src = data.file_url + '?t=' + new Date().getTime();
-                imagePreview.style.display = 'block';
-                FinishCropButton.style.display = 'none';
-                cropButton.style.display = 'inline-block';
-                processButton.style.display = 'inline-block';
-                cropper.destroy();
-            } else {
-                messageDiv.style.color = 'red';
-                messageDiv.textContent = data.message;
-            }
-        })
-        .catch(error => {
-            messageDiv.style.color = 'red';
-            messageDiv.textContent = 'An error occurred while uploading the cropped image.';
-            console.error('Error:', error);
-        });
-    });
+    // The crop is sent as coordinates in the original upload, the server
+    // already has the image
+    const data = cropper.getData(true);
+    const offsetX = roi ? roi.x : 0;
+    const offsetY = roi ? roi.y : 0;
+    roi = {
+        x: offsetX + data.x,
+        y: offsetY + data.y,
+        width: data.width,
+        height: data.height,
+    };
+
+    imagePreview.src = cropper.getCroppedCanvas().toDataURL();
+    imagePreview.style.display = 'block';
+    FinishCropButton.style.display = 'none';
+    cropButton.style.display = 'inline-block';
+    processButton.style.display = 'inline-block';
+    cropper.destroy();
 });
 
-processButton.addEventListener('click', () => {
-    fetch(`/process/${uploadedFileName}`, {
-        method: 'POST'
-    })
+function processWithFetch() {
+    const options = {method: 'POST'};
+    if (roi) {
+        options.headers = {'Content-Type': 'application/json'};
+        options.body = JSON.stringify({rois: [roi]});
+    }
+
+    fetch(`/process/${uploadedFileName}`, options)
     .then(response => response.json())
     .then(data => {
         if (data.success) {
@@ -142,6 +136,53 @@ processButton.addEventListener('click', () => {
         messageDiv.textContent = 'An error occurred while processing the file.';
         console.error('Error:', error);
     });
+}
+
+function processWithEvents() {
+    const source = new EventSource(`/process_stream/${uploadedFileName}`);
+    const texts = [];
+    let received = false;
+
+    resultInput.value = '';
+    resultInput.style.display = 'block';
+
+    source.addEventListener('region', (event) => {
+        const region = JSON.parse(event.data);
+        received = true;
+        texts[region.index] = region.text;
+        resultInput.value = texts.filter(text => text).join('\n');
+    });
+
+    source.addEventListener('done', (event) => {
+        const data = JSON.parse(event.data);
+        source.close();
+        messageDiv.textContent = data.message;
+        resultInput.value = data.result;
+    });
+
+    source.addEventListener('failed', (event) => {
+        const data = JSON.parse(event.data);
+        source.close();
+        messageDiv.style.color = 'red';
+        messageDiv.textContent = data.message;
+    });
+
+    source.onerror = () => {
+        source.close();
+        // Without any event the stream never started, so the regular
+        // endpoint still gets a chance to process the file
+        if (!received) {
+            processWithFetch();
+        }
+    };
+}
+
+processButton.addEventListener('click', () => {
+    if (window.EventSource && !roi) {
+        processWithEvents();
+    } else {
+        processWithFetch();
+    }
 });
 
 clearButton.addEventListener('click', () => {
@@ -0,0 +1,234 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+import traceback
+from werkzeug.security import safe_join
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def write_stream(stream, path):
+    # Chunks go to a temp file renamed into place, so readers never see a partial
+    # file and memory does not grow with the upload
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            shutil.copyfileobj(stream, file, CHUNK_SIZE)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def list_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    with os.scandir(directory) as entries:
+        return [
+            entry.name
+            for entry in entries
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        ]
+
+
+def checked_path(directory, name):
+    path = safe_join(directory, name)
+    if path is None:
+        raise FileNotFoundError(f"Invalid upload name: {name}")
+    return path
+
+
+class LocalStorage:
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def path(self, name):
+        return checked_path(self.folder, name)
+
+    def save(self, name, stream):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_stream(stream, path)
+
+    def open(self, name):
+        return open(self.path(name), "rb")
+
+    def stat(self, name):
+        stat = os.stat(self.path(name))
+        return stat.st_size, stat.st_mtime
+
+    def delete(self, name):
+        # Invalid names are never stored, so they are as gone as missing files
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def list(self):
+        return list_files(self.folder)
+
+    def local_path(self, name):
+        # Uploads are processed in place
+        path = self.path(name)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Upload not found: {name}")
+        return path
+
+
+class DirectoryObjectStore:
+
+    # A directory every node mounts, such as an NFS share
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def put(self, key, stream):
+        write_stream(stream, checked_path(self.directory, key))
+
+    def get(self, key):
+        return open(checked_path(self.directory, key), "rb")
+
+    def head(self, key):
+        try:
+            stat = os.stat(checked_path(self.directory, key))
+        except FileNotFoundError:
+            return None
+        return {"size": stat.st_size, "modified": stat.st_mtime}
+
+    def delete(self, key):
+        try:
+            os.remove(checked_path(self.directory, key))
+        except FileNotFoundError:
+            pass
+
+    def list(self):
+        return list_files(self.directory)
+
+
+class ReadThroughCache:
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def entry_path(self, name, version):
+        # A new version of an upload is a new entry, older ones age out
+        digest = hashlib.sha256(f"{name}|{version}".encode()).hexdigest()
+        return os.path.join(self.directory, digest + os.path.splitext(name)[1])
+
+    def fetch(self, name, version, open_stream):
+        path = self.entry_path(name, version)
+        if os.path.exists(path):
+            os.utime(path)
+            with self.lock:
+                self.hits += 1
+            return path
+
+        with self.lock:
+            self.misses += 1
+        with open_stream() as stream:
+            write_stream(stream, path)
+        self.prune(keep=path)
+        return path
+
+    def prune(self, keep=None):
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(self.directory)
+                if entry.is_file() and not entry.name.endswith(".tmp")
+            ]
+            size = sum(entry.stat().st_size for entry in entries)
+
+            # Least recently used first, a hit touches its entry
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries:
+                if size <= self.max_bytes:
+                    break
+                if entry.path == keep:
+                    continue
+                try:
+                    size -= entry.stat().st_size
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+        except Exception as e:
+            logger.error(f"Error when pruning upload cache: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+
+    def clear(self):
+        for name in list_files(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                "directory": self.directory,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class SharedStorage:
+
+    def __init__(self, store, cache):
+        self.store = store
+        self.cache = cache
+
+    def save(self, name, stream):
+        checked_path("/", name)
+        self.store.put(name, stream)
+
+    def open(self, name):
+        return self.store.get(name)
+
+    def stat(self, name):
+        head = self.store.head(name)
+        if head is None:
+            raise FileNotFoundError(f"Upload not found: {name}")
+        return head["size"], head["modified"]
+
+    def delete(self, name):
+        self.store.delete(name)
+
+    def list(self):
+        return self.store.list()
+
+    def local_path(self, name):
+        # The store is asked first, so a deleted or replaced upload is never read
+        # from a stale copy
+        size, modified = self.stat(name)
+        return self.cache.fetch(
+            name, f"{size}-{modified}", lambda: self.store.get(name)
+        )
+
+
+def create_storage(backend, folder, shared_dir=None, cache_dir=None, cache_max_bytes=0):
+    if backend == "local":
+        return LocalStorage(folder)
+
+    if backend == "shared":
+        if not shared_dir:
+            raise ValueError("UPLOAD_SHARED_DIR is required for shared upload storage")
+        return SharedStorage(
+            DirectoryObjectStore(shared_dir),
+            ReadThroughCache(cache_dir, cache_max_bytes),
+        )
+
+    raise ValueError(f"Unknown upload storage: {backend}")
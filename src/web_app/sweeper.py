@@ -0,0 +1,222 @@
+import os
+import time
+import fcntl
+import sqlite3
+import threading
+import traceback
+
+from src.logger import get_logger
+from src.web_app.metrics import PENDING_DELETIONS, SWEPT_FILES, UPLOAD_BYTES
+
+logger = get_logger(__name__)
+
+
+class UploadSweeper:
+
+    def __init__(
+        self,
+        get_storage,
+        index_path,
+        ttl_seconds,
+        quota_bytes,
+        interval_seconds,
+        batch_size,
+    ):
+        # Resolved on every use, so the sweeper always works on the storage the
+        # routes save uploads to
+        self.get_storage = get_storage
+        self.index_path = index_path
+        self.lock_path = f"{index_path}.lock"
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = quota_bytes
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.lock_file = None
+        self.pid = None
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Rows hold upload names in the storage, under the original column name
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS uploads (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS uploads_expires_at ON uploads (expires_at)"
+            )
+            # The totals are kept up to date on every change, so the quota check
+            # never has to scan the index
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    files INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+                """)
+            connection.execute("INSERT OR IGNORE INTO totals VALUES (0, 0, 0)")
+
+    def connect(self):
+        return sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+
+    def track(self, name):
+        size, modified = self.get_storage().stat(name)
+        expires_at = modified + self.ttl_seconds
+
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT size FROM uploads WHERE path = ?", (name,)
+            ).fetchone()
+            if row is None:
+                connection.execute(
+                    "UPDATE totals SET files = files + 1, bytes = bytes + ?", (size,)
+                )
+            else:
+                connection.execute(
+                    "UPDATE totals SET bytes = bytes + ?", (size - row[0],)
+                )
+            connection.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?)",
+                (name, size, expires_at),
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def totals(self):
+        with self.connect() as connection:
+            files, size = connection.execute(
+                "SELECT files, bytes FROM totals"
+            ).fetchone()
+        return {"files": files, "bytes": size}
+
+    def remove(self, connection, rows, reason):
+        storage = self.get_storage()
+        for name, size in rows:
+            storage.delete(name)
+            logger.info(f"Deleted file: {name}")
+            connection.execute("DELETE FROM uploads WHERE path = ?", (name,))
+            connection.execute(
+                "UPDATE totals SET files = files - 1, bytes = bytes - ?", (size,)
+            )
+        SWEPT_FILES.labels(reason=reason).inc(len(rows))
+
+    def sweep(self, now=None):
+        now = time.time() if now is None else now
+        connection = self.connect()
+        try:
+            # Each pass touches at most batch_size rows per reason, whatever the
+            # number of pending uploads
+            connection.execute("BEGIN IMMEDIATE")
+            expired = connection.execute(
+                "SELECT path, size FROM uploads WHERE expires_at <= ? "
+                "ORDER BY expires_at LIMIT ?",
+                (now, self.batch_size),
+            ).fetchall()
+            self.remove(connection, expired, "expired")
+
+            evicted = []
+            (size,) = connection.execute("SELECT bytes FROM totals").fetchone()
+            if size > self.quota_bytes:
+                for name, file_size in connection.execute(
+                    "SELECT path, size FROM uploads ORDER BY expires_at LIMIT ?",
+                    (self.batch_size,),
+                ).fetchall():
+                    if size <= self.quota_bytes:
+                        break
+                    evicted.append((name, file_size))
+                    size -= file_size
+            self.remove(connection, evicted, "quota")
+
+            files, size = connection.execute(
+                "SELECT files, bytes FROM totals"
+            ).fetchone()
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+        PENDING_DELETIONS.set(files)
+        UPLOAD_BYTES.set(size)
+        return {"expired": len(expired), "evicted": len(evicted)}
+
+    def reconcile(self):
+        # Uploads written while no sweeper was running are picked up once, by
+        # their mtime, when a sweeper takes over
+        with self.connect() as connection:
+            indexed = {
+                name for (name,) in connection.execute("SELECT path FROM uploads")
+            }
+        for name in self.get_storage().list():
+            if name not in indexed:
+                try:
+                    self.track(name)
+                except FileNotFoundError:
+                    # Deleted by another node since it was listed
+                    pass
+
+    def try_lead(self):
+        if self.lock_file is not None:
+            return True
+
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        # The lock is released by the kernel when the process exits, so another
+        # worker on the host takes over on its next attempt
+        self.lock_file = lock_file
+        logger.info(f"Upload sweeper elected in process {os.getpid()}")
+        self.reconcile()
+        return True
+
+    def start(self):
+        with self.lock:
+            # Threads do not survive a fork, so a forked worker starts its own
+            if self.pid == os.getpid():
+                return
+            if self.lock_file is not None:
+                self.lock_file.close()
+                self.lock_file = None
+            self.pid = os.getpid()
+
+            threading.Thread(
+                target=self.run, name="upload-sweeper", daemon=True
+            ).start()
+
+    def run(self):
+        while True:
+            try:
+                if self.try_lead():
+                    self.sweep()
+            except Exception as e:
+                logger.error(f"Error when sweeping uploads: {e}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+            time.sleep(self.interval_seconds)
+
+    def clear(self):
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute("SELECT path, size FROM uploads").fetchall()
+            self.remove(connection, rows, "shutdown")
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
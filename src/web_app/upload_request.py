@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+from flask import Request
+
+from src import settings
+
+
+def upload_limits(endpoint):
+    # (max body size, in-memory spool threshold) of the endpoints that stream uploads.
+    # Every part of a batch is parsed before its first page runs, so batch parts go
+    # straight to disk, whatever their number
+    limits = {
+        "extract_file": (settings.EXTRACT_MAX_BYTES, settings.SPOOL_THRESHOLD_BYTES),
+        "batch_extract": (settings.BATCH_MAX_BYTES, 0),
+    }
+    return limits.get(endpoint)
+
+
+def spooled_file(max_size=None):
+    if max_size is None:
+        max_size = settings.SPOOL_THRESHOLD_BYTES
+    if max_size == 0:
+        # A spooled file with no threshold would never leave memory
+        return tempfile.TemporaryFile()
+    return tempfile.SpooledTemporaryFile(max_size=max_size)
+
+
+class UploadRequest(Request):
+
+    @property
+    def streamed_limits(self):
+        if self.url_rule is None:
+            return None
+        return upload_limits(self.url_rule.endpoint)
+
+    @property
+    def max_content_length(self):
+        # The limit is enforced by werkzeug while the body streams in
+        limits = self.streamed_limits
+        if limits is not None:
+            return limits[0]
+        return super().max_content_length
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        # Uploads stay in memory up to the spool threshold instead of 500KB
+        limits = self.streamed_limits
+        return spooled_file(limits[1] if limits is not None else None)
+
+
+def read_upload(request):
+    if request.mimetype == "multipart/form-data":
+        file = request.files.get("file")
+        if file is None or file.filename == "":
+            return None
+        return file.stream.read()
+
+    # Raw image body, copied in chunks so only the spool threshold lives in memory
+    with spooled_file() as body:
+        shutil.copyfileobj(request.stream, body)
+        body.seek(0)
+        return body.read() or None
@@ -1,47 +1,54 @@
 import os
 import traceback
-from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
 from src.logger import get_logger
-
-scheduler = BackgroundScheduler()
-scheduler.start()
+from src.web_app.sweeper import UploadSweeper
+from src.web_app.storage import SharedStorage, create_storage
+from src import settings
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
+UPLOAD_FOLDER = settings.UPLOAD_FOLDER or os.path.join(BASE_DIR, "uploads")
 
 logger = get_logger(__name__)
 
+storage = create_storage(
+    settings.UPLOAD_STORAGE,
+    UPLOAD_FOLDER,
+    settings.UPLOAD_SHARED_DIR,
+    settings.UPLOAD_CACHE_DIR or os.path.join(BASE_DIR, "upload_cache"),
+    settings.UPLOAD_CACHE_MAX_BYTES,
+)
 
-def delete_file(file_path):
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            logger.info(f"Deleted file: {file_path}")
-    except Exception as e:
-        logger.error(f"Error when deleting file: {e}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+sweeper = UploadSweeper(
+    lambda: storage,
+    settings.UPLOAD_INDEX_PATH or os.path.join(BASE_DIR, "uploads.sqlite3"),
+    settings.UPLOAD_TTL_SECONDS,
+    settings.UPLOAD_QUOTA_BYTES,
+    settings.UPLOAD_SWEEP_INTERVAL_SECONDS,
+    settings.UPLOAD_SWEEP_BATCH_SIZE,
+)
 
 
 def clean_uploads():
     try:
-        for file in os.listdir(UPLOAD_FOLDER):
-            file_path = os.path.join(UPLOAD_FOLDER, file)
-            os.remove(file_path)
-            logger.info(f"Deleted file: {file_path}")
+        storage = sweeper.get_storage()
+        if isinstance(storage, SharedStorage):
+            # Other nodes keep serving the shared uploads, only local copies go
+            storage.cache.clear()
+            return
+
+        sweeper.clear()
+        for name in storage.list():
+            storage.delete(name)
+            logger.info(f"Deleted file: {name}")
     except Exception as e:
         logger.error(f"Error when cleaning uploads: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
 
 
-def schedule_file_delete(file_path):
+def schedule_file_delete(name):
     try:
-        scheduler.add_job(
-            delete_file,
-            "date",
-            run_date=datetime.now() + timedelta(minutes=10),
-            args=[file_path],
-        )
+        sweeper.track(name)
+        sweeper.start()
     except Exception as e:
         logger.error(f"Error when scheduling file delete: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
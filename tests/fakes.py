@@ -0,0 +1,37 @@
+import io
+import time
+import threading
+
+
+class MemoryObjectStore:
+
+    # In-process stand-in for an object store, shared by the nodes of a test
+    def __init__(self):
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def put(self, key, stream):
+        data = stream.read()
+        with self.lock:
+            self.objects[key] = (data, time.time())
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.objects:
+                raise FileNotFoundError(f"Object not found: {key}")
+            return io.BytesIO(self.objects[key][0])
+
+    def head(self, key):
+        with self.lock:
+            if key not in self.objects:
+                return None
+            data, modified = self.objects[key]
+        return {"size": len(data), "modified": modified}
+
+    def delete(self, key):
+        with self.lock:
+            self.objects.pop(key, None)
+
+    def list(self):
+        with self.lock:
+            return list(self.objects)
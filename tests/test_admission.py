@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from PIL import Image
+
+from src.text_extractor.constants import Constants
+from src.web_app.admission import (
+    FRAME_BYTES_PER_PIXEL,
+    SCALED_BYTES_PER_PIXEL,
+    AdmissionController,
+    AdmissionRejected,
+    estimate_cost,
+    pipeline_cost,
+)
+
+
+class TestAdmission(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.controller = AdmissionController(
+            os.path.join(self.temp_dir.name, "admission.sqlite3"),
+            budget_bytes=1000,
+            max_wait_seconds=0,
+            retry_after_seconds=5,
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @patch("src.web_app.admission.settings")
+    def test_estimate_cost_from_header(self, mock_settings):
+        mock_settings.TILE_SIZE = None
+        file_path = os.path.join(self.temp_dir.name, "image.png")
+        Image.new("RGB", (30, 20)).save(file_path)
+
+        mock_settings.SCALING = Constants.FIXED_SCALING
+        self.assertEqual(
+            estimate_cost(file_path),
+            30 * 20 * (FRAME_BYTES_PER_PIXEL + 4 * SCALED_BYTES_PER_PIXEL),
+        )
+        # Adaptive scaling may upscale small glyphs up to MAX_SCALE
+        mock_settings.SCALING = Constants.ADAPTIVE_SCALING
+        self.assertEqual(
+            estimate_cost(file_path),
+            30 * 20 * (FRAME_BYTES_PER_PIXEL + 16 * SCALED_BYTES_PER_PIXEL),
+        )
+
+    def test_pipeline_cost_tiled(self):
+        whole = pipeline_cost(800, 6000, 4.0)
+        tiled = pipeline_cost(800, 6000, 4.0, tile_size=1024, tile_overlap=256)
+
+        # Only the frame is held whole, the scaled buffers cover one band
+        self.assertEqual(
+            tiled,
+            800 * 6000 * FRAME_BYTES_PER_PIXEL
+            + 800 * 1536 * 16 * SCALED_BYTES_PER_PIXEL,
+        )
+        self.assertLess(tiled, whole)
+        # A page that fits in one band is not tiled
+        self.assertEqual(
+            pipeline_cost(800, 1000, 4.0, tile_size=1024, tile_overlap=256),
+            pipeline_cost(800, 1000, 4.0),
+        )
+
+    def test_estimate_cost_not_an_image(self):
+        file_path = os.path.join(self.temp_dir.name, "image.png")
+        with open(file_path, "wb") as f:
+            f.write(b"test image data")
+
+        self.assertEqual(estimate_cost(file_path), 0)
+
+    def test_admit_within_budget(self):
+        with self.controller.admit(600):
+            self.assertEqual(self.controller.stats()["in_use_bytes"], 600)
+
+        stats = self.controller.stats()
+        self.assertEqual(stats["in_use_bytes"], 0)
+        self.assertEqual(stats["admitted"], 1)
+
+    def test_reject_when_budget_exhausted(self):
+        with self.controller.admit(600):
+            with self.assertRaises(AdmissionRejected) as context:
+                with self.controller.admit(600):
+                    pass
+
+        self.assertEqual(context.exception.status_code, 429)
+        self.assertEqual(context.exception.retry_after, 5)
+        stats = self.controller.stats()
+        self.assertEqual(stats["queued"], 1)
+        self.assertEqual(stats["rejected"], 1)
+
+    def test_stats_shared_by_workers(self):
+        other = AdmissionController(
+            self.controller.path,
+            budget_bytes=1000,
+            max_wait_seconds=0,
+            retry_after_seconds=5,
+        )
+
+        with other.admit(600):
+            pass
+        with self.assertRaises(AdmissionRejected):
+            other.acquire(2000)
+
+        stats = self.controller.stats()
+        self.assertEqual(stats["admitted"], 1)
+        self.assertEqual(stats["rejected"], 1)
+
+    def test_reject_larger_than_budget(self):
+        with self.assertRaises(AdmissionRejected) as context:
+            self.controller.acquire(2000)
+
+        self.assertEqual(context.exception.status_code, 413)
+
+    def test_release_leases_of_dead_processes(self):
+        self.controller.acquire(1000)
+        with self.controller.connect() as connection:
+            connection.execute("UPDATE leases SET pid = ?", (2**22 + 1,))
+
+        with self.controller.admit(1000):
+            self.assertEqual(self.controller.stats()["active"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
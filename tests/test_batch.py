@@ -0,0 +1,152 @@
+import io
+import json
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from src.web_app.app import flask_app
+from src.web_app.batch import iter_batch_results, iter_zip_pages
+
+
+def make_zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for name, data in entries.items():
+            zip_file.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def parse_lines(body):
+    return [json.loads(line) for line in body.splitlines() if line]
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_iter_zip_pages(self):
+        archive = make_zip(
+            {"b.png": b"second", "a.png": b"first", "notes.txt": b"skip", "c/": b""}
+        )
+
+        pages = [(name, read()) for name, read in iter_zip_pages(archive)]
+
+        self.assertEqual(pages, [("a.png", b"first"), ("b.png", b"second")])
+
+    def test_iter_batch_results_bounded(self):
+        lock = threading.Lock()
+        state = {"loaded": 0, "max_loaded": 0}
+
+        def page(index):
+            def read():
+                with lock:
+                    state["loaded"] += 1
+                    state["max_loaded"] = max(state["max_loaded"], state["loaded"])
+                return index
+
+            return f"page{index}.png", read
+
+        def handler(index):
+            time.sleep(0.01)
+            with lock:
+                state["loaded"] -= 1
+            return f"text {index}"
+
+        lines = parse_lines(
+            "".join(iter_batch_results((page(i) for i in range(10)), handler, 2))
+        )
+
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(
+            sorted(line["result"] for line in lines[:-1]),
+            sorted(f"text {index}" for index in range(10)),
+        )
+        self.assertEqual(lines[-1], {"done": True, "pages": 10, "failed": 0})
+        self.assertLessEqual(state["max_loaded"], 2)
+
+    def test_iter_batch_results_failed_page(self):
+        def handler(data):
+            if data == b"broken":
+                raise ValueError("The image could not be decoded")
+            return "text"
+
+        pages = [("a.png", lambda: b"ok"), ("b.png", lambda: b"broken")]
+        lines = parse_lines("".join(iter_batch_results(iter(pages), handler, 1)))
+
+        self.assertTrue(lines[0]["success"])
+        self.assertFalse(lines[1]["success"])
+        self.assertEqual(lines[1]["message"], "The image could not be decoded")
+        self.assertEqual(lines[-1]["failed"], 1)
+
+
+class TestBatchEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = flask_app.test_client()
+
+    @patch("src.web_app.app.extract_admitted")
+    def test_batch_multipart(self, mock_extract_admitted):
+        mock_extract_admitted.side_effect = lambda data, profile: data.decode().upper()
+
+        data = {
+            "files": [
+                (io.BytesIO(b"first"), "a.png"),
+                (io.BytesIO(b"second"), "b.png"),
+            ]
+        }
+        response = self.client.post(
+            "/batch", data=data, content_type="multipart/form-data"
+        )
+
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = parse_lines(response.get_data(as_text=True))
+        results = {line["filename"]: line["result"] for line in lines[:-1]}
+        self.assertEqual(results, {"a.png": "FIRST", "b.png": "SECOND"})
+        self.assertEqual(lines[-1]["pages"], 2)
+
+    @patch("src.web_app.app.extract_admitted")
+    def test_batch_zip_body(self, mock_extract_admitted):
+        mock_extract_admitted.side_effect = lambda data, profile: data.decode().upper()
+
+        response = self.client.post(
+            "/batch",
+            data=make_zip({"a.png": b"first"}).getvalue(),
+            content_type="application/zip",
+        )
+
+        lines = parse_lines(response.get_data(as_text=True))
+        self.assertEqual(lines[0]["result"], "FIRST")
+        self.assertEqual(lines[-1], {"done": True, "pages": 1, "failed": 0})
+
+    def test_batch_broken_zip(self):
+        response = self.client.post(
+            "/batch", data=b"not a zip", content_type="application/zip"
+        )
+
+        lines = parse_lines(response.get_data(as_text=True))
+        self.assertEqual(lines[-1]["pages"], 0)
+        self.assertIn("error", lines[-1])
+
+    @patch("src.web_app.upload_request.settings")
+    def test_batch_too_large(self, mock_settings):
+        mock_settings.BATCH_MAX_BYTES = 10
+
+        response = self.client.post(
+            "/batch", data=b"x" * 100, content_type="application/zip"
+        )
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_batch_parts_spooled_to_disk(self):
+        with flask_app.test_request_context("/batch", method="POST") as context:
+            stream = context.request._get_file_stream(100, "image/png", "page.png")
+
+        with stream:
+            self.assertNotIsInstance(stream, tempfile.SpooledTemporaryFile)
+            self.assertIsInstance(stream.fileno(), int)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src.text_extractor.cache import DiskCache, FrameCache, LRUCache, ResultCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_and_set(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class TestFrameCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used_over_max_bytes(self):
+        cache = FrameCache(max_bytes=250, ttl_seconds=60)
+        frames = {key: np.zeros(100, dtype=np.uint8) for key in "abc"}
+        cache.set("a", frames["a"])
+        cache.set("b", frames["b"])
+        cache.get("a")
+        cache.set("c", frames["c"])
+
+        self.assertIs(cache.get("a"), frames["a"])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["bytes"], 200)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_skips_frames_over_max_bytes(self):
+        cache = FrameCache(max_bytes=50, ttl_seconds=60)
+        cache.set("a", np.zeros(100, dtype=np.uint8))
+
+        self.assertIsNone(cache.get("a"))
+
+    @patch("src.text_extractor.cache.time.monotonic")
+    def test_entries_expire(self, mock_monotonic):
+        cache = FrameCache(max_bytes=1000, ttl_seconds=10)
+        mock_monotonic.return_value = 0
+        cache.set("a", np.zeros(100, dtype=np.uint8))
+
+        mock_monotonic.return_value = 8
+        self.assertIsNotNone(cache.get("a"))
+        mock_monotonic.return_value = 16
+        self.assertIsNotNone(cache.get("a"))
+        mock_monotonic.return_value = 27
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_shared_between_instances(self):
+        DiskCache(self.temp_dir.name, 10).set("key", "テキスト")
+
+        self.assertEqual(DiskCache(self.temp_dir.name, 10).get("key"), "テキスト")
+        self.assertEqual(os.listdir(self.temp_dir.name), ["key.json"])
+
+    def test_prune_keeps_newest_entries(self):
+        cache = DiskCache(self.temp_dir.name, 2)
+        for index in range(4):
+            cache.set(f"key{index}", index)
+            os.utime(cache.path(f"key{index}"), (index, index))
+        cache.prune()
+
+        self.assertEqual(
+            sorted(os.listdir(self.temp_dir.name)), ["key2.json", "key3.json"]
+        )
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_make_key_depends_on_data_and_config(self):
+        key = ResultCache.make_key(b"image", {"language": "jpn"})
+
+        self.assertEqual(key, ResultCache.make_key(b"image", {"language": "jpn"}))
+        self.assertNotEqual(key, ResultCache.make_key(b"other", {"language": "jpn"}))
+        self.assertNotEqual(key, ResultCache.make_key(b"image", {"language": "eng"}))
+
+    def test_disk_tier_fills_memory_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ResultCache(8, directory).set("key", "text")
+            cache = ResultCache(8, directory)
+
+            self.assertEqual(cache.get("key"), "text")
+            self.assertEqual(cache.get("key"), "text")
+            self.assertIsNone(cache.get("missing"))
+
+            stats = cache.stats()
+            self.assertEqual(stats["hits"], 2)
+            self.assertEqual(stats["misses"], 1)
+            self.assertEqual(stats["disk"]["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from src import settings
+from src.cli import (
+    DONE,
+    FAILED,
+    SKIPPED,
+    init_worker,
+    load_manifest,
+    main,
+    run_batch,
+)
+from src.text_extractor import engine as engine_module
+from src.text_extractor.app import TextExtractor
+from src.text_extractor.constants import Constants
+
+
+def write_page(path, lines):
+    page = np.full((200, 300, 3), 255, dtype=np.uint8)
+    for line in range(lines):
+        cv2.rectangle(page, (20, 20 + line * 40), (280, 40 + line * 40), 0, -1)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(path, page)
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        engine_module._engines.clear()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.temp_dir.name, "scans")
+        self.output_dir = os.path.join(self.temp_dir.name, "text")
+        self.manifest_path = os.path.join(self.output_dir, "manifest.jsonl")
+        write_page(os.path.join(self.input_dir, "first.png"), 1)
+        write_page(os.path.join(self.input_dir, "volume", "second.png"), 2)
+        with open(os.path.join(self.input_dir, "notes.txt"), "w") as file:
+            file.write("not an image")
+
+        latency = patch.object(settings, "STUB_OCR_LATENCY_SECONDS", 0)
+        latency.start()
+        self.addCleanup(latency.stop)
+        # Workers run in this process and set the pool size
+        pool_size = patch.object(settings, "OCR_POOL_SIZE", settings.OCR_POOL_SIZE)
+        pool_size.start()
+        self.addCleanup(pool_size.stop)
+
+    def tearDown(self):
+        engine_module._engines.clear()
+        self.temp_dir.cleanup()
+
+    def run_batch(self, workers=1):
+        return run_batch(
+            self.input_dir,
+            self.output_dir,
+            workers=workers,
+            ocr_engine=Constants.STUB_ENGINE,
+        )
+
+    def read_manifest(self):
+        with open(self.manifest_path, encoding="utf-8") as manifest:
+            return [json.loads(line) for line in manifest]
+
+    def test_run_batch(self):
+        counts = self.run_batch()
+
+        self.assertEqual(counts, {DONE: 2, SKIPPED: 0, FAILED: 0})
+        for relative_path in (
+            "first.png.txt",
+            os.path.join("volume", "second.png.txt"),
+        ):
+            with open(os.path.join(self.output_dir, relative_path)) as file:
+                self.assertTrue(file.read().strip())
+
+        records = self.read_manifest()
+        self.assertEqual(
+            [record["path"] for record in records],
+            ["first.png", os.path.join("volume", "second.png")],
+        )
+        self.assertTrue(all(record["status"] == DONE for record in records))
+
+    def test_run_batch_process_pool(self):
+        counts = self.run_batch(workers=2)
+
+        self.assertEqual(counts[DONE], 2)
+        self.assertEqual(len(self.read_manifest()), 2)
+
+    def test_run_batch_resumes(self):
+        self.run_batch()
+
+        with patch.object(TextExtractor, "run") as mock_run:
+            counts = self.run_batch()
+
+        mock_run.assert_not_called()
+        self.assertEqual(counts, {DONE: 0, SKIPPED: 2, FAILED: 0})
+        self.assertEqual(len(self.read_manifest()), 2)
+
+    def test_run_batch_retries_failures(self):
+        with patch.object(TextExtractor, "run", return_value=False):
+            counts = self.run_batch()
+        self.assertEqual(counts[FAILED], 2)
+        self.assertEqual(load_manifest(self.manifest_path), {})
+
+        counts = self.run_batch()
+
+        self.assertEqual(counts, {DONE: 2, SKIPPED: 0, FAILED: 0})
+        self.assertEqual(len(load_manifest(self.manifest_path)), 2)
+
+    def test_run_batch_copies_duplicate_content(self):
+        self.run_batch()
+        write_page(os.path.join(self.input_dir, "copy.png"), 1)
+
+        with patch.object(TextExtractor, "run") as mock_run:
+            counts = self.run_batch()
+
+        mock_run.assert_not_called()
+        self.assertEqual(counts[SKIPPED], 3)
+        with open(os.path.join(self.output_dir, "copy.png.txt")) as copy, open(
+            os.path.join(self.output_dir, "first.png.txt")
+        ) as original:
+            self.assertEqual(copy.read(), original.read())
+
+        # Both outputs of the shared content are finished, reruns settle
+        records = len(self.read_manifest())
+        with patch("src.cli.shutil.copyfile") as mock_copyfile:
+            counts = self.run_batch()
+
+        mock_copyfile.assert_not_called()
+        self.assertEqual(counts[SKIPPED], 3)
+        self.assertEqual(len(self.read_manifest()), records)
+
+    def test_run_batch_duplicates_in_first_run_settle(self):
+        write_page(os.path.join(self.input_dir, "sub", "dup.png"), 1)
+        self.run_batch()
+        records = len(self.read_manifest())
+
+        with patch("src.cli.shutil.copyfile") as mock_copyfile:
+            counts = self.run_batch()
+            self.run_batch()
+
+        mock_copyfile.assert_not_called()
+        self.assertEqual(counts, {DONE: 0, SKIPPED: 3, FAILED: 0})
+        self.assertEqual(len(self.read_manifest()), records)
+
+    @patch.object(settings, "OCR_POOL_SIZE", 8)
+    def test_init_worker_single_model_pool(self):
+        init_worker({"ocr_engine": Constants.STUB_ENGINE}, {})
+
+        self.assertEqual(settings.OCR_POOL_SIZE, 1)
+
+    def test_load_manifest_ignores_truncated_line(self):
+        os.makedirs(self.output_dir)
+        with open(self.manifest_path, "w") as manifest:
+            manifest.write(
+                json.dumps({"key": "a", "status": DONE, "output": "a.txt"}) + "\n"
+            )
+            manifest.write('{"key": "b", "sta')
+
+        self.assertEqual(load_manifest(self.manifest_path), {"a": {"a.txt"}})
+
+        self.run_batch()
+
+        self.assertEqual(len(load_manifest(self.manifest_path)), 3)
+
+    @patch("src.cli.run_batch")
+    def test_main(self, mock_run_batch):
+        mock_run_batch.return_value = {DONE: 1, SKIPPED: 0, FAILED: 1}
+
+        exit_code = main([self.input_dir, self.output_dir, "--workers", "3"])
+
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(mock_run_batch.call_args.kwargs["workers"], 3)
+
+    def test_import_skips_web_app(self):
+        loaded = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, src.cli; print(sorted(m for m in sys.modules"
+                " if m.split('.')[0] == 'flask' or m.startswith('src.web_app')))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual(loaded.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
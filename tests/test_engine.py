@@ -0,0 +1,293 @@
+import threading
+import numpy as np
+import pytesseract
+import unittest
+from unittest.mock import patch, MagicMock
+from packaging.version import Version
+
+from src.text_extractor import engine as engine_module
+from src.text_extractor.constants import Constants
+from src.text_extractor.engine import (
+    PytesseractEngine,
+    StubEngine,
+    TesseractEnginePool,
+    get_ocr_engine,
+    parse_tesseract_option,
+    resolve_engine_name,
+    words_to_text,
+)
+
+
+class TestEngine(unittest.TestCase):
+
+    def setUp(self):
+        engine_module._engines.clear()
+
+    def tearDown(self):
+        engine_module._engines.clear()
+
+    def test_parse_tesseract_option(self):
+        self.assertEqual(parse_tesseract_option("--oem 1", "oem"), 1)
+        self.assertEqual(parse_tesseract_option("--oem 1 --psm 5", "psm"), 5)
+        with self.assertRaises(ValueError):
+            parse_tesseract_option("--oem 1", "psm")
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
+    def test_pytesseract_engine(self, mock_image_to_string):
+        mock_image_to_string.return_value = "Detected text"
+        image = np.zeros((10, 10), dtype=np.uint8)
+
+        text = PytesseractEngine().image_to_string(
+            image,
+            Constants.JPN_LANGUAGE,
+            Constants.ENGINE_MODE,
+            Constants.HORIZONTAL_SEGMENTATION_MODE,
+        )
+
+        self.assertEqual(text, "Detected text")
+        mock_image_to_string.assert_called_once_with(
+            image,
+            lang=Constants.JPN_LANGUAGE,
+            config=f"{Constants.ENGINE_MODE} {Constants.HORIZONTAL_SEGMENTATION_MODE}",
+        )
+
+    def test_words_to_text(self):
+        data = {
+            "block_num": [0, 1, 1, 1, 1],
+            "par_num": [0, 1, 1, 1, 1],
+            "line_num": [0, 1, 1, 2, 2],
+            "conf": [-1, 90.5, 70.5, 80.5, 0],
+            "text": ["", "日本", "語", "文章", " "],
+        }
+
+        self.assertEqual(words_to_text(data), ("日本 語\n文章\n", 80.5))
+        self.assertEqual(
+            words_to_text({key: values[:1] for key, values in data.items()}),
+            ("", None),
+        )
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_data", autospec=True)
+    def test_pytesseract_engine_recognize(self, mock_image_to_data):
+        mock_image_to_data.return_value = {
+            "block_num": [1],
+            "par_num": [1],
+            "line_num": [1],
+            "conf": [91],
+            "text": ["Detected"],
+        }
+        image = np.zeros((10, 10), dtype=np.uint8)
+
+        text, confidence = PytesseractEngine().recognize(
+            image,
+            Constants.JPN_VERT_LANGUAGE,
+            Constants.ENGINE_MODE,
+            Constants.VERTICAL_SEGMENTATION_MODE,
+        )
+
+        self.assertEqual(text, "Detected\n")
+        self.assertEqual(confidence, 91.0)
+        mock_image_to_data.assert_called_once_with(
+            image,
+            lang=Constants.JPN_VERT_LANGUAGE,
+            config=f"{Constants.ENGINE_MODE} {Constants.VERTICAL_SEGMENTATION_MODE}",
+            output_type=pytesseract.Output.DICT,
+        )
+
+    @patch("pytesseract.pytesseract.get_tesseract_version")
+    @patch("pytesseract.pytesseract.run_tesseract")
+    def test_pytesseract_engine_recognize_through_pytesseract(
+        self, mock_run_tesseract, mock_get_tesseract_version
+    ):
+        # Only the Tesseract binary is replaced, pytesseract itself runs as is
+        mock_get_tesseract_version.return_value = Version("5.3.0")
+        header = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\t"
+        header += "left\ttop\twidth\theight\tconf\ttext"
+        rows = [
+            header,
+            "1\t1\t0\t0\t0\t0\t0\t0\t10\t10\t-1\t",
+            "5\t1\t1\t1\t1\t1\t0\t0\t5\t5\t90\t日本",
+            "5\t1\t1\t1\t1\t2\t5\t0\t5\t5\t70\t語",
+        ]
+
+        def run_tesseract(**kwargs):
+            path = f"{kwargs['output_filename_base']}.{kwargs['extension']}"
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("\n".join(rows))
+            self.assertTrue(
+                kwargs["config"].endswith(
+                    f"{Constants.ENGINE_MODE} {Constants.HORIZONTAL_SEGMENTATION_MODE}"
+                )
+            )
+
+        mock_run_tesseract.side_effect = run_tesseract
+
+        text, confidence = PytesseractEngine().recognize(
+            np.zeros((10, 10), dtype=np.uint8),
+            Constants.JPN_LANGUAGE,
+            Constants.ENGINE_MODE,
+            Constants.HORIZONTAL_SEGMENTATION_MODE,
+        )
+
+        self.assertEqual(text, "日本 語\n")
+        self.assertEqual(confidence, 80.0)
+
+    @patch("src.text_extractor.engine.tesserocr", None)
+    def test_resolve_engine_name_without_tesserocr(self):
+        self.assertEqual(
+            resolve_engine_name(Constants.AUTO_ENGINE), Constants.PYTESSERACT_ENGINE
+        )
+
+    @patch("src.text_extractor.engine.tesserocr", MagicMock())
+    def test_resolve_engine_name_with_tesserocr(self):
+        self.assertEqual(
+            resolve_engine_name(Constants.AUTO_ENGINE), Constants.TESSEROCR_ENGINE
+        )
+
+    @patch("src.text_extractor.engine.available_cpus")
+    def test_default_ocr_workers(self, mock_available_cpus):
+        mock_available_cpus.return_value = 8
+
+        with patch.dict("os.environ", {"OMP_THREAD_LIMIT": "2"}):
+            self.assertEqual(engine_module.default_ocr_workers(), 4)
+        with patch.dict("os.environ", {"OMP_THREAD_LIMIT": "16"}):
+            self.assertEqual(engine_module.default_ocr_workers(), 1)
+
+    def test_get_ocr_engine_is_cached(self):
+        first = get_ocr_engine(Constants.PYTESSERACT_ENGINE)
+        second = get_ocr_engine(Constants.PYTESSERACT_ENGINE)
+        self.assertIs(first, second)
+
+    def test_get_ocr_engine_unknown(self):
+        with self.assertRaises(ValueError):
+            get_ocr_engine("unknown")
+
+    @patch("src.text_extractor.engine.tesserocr")
+    def test_pool_warm_up_loads_one_per_language(self, mock_tesserocr):
+        pool = TesseractEnginePool(size=2)
+        pool.warm_up(
+            [Constants.JPN_LANGUAGE, Constants.JPN_VERT_LANGUAGE], Constants.ENGINE_MODE
+        )
+        pool.warm_up(
+            [Constants.JPN_LANGUAGE, Constants.JPN_VERT_LANGUAGE], Constants.ENGINE_MODE
+        )
+
+        self.assertEqual(mock_tesserocr.PyTessBaseAPI.call_count, 2)
+
+        # The rest of the pool is loaded as concurrent regions need it
+        pool.acquire(Constants.JPN_LANGUAGE, 1)
+        self.assertEqual(mock_tesserocr.PyTessBaseAPI.call_count, 2)
+        pool.acquire(Constants.JPN_LANGUAGE, 1)
+        self.assertEqual(mock_tesserocr.PyTessBaseAPI.call_count, 3)
+
+    @patch("src.text_extractor.engine.tesserocr")
+    def test_get_ocr_engine_pool_follows_workers(self, mock_tesserocr):
+        with patch.object(engine_module.settings, "OCR_POOL_SIZE", None):
+            pool = get_ocr_engine(Constants.TESSEROCR_ENGINE, 1)
+            self.assertEqual(pool.size, 1)
+
+            self.assertIs(get_ocr_engine(Constants.TESSEROCR_ENGINE, 3), pool)
+            self.assertEqual(pool.size, 3)
+            get_ocr_engine(Constants.TESSEROCR_ENGINE, 2)
+            self.assertEqual(pool.size, 3)
+
+        with patch.object(engine_module.settings, "OCR_POOL_SIZE", 8):
+            get_ocr_engine(Constants.TESSEROCR_ENGINE, 1)
+            self.assertEqual(pool.size, 8)
+        self.assertEqual(mock_tesserocr.PyTessBaseAPI.call_count, 2)
+
+    @patch("src.text_extractor.engine.tesserocr")
+    def test_pool_image_to_string_reuses_api(self, mock_tesserocr):
+        api = MagicMock()
+        api.GetUTF8Text.return_value = "Detected text"
+        mock_tesserocr.PyTessBaseAPI.return_value = api
+        image = np.zeros((10, 20), dtype=np.uint8)
+
+        pool = TesseractEnginePool(size=1)
+        for _ in range(3):
+            text = pool.image_to_string(
+                image,
+                Constants.JPN_LANGUAGE,
+                Constants.ENGINE_MODE,
+                Constants.VERTICAL_SEGMENTATION_MODE,
+            )
+
+        self.assertEqual(text, "Detected text")
+        mock_tesserocr.PyTessBaseAPI.assert_called_once()
+        api.SetImageBytes.assert_called_with(image.tobytes(), 20, 10, 1, 20)
+        mock_tesserocr.PSM.assert_called_with(5)
+
+    @patch("src.text_extractor.engine.tesserocr")
+    def test_pool_recognize_confidence(self, mock_tesserocr):
+        api = MagicMock()
+        api.GetUTF8Text.side_effect = ["Detected text", ""]
+        api.MeanTextConf.return_value = 87
+        mock_tesserocr.PyTessBaseAPI.return_value = api
+        image = np.zeros((10, 20), dtype=np.uint8)
+        pool = TesseractEnginePool(size=1)
+
+        def recognize():
+            return pool.recognize(
+                image,
+                Constants.JPN_LANGUAGE,
+                Constants.ENGINE_MODE,
+                Constants.HORIZONTAL_SEGMENTATION_MODE,
+            )
+
+        self.assertEqual(recognize(), ("Detected text", 87.0))
+        self.assertEqual(recognize(), ("", None))
+
+    @patch("src.text_extractor.engine.tesserocr")
+    def test_pool_blocks_when_exhausted(self, mock_tesserocr):
+        pool = TesseractEnginePool(size=1)
+        api = pool.acquire(Constants.JPN_LANGUAGE, 1)
+        acquired = []
+
+        thread = threading.Thread(
+            target=lambda: acquired.append(pool.acquire(Constants.JPN_LANGUAGE, 1))
+        )
+        thread.start()
+        thread.join(timeout=0.1)
+        self.assertEqual(acquired, [])
+
+        pool.release(Constants.JPN_LANGUAGE, 1, api)
+        thread.join(timeout=1)
+        self.assertEqual(acquired, [api])
+        mock_tesserocr.PyTessBaseAPI.assert_called_once()
+
+    def test_stub_engine_is_deterministic(self):
+        engine = StubEngine(latency_seconds=0)
+        first = np.zeros((10, 40), dtype=np.uint8)
+        second = np.full((10, 40), 255, dtype=np.uint8)
+
+        def recognize(image):
+            return engine.recognize(
+                image,
+                Constants.JPN_LANGUAGE,
+                Constants.ENGINE_MODE,
+                Constants.HORIZONTAL_SEGMENTATION_MODE,
+            )
+
+        text, confidence = recognize(first)
+        self.assertEqual(recognize(first), (text, confidence))
+        self.assertEqual(len(text.strip()), 5)
+        self.assertNotEqual(recognize(second)[0], text)
+        self.assertEqual(confidence, 90.0)
+
+    @patch("src.text_extractor.engine.time.sleep")
+    def test_stub_engine_latency(self, mock_sleep):
+        engine = StubEngine(latency_seconds=0.25)
+        engine.image_to_string(
+            np.zeros((10, 10), dtype=np.uint8),
+            Constants.JPN_LANGUAGE,
+            Constants.ENGINE_MODE,
+            Constants.HORIZONTAL_SEGMENTATION_MODE,
+        )
+
+        mock_sleep.assert_called_once_with(0.25)
+
+    def test_get_ocr_engine_stub(self):
+        self.assertIsInstance(get_ocr_engine(Constants.STUB_ENGINE), StubEngine)
+
+
+if __name__ == "__main__":
+    unittest.main()
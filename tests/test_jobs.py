@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+from src.web_app.jobs import (
+    DONE,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    JobQueue,
+    MemoryJobStore,
+    SqliteJobStore,
+    create_job_store,
+)
+
+
+class JobStoreTests:
+
+    def test_submit_and_get(self):
+        job_id = self.store.submit({"file_path": "image.png"})
+        job = self.store.get(job_id)
+
+        self.assertEqual(job["status"], QUEUED)
+        self.assertEqual(job["queue_position"], 0)
+        self.assertIsNone(job["started_at"])
+
+    def test_queue_position(self):
+        first = self.store.submit({"file_path": "first.png"})
+        second = self.store.submit({"file_path": "second.png"})
+
+        self.assertEqual(self.store.get(second)["queue_position"], 1)
+        self.store.claim(timeout=0)
+        self.assertEqual(self.store.get(first)["status"], RUNNING)
+        self.assertEqual(self.store.get(second)["queue_position"], 0)
+
+    def test_claim_in_submission_order(self):
+        first = self.store.submit({"file_path": "first.png"})
+        self.store.submit({"file_path": "second.png"})
+
+        job = self.store.claim(timeout=0)
+
+        self.assertEqual(job["id"], first)
+        self.assertEqual(job["payload"], {"file_path": "first.png"})
+
+    def test_claim_empty_queue(self):
+        self.assertIsNone(self.store.claim(timeout=0))
+
+    def test_finish(self):
+        job_id = self.store.submit({"file_path": "image.png"})
+        self.store.claim(timeout=0)
+        self.store.finish(job_id, DONE, result="テキスト")
+
+        job = self.store.wait(job_id, timeout=1)
+        self.assertEqual(job["status"], DONE)
+        self.assertEqual(job["result"], "テキスト")
+        self.assertIsNone(job["queue_position"])
+        self.assertGreaterEqual(job["run_seconds"], 0)
+
+    def test_get_unknown_job(self):
+        self.assertIsNone(self.store.get("missing"))
+
+
+class TestMemoryJobStore(JobStoreTests, unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemoryJobStore(retention_seconds=60)
+
+
+class TestSqliteJobStore(JobStoreTests, unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "jobs.sqlite3")
+        self.store = SqliteJobStore(self.path, retention_seconds=60)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_shared_between_instances(self):
+        job_id = self.store.submit({"file_path": "image.png"})
+        other = SqliteJobStore(self.path, retention_seconds=60)
+
+        self.assertEqual(other.claim(timeout=0)["id"], job_id)
+        self.assertIsNone(self.store.claim(timeout=0))
+
+    def test_requeue_orphans(self):
+        job_id = self.store.submit({"file_path": "image.png"})
+        self.store.claim(timeout=0)
+        with self.store.connect() as connection:
+            connection.execute("UPDATE jobs SET pid = ?", (2**22 + 1,))
+
+        self.store.requeue_orphans()
+
+        self.assertEqual(self.store.get(job_id)["status"], QUEUED)
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def test_runs_jobs(self):
+        queue = JobQueue(MemoryJobStore(60), 1, lambda payload: payload["value"] * 2)
+
+        job_id = queue.submit({"value": 21})
+        job = queue.get(job_id, wait=5)
+
+        self.assertEqual(job["status"], DONE)
+        self.assertEqual(job["result"], 42)
+
+    def test_failed_jobs(self):
+        def handler(payload):
+            raise ValueError("Broken image")
+
+        queue = JobQueue(MemoryJobStore(60), 1, handler)
+
+        job = queue.get(queue.submit({}), wait=5)
+
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["error"], "Broken image")
+
+    def test_create_job_store_unknown(self):
+        with self.assertRaises(ValueError):
+            create_job_store("redis", None, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import numpy as np
+import unittest
+
+from src.text_extractor.layout import (
+    HORIZONTAL,
+    VERTICAL,
+    analyze_layout,
+    block_direction,
+    candidate_pairs,
+    filter_boxes,
+    merge_boxes,
+    profile_runs,
+    to_corners,
+)
+
+
+class TestLayout(unittest.TestCase):
+
+    def test_filter_boxes(self):
+        boxes = np.array(
+            [
+                (0, 0, 20, 20),  # kept
+                (0, 0, 5, 5),  # too small
+                (0, 0, 2, 100),  # too thin
+                (0, 0, 900, 900),  # frame
+            ]
+        )
+
+        kept = filter_boxes(boxes, 100, 0.1, max_size=(500, 500))
+
+        np.testing.assert_array_equal(kept, [(0, 0, 20, 20)])
+
+    def test_candidate_pairs(self):
+        corners = to_corners([(0, 0, 10, 10), (12, 0, 10, 10), (100, 0, 10, 10)])
+
+        first, second = candidate_pairs(corners, gap_x=5, gap_y=0)
+
+        self.assertEqual(
+            sorted(zip(first.tolist(), second.tolist())),
+            [(0, 1)],
+        )
+
+    def test_merge_boxes_nested_and_overlapping(self):
+        boxes = np.array([(0, 0, 50, 50), (10, 10, 5, 5), (40, 40, 20, 20)])
+
+        np.testing.assert_array_equal(merge_boxes(boxes), [(0, 0, 60, 60)])
+
+    def test_merge_boxes_chains(self):
+        boxes = np.array([(0, 0, 10, 10), (15, 0, 10, 10), (30, 0, 10, 10)])
+
+        np.testing.assert_array_equal(merge_boxes(boxes, gap_x=5), [(0, 0, 40, 10)])
+        self.assertEqual(len(merge_boxes(boxes, gap_x=4)), 3)
+
+    def draw_ink(self, boxes, shape=(300, 300)):
+        ink = np.zeros(shape, dtype=np.uint8)
+        for x, y, w, h in boxes:
+            ink[y : y + h, x : x + w] = 255
+        return ink
+
+    def test_profile_runs(self):
+        profile = np.array([0, 3, 4, 0, 2, 0, 0, 0, 5, 5, 0])
+
+        np.testing.assert_array_equal(
+            profile_runs(profile, 1), [(1, 3), (4, 5), (8, 10)]
+        )
+        np.testing.assert_array_equal(profile_runs(profile, 2), [(1, 5), (8, 10)])
+        self.assertEqual(len(profile_runs(np.zeros(5), 1)), 0)
+
+    def test_block_direction(self):
+        lines = self.draw_ink(
+            [(x, y, 20, 20) for y in (0, 30) for x in range(0, 200, 22)]
+        )
+        columns = self.draw_ink(
+            [(x, y, 20, 20) for x in (0, 30) for y in range(0, 200, 22)]
+        )
+
+        self.assertEqual(block_direction(lines, 10), HORIZONTAL)
+        self.assertEqual(block_direction(columns, 10), VERTICAL)
+        self.assertEqual(block_direction(lines[:20, :200], 10), HORIZONTAL)
+        self.assertEqual(block_direction(columns[:200, :20], 10), VERTICAL)
+
+    def test_block_direction_single_line_with_spaced_glyphs(self):
+        # Glyphs further apart than min_gap are separate runs across the line
+        line = self.draw_ink([(x, 0, 20, 20) for x in range(0, 220, 40)])
+
+        self.assertEqual(block_direction(line, 10), HORIZONTAL)
+        self.assertEqual(block_direction(line.T, 10), VERTICAL)
+
+    def test_block_direction_columns_with_blank_stretches(self):
+        # Two columns broken by the same paragraph breaks: more runs down the rows
+        # than across the columns, yet each row run is far longer than a glyph
+        boxes = [
+            (x, start + y, 20, 20)
+            for x in (0, 30)
+            for start in (0, 150, 300, 450)
+            for y in range(0, 110, 22)
+        ]
+        block = self.draw_ink(boxes, shape=(558, 50))
+
+        self.assertEqual(block_direction(block, 10), VERTICAL)
+        self.assertEqual(block_direction(block.T, 10), HORIZONTAL)
+
+    def test_analyze_layout_horizontal(self):
+        boxes = np.array([(x, y, 20, 20) for y in (0, 30) for x in range(0, 200, 22)])
+
+        blocks, directions = analyze_layout(self.draw_ink(boxes), boxes)
+
+        self.assertEqual(directions, [HORIZONTAL])
+        np.testing.assert_array_equal(blocks, [(0, 0, 218, 50)])
+
+    def test_analyze_layout_vertical_right_to_left(self):
+        boxes = np.array(
+            [(x, y, 20, 20) for x in (0, 30, 200, 230) for y in range(0, 200, 22)]
+        )
+
+        blocks, directions = analyze_layout(self.draw_ink(boxes), boxes)
+
+        self.assertEqual(directions, [VERTICAL, VERTICAL])
+        np.testing.assert_array_equal(blocks, [(200, 0, 50, 218), (0, 0, 50, 218)])
+
+    def test_analyze_layout_mixed_directions(self):
+        columns = [(x, y, 20, 20) for x in (200, 230) for y in range(0, 200, 22)]
+        line = [(x, 260, 20, 20) for x in range(0, 150, 22)]
+        boxes = np.array(columns + line)
+
+        blocks, directions = analyze_layout(self.draw_ink(boxes), boxes)
+
+        self.assertEqual(directions, [VERTICAL, HORIZONTAL])
+        np.testing.assert_array_equal(blocks, [(200, 0, 50, 218), (0, 260, 152, 20)])
+
+    def test_analyze_layout_empty(self):
+        blocks, directions = analyze_layout(
+            np.zeros((10, 10), dtype=np.uint8), np.empty((0, 4), dtype=np.int64)
+        )
+
+        self.assertEqual(len(blocks), 0)
+        self.assertEqual(directions, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from src.web_app.app import flask_app
+from src.web_app.metrics import (
+    REGIONS_PER_PAGE,
+    STAGE_LATENCY,
+    TESSERACT_CALLS,
+    observe_extractor,
+)
+
+WORKER_SCRIPT = """
+from src.web_app.metrics import TESSERACT_CALLS
+TESSERACT_CALLS.inc(3)
+"""
+
+SCRAPE_SCRIPT = """
+from src.web_app.metrics import metrics
+from src.web_app.app import flask_app
+with flask_app.app_context():
+    print(metrics().get_data(as_text=True))
+"""
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.client = flask_app.test_client()
+
+    def test_metrics_endpoint(self):
+        self.client.get("/")
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response.content_type)
+        body = response.get_data(as_text=True)
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",route="/"', body
+        )
+        self.assertIn("http_requests_in_flight", body)
+
+    def test_observe_extractor(self):
+        extractor = MagicMock()
+        extractor.timings = {"ocr": 0.5}
+        extractor.region_stats = {"regions": 4, "misses": 3}
+        calls = TESSERACT_CALLS._value.get()
+        pages = REGIONS_PER_PAGE._sum.get()
+
+        observe_extractor(extractor)
+
+        self.assertEqual(TESSERACT_CALLS._value.get(), calls + 3)
+        self.assertEqual(REGIONS_PER_PAGE._sum.get(), pages + 4)
+        self.assertGreaterEqual(STAGE_LATENCY.labels("ocr")._sum.get(), 0.5)
+
+    def test_observe_extractor_never_raises(self):
+        extractor = MagicMock()
+        extractor.timings = None
+
+        observe_extractor(extractor)
+
+    def test_metrics_aggregate_across_processes(self):
+        with tempfile.TemporaryDirectory() as multiproc_dir:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=multiproc_dir)
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", WORKER_SCRIPT], env=env, check=True
+                )
+
+            output = subprocess.run(
+                [sys.executable, "-c", SCRAPE_SCRIPT],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+
+        self.assertIn("tesseract_calls_total 6.0", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
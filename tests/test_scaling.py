@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+import unittest
+
+from src.text_extractor.scaling import (
+    compute_scale,
+    estimate_glyph_height,
+    interpolation_for,
+    resize_to_scale,
+)
+
+
+def page_with_glyphs(glyph_height, size=(600, 800)):
+    page = np.full(size, 255, dtype=np.uint8)
+    step = glyph_height * 2
+    for y in range(step, size[0] - step, step):
+        for x in range(step, size[1] - step, step):
+            cv2.rectangle(page, (x, y), (x + glyph_height, y + glyph_height), 0, 2)
+    return page
+
+
+class TestScaling(unittest.TestCase):
+
+    def test_estimate_glyph_height(self):
+        for glyph_height in (10, 30):
+            estimate = estimate_glyph_height(page_with_glyphs(glyph_height))
+            self.assertAlmostEqual(estimate, glyph_height + 1, delta=2)
+
+    def test_estimate_glyph_height_on_downsampled_page(self):
+        estimate = estimate_glyph_height(page_with_glyphs(40, size=(3000, 2400)))
+        self.assertAlmostEqual(estimate, 41, delta=4)
+
+    def test_estimate_glyph_height_blank_page(self):
+        self.assertIsNone(
+            estimate_glyph_height(np.full((100, 100), 255, dtype=np.uint8))
+        )
+
+    def test_compute_scale(self):
+        self.assertEqual(compute_scale(20, 40, 0.25, 4.0), 2.0)
+        self.assertEqual(compute_scale(160, 40, 0.25, 4.0), 0.25)
+        self.assertEqual(compute_scale(5, 40, 0.25, 4.0), 4.0)
+        self.assertEqual(compute_scale(38, 40, 0.25, 4.0), 1.0)
+        self.assertIsNone(compute_scale(None, 40, 0.25, 4.0))
+
+    def test_interpolation_for(self):
+        self.assertEqual(interpolation_for(0.5), cv2.INTER_AREA)
+        self.assertEqual(interpolation_for(1.4), cv2.INTER_LINEAR)
+        self.assertEqual(interpolation_for(3.0), cv2.INTER_CUBIC)
+
+    def test_resize_to_scale(self):
+        image = np.zeros((10, 20), dtype=np.uint8)
+
+        self.assertIs(resize_to_scale(image, 1.0), image)
+        self.assertEqual(resize_to_scale(image, 0.5).shape, (5, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import unittest
+from io import BytesIO
+
+from src.web_app.storage import (
+    DirectoryObjectStore,
+    LocalStorage,
+    ReadThroughCache,
+    SharedStorage,
+    create_storage,
+)
+from tests.fakes import MemoryObjectStore
+
+
+class TestLocalStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_save_and_read(self):
+        self.storage.save("image.png", BytesIO(b"image data"))
+
+        with self.storage.open("image.png") as file:
+            self.assertEqual(file.read(), b"image data")
+        self.assertEqual(self.storage.stat("image.png")[0], 10)
+        self.assertEqual(self.storage.list(), ["image.png"])
+        self.assertEqual(
+            self.storage.local_path("image.png"),
+            os.path.join(self.temp_dir.name, "image.png"),
+        )
+
+    def test_delete(self):
+        self.storage.save("image.png", BytesIO(b"image data"))
+
+        self.storage.delete("image.png")
+        self.storage.delete("image.png")
+
+        self.assertEqual(self.storage.list(), [])
+        with self.assertRaises(FileNotFoundError):
+            self.storage.local_path("image.png")
+
+    def test_rejects_names_outside_folder(self):
+        with self.assertRaises(FileNotFoundError):
+            self.storage.save("../image.png", BytesIO(b"image data"))
+        with self.assertRaises(FileNotFoundError):
+            self.storage.local_path("../image.png")
+
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(os.path.dirname(self.temp_dir.name), "image.png")
+            )
+        )
+
+
+class TestSharedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        self.store = MemoryObjectStore()
+        self.storage = self.create_node()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_node(self, cache_max_bytes=1000):
+        return SharedStorage(
+            self.store, ReadThroughCache(self.cache_dir, cache_max_bytes)
+        )
+
+    def test_any_node_reads_an_upload(self):
+        self.storage.save("image.png", BytesIO(b"image data"))
+        other = SharedStorage(
+            self.store,
+            ReadThroughCache(os.path.join(self.temp_dir.name, "other"), 1000),
+        )
+
+        with open(other.local_path("image.png"), "rb") as file:
+            self.assertEqual(file.read(), b"image data")
+        self.assertTrue(other.local_path("image.png").endswith(".png"))
+        self.assertEqual(other.cache.stats()["misses"], 1)
+        self.assertEqual(other.cache.stats()["hits"], 1)
+
+    def test_replaced_upload_is_fetched_again(self):
+        self.storage.save("image.png", BytesIO(b"first"))
+        first_path = self.storage.local_path("image.png")
+        self.storage.save("image.png", BytesIO(b"second upload"))
+
+        with open(self.storage.local_path("image.png"), "rb") as file:
+            self.assertEqual(file.read(), b"second upload")
+        self.assertNotEqual(self.storage.local_path("image.png"), first_path)
+
+    def test_deleted_upload_is_not_served_from_cache(self):
+        self.storage.save("image.png", BytesIO(b"image data"))
+        self.storage.local_path("image.png")
+
+        self.storage.delete("image.png")
+
+        with self.assertRaises(FileNotFoundError):
+            self.storage.local_path("image.png")
+        with self.assertRaises(FileNotFoundError):
+            self.storage.stat("image.png")
+
+    def test_cache_evicts_least_recently_used(self):
+        storage = self.create_node(cache_max_bytes=250)
+        for name in ("first.png", "second.png", "third.png"):
+            storage.save(name, BytesIO(b"x" * 100))
+        first_path = storage.local_path("first.png")
+        second_path = storage.local_path("second.png")
+        os.utime(first_path, (1, 1))
+        os.utime(second_path, (2, 2))
+
+        third_path = storage.local_path("third.png")
+
+        self.assertFalse(os.path.exists(first_path))
+        self.assertTrue(os.path.exists(second_path))
+        self.assertTrue(os.path.exists(third_path))
+
+    def test_directory_store(self):
+        shared_dir = os.path.join(self.temp_dir.name, "shared")
+        storage = SharedStorage(
+            DirectoryObjectStore(shared_dir), ReadThroughCache(self.cache_dir, 1000)
+        )
+
+        storage.save("image.png", BytesIO(b"image data"))
+
+        self.assertEqual(os.listdir(shared_dir), ["image.png"])
+        self.assertEqual(storage.list(), ["image.png"])
+        with open(storage.local_path("image.png"), "rb") as file:
+            self.assertEqual(file.read(), b"image data")
+        with self.assertRaises(FileNotFoundError):
+            storage.save("../image.png", BytesIO(b"image data"))
+
+    def test_create_storage(self):
+        folder = os.path.join(self.temp_dir.name, "uploads")
+
+        self.assertIsInstance(create_storage("local", folder), LocalStorage)
+        self.assertIsInstance(
+            create_storage(
+                "shared",
+                folder,
+                os.path.join(self.temp_dir.name, "shared"),
+                self.cache_dir,
+            ).store,
+            DirectoryObjectStore,
+        )
+        with self.assertRaises(ValueError):
+            create_storage("shared", folder, cache_dir=self.cache_dir)
+        with self.assertRaises(ValueError):
+            create_storage("memory", folder, cache_dir=self.cache_dir)
+        with self.assertRaises(ValueError):
+            create_storage("s3", folder)
+
+
+if __name__ == "__main__":
+    unittest.main()
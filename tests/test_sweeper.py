@@ -0,0 +1,120 @@
+import os
+import time
+import tempfile
+import unittest
+
+from src.web_app.storage import LocalStorage
+from src.web_app.sweeper import UploadSweeper
+
+
+class TestUploadSweeper(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.temp_dir.name, "uploads")
+        os.makedirs(self.folder)
+        self.index_path = os.path.join(self.temp_dir.name, "uploads.sqlite3")
+        self.sweeper = self.create_sweeper()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_sweeper(self, quota_bytes=1000):
+        return UploadSweeper(
+            lambda: LocalStorage(self.folder),
+            self.index_path,
+            ttl_seconds=600,
+            quota_bytes=quota_bytes,
+            interval_seconds=60,
+            batch_size=100,
+        )
+
+    def write_upload(self, name, size, age=0):
+        file_path = os.path.join(self.folder, name)
+        with open(file_path, "wb") as f:
+            f.write(b"x" * size)
+        mtime = time.time() - age
+        os.utime(file_path, (mtime, mtime))
+        return file_path
+
+    def track(self, file_path):
+        self.sweeper.track(os.path.basename(file_path))
+
+    def test_sweep_deletes_expired_uploads(self):
+        old_file = self.write_upload("old.png", 10, age=700)
+        new_file = self.write_upload("new.png", 10)
+        self.track(old_file)
+        self.track(new_file)
+
+        result = self.sweeper.sweep()
+
+        self.assertEqual(result, {"expired": 1, "evicted": 0})
+        self.assertFalse(os.path.exists(old_file))
+        self.assertTrue(os.path.exists(new_file))
+        self.assertEqual(self.sweeper.totals(), {"files": 1, "bytes": 10})
+
+    def test_sweep_evicts_oldest_over_quota(self):
+        files = [
+            self.write_upload(f"{index}.png", 400, age=300 - index)
+            for index in range(4)
+        ]
+        for file_path in files:
+            self.track(file_path)
+
+        result = self.sweeper.sweep()
+
+        self.assertEqual(result, {"expired": 0, "evicted": 2})
+        self.assertEqual(
+            [os.path.exists(file_path) for file_path in files],
+            [False, False, True, True],
+        )
+        self.assertEqual(self.sweeper.totals(), {"files": 2, "bytes": 800})
+
+    def test_track_same_file_twice(self):
+        file_path = self.write_upload("image.png", 10)
+        self.track(file_path)
+        self.write_upload("image.png", 30)
+        self.track(file_path)
+
+        self.assertEqual(self.sweeper.totals(), {"files": 1, "bytes": 30})
+
+    def test_index_survives_restart(self):
+        file_path = self.write_upload("image.png", 10, age=700)
+        self.track(file_path)
+
+        self.create_sweeper().sweep()
+
+        self.assertFalse(os.path.exists(file_path))
+
+    def test_single_leader_per_host(self):
+        other = self.create_sweeper()
+
+        self.assertTrue(self.sweeper.try_lead())
+        self.assertFalse(other.try_lead())
+
+        self.sweeper.lock_file.close()
+        self.sweeper.lock_file = None
+        self.assertTrue(other.try_lead())
+        other.lock_file.close()
+
+    def test_leader_indexes_untracked_uploads(self):
+        file_path = self.write_upload("image.png", 10, age=700)
+
+        self.assertTrue(self.sweeper.try_lead())
+        self.sweeper.sweep()
+        self.sweeper.lock_file.close()
+
+        self.assertFalse(os.path.exists(file_path))
+
+    def test_clear(self):
+        file_path = self.write_upload("image.png", 10)
+        self.track(file_path)
+
+        self.sweeper.clear()
+
+        self.assertFalse(os.path.exists(file_path))
+        self.assertEqual(self.sweeper.totals(), {"files": 0, "bytes": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
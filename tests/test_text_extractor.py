@@ -1,16 +1,29 @@
+import os
+import json
+import tempfile
 import cv2
+import time
 import numpy as np
 import unittest
+from io import BytesIO
 from PIL import Image
 
 from unittest.mock import patch, mock_open, MagicMock
 from src import settings
-from src.text_extractor.app import TextExtractor
+from src.text_extractor.app import TextExtractor, frame_cache, region_cache
 from src.text_extractor.constants import Constants
+from src.text_extractor.tracing import Tracer
+
+
+def no_text(regions):
+    return [""] * len(regions), 0
 
 
 class TestTextExtractor(unittest.TestCase):
 
+    def setUp(self):
+        region_cache.clear()
+
     @patch("src.text_extractor.app.os.path.abspath")
     @patch("src.text_extractor.app.cv2.imread")
     def test_load_image(self, mock_imread, mock_abspath):
@@ -58,26 +71,218 @@ class TestTextExtractor(unittest.TestCase):
         mock_resize_image.assert_called_once_with("fake/path/to/image.png")
         mock_load_image.assert_called_once_with("fake/resized/image.png")
 
-    @patch("src.text_extractor.app.cv2.findContours")
-    @patch("src.text_extractor.app.imutils.grab_contours")
-    def test_draw_contours_and_crop_images(
-        self, mock_grab_contours, mock_find_contours
+    def test_decode_image_from_bytes(self):
+        image = np.full((10, 20, 3), 255, dtype=np.uint8)
+        encoded = cv2.imencode(".png", image)[1].tobytes()
+
+        extractor = TextExtractor(in_memory=True)
+        decoded = extractor.decode_image(encoded)
+
+        self.assertEqual(decoded.shape, (10, 20, 3))
+
+    def test_decode_image_not_found(self):
+        extractor = TextExtractor(in_memory=True)
+        with self.assertRaises(FileNotFoundError):
+            extractor.decode_image("fake/path/to/image.png")
+
+    def test_decode_image_invalid_data(self):
+        extractor = TextExtractor(in_memory=True)
+        with self.assertRaises(ValueError):
+            extractor.decode_image(b"not an image")
+
+    @patch("src.text_extractor.app.TextExtractor.resize_image")
+    def test_pre_process_in_memory(self, mock_resize_image):
+        image = np.full((50, 40, 3), 255, dtype=np.uint8)
+        cv2.rectangle(image, (10, 10), (30, 20), (0, 0, 0), -1)
+        encoded = cv2.imencode(".png", image)[1].tobytes()
+
+        extractor = TextExtractor(in_memory=True)
+        processed_image = extractor.pre_process_image(encoded)
+
+        self.assertEqual(processed_image.shape, (100, 80))
+        self.assertEqual(processed_image.dtype, np.uint8)
+        self.assertTrue(set(np.unique(processed_image)) <= {0, 255})
+        mock_resize_image.assert_not_called()
+
+    @patch("src.text_extractor.app.estimate_glyph_height")
+    def test_scale_image_adaptive(self, mock_estimate_glyph_height):
+        mock_estimate_glyph_height.return_value = Constants.TARGET_GLYPH_HEIGHT * 2
+        image = np.zeros((100, 80, 3), dtype=np.uint8)
+
+        extractor = TextExtractor(in_memory=True, scaling=Constants.ADAPTIVE_SCALING)
+        scaled = extractor.scale_image(image)
+
+        self.assertEqual(scaled.shape, (50, 40, 3))
+        self.assertEqual(extractor.scale_factor, 0.5)
+
+    @patch("src.text_extractor.app.estimate_glyph_height")
+    def test_scale_image_adaptive_fallback(self, mock_estimate_glyph_height):
+        mock_estimate_glyph_height.return_value = None
+        image = np.zeros((100, 80, 3), dtype=np.uint8)
+
+        extractor = TextExtractor(in_memory=True, scaling=Constants.ADAPTIVE_SCALING)
+        scaled = extractor.scale_image(image)
+
+        self.assertEqual(scaled.shape, (200, 160, 3))
+        self.assertEqual(extractor.scale_factor, Constants.FIXED_SCALE)
+
+    def test_binarize_image_profiles(self):
+        image = np.full((60, 80, 3), 200, dtype=np.uint8)
+        cv2.rectangle(image, (20, 20), (40, 40), (30, 30, 30), -1)
+
+        for profile in Constants.PROFILES:
+            extractor = TextExtractor(profile=profile)
+            processed = extractor.binarize_image(image.copy())
+
+            self.assertEqual(processed.shape, (60, 80))
+            self.assertEqual(set(np.unique(processed)), {0, 255})
+            self.assertEqual(processed[30, 30], 0)
+            self.assertEqual(processed[5, 5], 255)
+
+    @patch.object(TextExtractor, "choose_scale", return_value=1.0)
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
+    def test_run_pages_read_only_frames_unscaled(
+        self, mock_image_to_string, mock_choose_scale
     ):
-        mock_find_contours.return_value = ([], None)
-        mock_grab_contours.return_value = [np.array([[0, 0], [0, 1], [1, 1], [1, 0]])]
+        mock_image_to_string.return_value = "Detected text"
+        buffer = BytesIO()
+        page = np.full((120, 200), 255, dtype=np.uint8)
+        cv2.rectangle(page, (40, 40), (160, 70), 0, -1)
+        pages = [Image.fromarray(page)] * 2
+        pages[0].save(buffer, format="TIFF", save_all=True, append_images=pages[1:])
+
+        for profile in Constants.PROFILES:
+            extractor = TextExtractor(
+                in_memory=True,
+                scaling=Constants.ADAPTIVE_SCALING,
+                profile=profile,
+                ocr_engine=Constants.PYTESSERACT_ENGINE,
+            )
+            results = [text for _, text in extractor.run_pages(buffer.getvalue())]
+
+            self.assertTrue(all(results), profile)
+
+    @patch.object(TextExtractor, "choose_scale", return_value=1.0)
+    def test_extract_tiled_leaves_frame_untouched(self, mock_choose_scale):
+        # Mid tones, so that any binarization or stretch in place shows
+        color = (self.text_strip(range(20, 3000, 100)) // 2 + 60).astype(np.uint8)
+        gray = cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+
+        for profile in Constants.PROFILES:
+            image = color if profile == Constants.QUALITY_PROFILE else gray
+            original = image.copy()
+            extractor = TextExtractor(
+                profile=profile,
+                scaling=Constants.ADAPTIVE_SCALING,
+                tile_size=500,
+                tile_overlap=100,
+            )
+            with patch.object(extractor, "recognize_regions", side_effect=no_text):
+                extractor.extract_tiled(image)
+
+            np.testing.assert_array_equal(image, original)
+
+    def test_unknown_profile_or_scaling(self):
+        with self.assertRaises(ValueError):
+            TextExtractor(profile="best")
+        with self.assertRaises(ValueError):
+            TextExtractor(scaling="bogus")
+
+    @patch("src.text_extractor.app.TextExtractor.resize_image")
+    def test_pre_process_image_profiles_run_in_memory(self, mock_resize_image):
+        image = np.full((50, 40, 3), 255, dtype=np.uint8)
+        cv2.rectangle(image, (10, 10), (30, 20), (0, 0, 0), -1)
+        encoded = cv2.imencode(".png", image)[1].tobytes()
+
+        for options in (
+            {"profile": Constants.FAST_PROFILE},
+            {"profile": Constants.BALANCED_PROFILE},
+            {"scaling": Constants.ADAPTIVE_SCALING},
+        ):
+            extractor = TextExtractor(**options)
+            with patch.object(
+                extractor, "binarize_image", wraps=extractor.binarize_image
+            ) as mock_binarize_image:
+                processed = extractor.pre_process_image(encoded)
+
+            mock_binarize_image.assert_called_once()
+            self.assertEqual(processed.ndim, 2)
+        mock_resize_image.assert_not_called()
+
+    def test_decode_image_grayscale_profiles(self):
+        data = cv2.imencode(".png", np.zeros((10, 20, 3), dtype=np.uint8))[1].tobytes()
+
+        fast = TextExtractor(profile=Constants.FAST_PROFILE).decode_image(data)
+        quality = TextExtractor(profile=Constants.QUALITY_PROFILE).decode_image(data)
+
+        self.assertEqual(fast.shape, (10, 20))
+        self.assertEqual(quality.shape, (10, 20, 3))
+
+    def test_draw_contours_and_crop_images(self):
+        image = np.full((200, 400), 255, dtype=np.uint8)
+        for line in range(2):
+            for column in range(8):
+                x, y = 20 + column * 40, 20 + line * 80
+                cv2.rectangle(image, (x, y), (x + 30, y + 30), 0, -1)
+        original = image.copy()
 
-        mock_img = np.zeros((100, 100), dtype=np.uint8)
+        extractor = TextExtractor()
+        cropped_images = extractor.draw_contours_and_crop_images(image)
+
+        self.assertEqual(len(cropped_images), 2)
+        self.assertEqual(cropped_images[0]["box"], (20, 20, 311, 31))
+        self.assertEqual(cropped_images[1]["box"], (20, 100, 311, 31))
+        for cropped_image in cropped_images:
+            self.assertEqual(
+                cropped_image["segmentation"], Constants.HORIZONTAL_SEGMENTATION_MODE
+            )
+        np.testing.assert_array_equal(image, original)
+
+    def test_draw_contours_and_crop_images_vertical_columns(self):
+        image = np.full((400, 200), 255, dtype=np.uint8)
+        for column in range(2):
+            for row in range(8):
+                x, y = 140 - column * 80, 20 + row * 40
+                cv2.rectangle(image, (x, y), (x + 30, y + 30), 0, -1)
+
+        extractor = TextExtractor()
+        cropped_images = extractor.draw_contours_and_crop_images(image)
+
+        self.assertEqual([image["box"][0] for image in cropped_images], [140, 60])
+        for cropped_image in cropped_images:
+            self.assertEqual(
+                cropped_image["segmentation"], Constants.VERTICAL_SEGMENTATION_MODE
+            )
+            self.assertEqual(cropped_image["language"], Constants.JPN_VERT_LANGUAGE)
+
+    def test_draw_contours_and_crop_images_vertical_block(self):
+        image = np.full((400, 300), 255, dtype=np.uint8)
+        for column in range(4):
+            for row in range(8):
+                x, y = 200 - column * 45, 20 + row * 40
+                cv2.rectangle(image, (x, y), (x + 30, y + 30), 0, -1)
 
         extractor = TextExtractor()
-        cropped_images = extractor.draw_contours_and_crop_images(mock_img)
+        cropped_images = extractor.draw_contours_and_crop_images(image)
 
         self.assertEqual(len(cropped_images), 1)
-        mock_find_contours.assert_called_once_with(
-            mock_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        self.assertEqual(cropped_images[0]["box"], (65, 20, 166, 311))
+        self.assertEqual(
+            cropped_images[0]["segmentation"], Constants.VERTICAL_SEGMENTATION_MODE
         )
-        mock_grab_contours.assert_called_once()
+        self.assertEqual(cropped_images[0]["language"], Constants.JPN_VERT_LANGUAGE)
+
+    def test_draw_contours_and_crop_images_filters_small_boxes(self):
+        image = np.full((200, 200), 255, dtype=np.uint8)
+        cv2.rectangle(image, (10, 10), (12, 12), 0, -1)
+        cv2.rectangle(image, (50, 50), (51, 90), 0, -1)
+
+        extractor = TextExtractor()
+        cropped_images = extractor.draw_contours_and_crop_images(image)
 
-    @patch("src.text_extractor.app.pytesseract.image_to_string")
+        self.assertEqual(cropped_images, [])
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
     def test_apply_ocr(self, mock_image_to_string):
         mock_image_to_string.return_value = "Detected text"
 
@@ -86,7 +291,7 @@ class TestTextExtractor(unittest.TestCase):
             "segmentation": Constants.HORIZONTAL_SEGMENTATION_MODE,
         }
 
-        extractor = TextExtractor()
+        extractor = TextExtractor(ocr_engine=Constants.PYTESSERACT_ENGINE)
         text_data = extractor.apply_ocr([mock_image_data])
 
         self.assertEqual(text_data, ["Detected text"])
@@ -96,6 +301,110 @@ class TestTextExtractor(unittest.TestCase):
             config=f"{Constants.ENGINE_MODE} {Constants.HORIZONTAL_SEGMENTATION_MODE}",
         )
 
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
+    def test_apply_ocr_parallel_keeps_region_order(self, mock_image_to_string):
+        def image_to_string(image, lang, config):
+            # Later regions finish first
+            time.sleep(0.01 * (5 - image[0, 0]))
+            return f"text {image[0, 0]}"
+
+        mock_image_to_string.side_effect = image_to_string
+
+        regions = [
+            {
+                "image": np.full((10, 10), index, dtype=np.uint8),
+                "segmentation": Constants.HORIZONTAL_SEGMENTATION_MODE,
+            }
+            for index in range(5)
+        ]
+
+        extractor = TextExtractor(
+            ocr_engine=Constants.PYTESSERACT_ENGINE, ocr_workers=4
+        )
+        text_data = extractor.apply_ocr(regions)
+
+        self.assertEqual(text_data, [f"text {index}" for index in range(5)])
+        self.assertEqual(mock_image_to_string.call_count, 5)
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
+    def test_apply_ocr_region_language(self, mock_image_to_string):
+        mock_image_to_string.return_value = "Detected text"
+        image = np.zeros((10, 10), dtype=np.uint8)
+
+        extractor = TextExtractor(ocr_engine=Constants.PYTESSERACT_ENGINE)
+        extractor.apply_ocr(
+            [
+                {
+                    "image": image,
+                    "segmentation": Constants.VERTICAL_SEGMENTATION_MODE,
+                    "language": Constants.JPN_VERT_LANGUAGE,
+                },
+                {
+                    "image": image,
+                    "segmentation": Constants.VERTICAL_SEGMENTATION_MODE,
+                    "language": Constants.JPN_LANGUAGE,
+                },
+            ]
+        )
+
+        languages = [call[1]["lang"] for call in mock_image_to_string.call_args_list]
+        self.assertEqual(
+            languages, [Constants.JPN_VERT_LANGUAGE, Constants.JPN_LANGUAGE]
+        )
+        self.assertEqual(extractor.region_stats["hits"], 0)
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
+    def test_apply_ocr_reuses_cached_regions(self, mock_image_to_string):
+        mock_image_to_string.side_effect = lambda image, lang, config: (
+            f"text {image[0, 0]}"
+        )
+
+        def region(value):
+            return {
+                "image": np.full((10, 10), value, dtype=np.uint8),
+                "segmentation": Constants.HORIZONTAL_SEGMENTATION_MODE,
+            }
+
+        extractor = TextExtractor(ocr_engine=Constants.PYTESSERACT_ENGINE)
+        extractor.apply_ocr([region(1), region(2)])
+        text_data = extractor.apply_ocr([region(2), region(3), region(1)])
+
+        self.assertEqual(text_data, ["text 2", "text 3", "text 1"])
+        self.assertEqual(mock_image_to_string.call_count, 3)
+        self.assertEqual(extractor.region_stats["hits"], 2)
+        self.assertAlmostEqual(extractor.region_stats["hit_ratio"], 2 / 3)
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
+    def test_apply_ocr_region_cache_keyed_by_segmentation(self, mock_image_to_string):
+        mock_image_to_string.return_value = "Detected text"
+        image = np.zeros((10, 10), dtype=np.uint8)
+
+        extractor = TextExtractor(ocr_engine=Constants.PYTESSERACT_ENGINE)
+        extractor.apply_ocr(
+            [{"image": image, "segmentation": Constants.HORIZONTAL_SEGMENTATION_MODE}]
+        )
+        extractor.apply_ocr(
+            [{"image": image, "segmentation": Constants.VERTICAL_SEGMENTATION_MODE}]
+        )
+
+        self.assertEqual(mock_image_to_string.call_count, 2)
+
+    def test_cache_config_includes_engine(self):
+        stub = TextExtractor(ocr_engine=Constants.STUB_ENGINE).cache_config()
+        pytesseract_config = TextExtractor(
+            ocr_engine=Constants.PYTESSERACT_ENGINE
+        ).cache_config()
+
+        self.assertEqual(stub["ocr_engine"], Constants.STUB_ENGINE)
+        self.assertNotEqual(stub, pytesseract_config)
+
+    @patch("src.text_extractor.app.default_ocr_workers")
+    def test_ocr_workers_default(self, mock_default_ocr_workers):
+        mock_default_ocr_workers.return_value = 6
+
+        self.assertEqual(TextExtractor().ocr_workers, 6)
+        self.assertEqual(TextExtractor(ocr_workers=2).ocr_workers, 2)
+
     def test_normalize_text(self):
         extractor = TextExtractor()
         normalized_text = extractor.normalize_text(
@@ -103,17 +412,30 @@ class TestTextExtractor(unittest.TestCase):
         )
         self.assertEqual(normalized_text, " This is a test \n Another line\n")
 
+    @patch("src.text_extractor.app.os.replace")
+    @patch("src.text_extractor.app.os.makedirs")
     @patch("src.text_extractor.app.open", new_callable=mock_open)
-    def test_save_text_to_file(self, mock_open_file):
+    def test_save_text_to_file(self, mock_open_file, mock_makedirs, mock_replace):
 
         extractor = TextExtractor()
         extractor.save_text_to_file("Sample text")
 
+        output_path = f"{settings.BASE_DIR}/src/text_extractor/output/recognized.txt"
         mock_open_file.assert_called_once_with(
-            f"{settings.BASE_DIR}/src/text_extractor/output/recognized.txt", "w"
+            f"{output_path}.tmp", "w", encoding="utf-8"
         )
-
         mock_open_file().write.assert_called_once_with("Sample text")
+        mock_replace.assert_called_once_with(f"{output_path}.tmp", output_path)
+
+    def test_save_text_to_file_output_path(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, "nested", "page.txt")
+
+            TextExtractor().save_text_to_file("日本語", output_path)
+
+            with open(output_path, encoding="utf-8") as file:
+                self.assertEqual(file.read(), "日本語")
+            self.assertEqual(os.listdir(os.path.dirname(output_path)), ["page.txt"])
 
     @patch("src.text_extractor.app.TextExtractor.pre_process_image")
     @patch("src.text_extractor.app.TextExtractor.draw_contours_and_crop_images")
@@ -135,6 +457,7 @@ class TestTextExtractor(unittest.TestCase):
             {
                 "image": np.zeros((100, 100), dtype=np.uint8),
                 "segmentation": Constants.HORIZONTAL_SEGMENTATION_MODE,
+                "box": (0, 0, 100, 100),
             }
         ]
         mock_apply_ocr.return_value = ["Detected text"]
@@ -170,6 +493,306 @@ class TestTextExtractor(unittest.TestCase):
         )
         self.assertIn("Test exception", mock_logger.error.call_args_list[1][0][0])
 
+    @patch.object(settings, "STUB_OCR_LATENCY_SECONDS", 0)
+    def test_run_traced(self):
+        image = np.full((200, 400, 3), 255, dtype=np.uint8)
+        cv2.rectangle(image, (20, 20), (300, 50), (0, 0, 0), -1)
+        data = cv2.imencode(".png", image)[1].tobytes()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tracer = Tracer(temp_dir, slow_seconds=0)
+            extractor = TextExtractor(
+                in_memory=True, ocr_engine=Constants.STUB_ENGINE, tracer=tracer
+            )
+            self.assertTrue(extractor.run(data))
+            tracer.flush()
+
+            (name,) = os.listdir(temp_dir)
+            trace_path = os.path.join(temp_dir, name)
+            with open(os.path.join(trace_path, "trace.json")) as file:
+                trace = json.load(file)
+            self.assertTrue(os.path.exists(os.path.join(trace_path, "regions.png")))
+
+        self.assertEqual(
+            [span["name"] for span in trace["spans"]],
+            ["preprocess", "segmentation", "ocr", "normalize"],
+        )
+        self.assertEqual(trace["attributes"]["regions"], 1)
+        self.assertEqual(trace["artifacts"], ["preprocessed.png", "regions.png"])
+        self.assertIsNone(extractor.trace)
+
+    @patch.object(TextExtractor, "pre_process_image")
+    def test_run_traced_exception(self, mock_pre_process_image):
+        mock_pre_process_image.side_effect = Exception("Test exception")
+        tracer = MagicMock(wraps=Tracer(None))
+
+        TextExtractor(tracer=tracer).run("dummy_input_file")
+
+        trace = tracer.finish.call_args[0][0]
+        self.assertEqual(trace.attributes["error"], "Test exception")
+
+    def multi_page_tiff(self, colors):
+        buffer = BytesIO()
+        pages = [Image.new("RGB", (40, 30), color) for color in colors]
+        pages[0].save(buffer, format="TIFF", save_all=True, append_images=pages[1:])
+        return buffer.getvalue()
+
+    def test_iter_frames(self):
+        data = self.multi_page_tiff([(255, 0, 0), (0, 0, 255), (0, 255, 0)])
+
+        frames = list(TextExtractor().iter_frames(data))
+
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(frames[0].shape, (30, 40, 3))
+        self.assertEqual(tuple(frames[0][0, 0]), (0, 0, 255))
+        self.assertEqual(tuple(frames[1][0, 0]), (255, 0, 0))
+
+    @patch.object(TextExtractor, "extract_frame")
+    def test_run_pages(self, mock_extract_frame):
+        mock_extract_frame.side_effect = [
+            "page one",
+            Exception("Bad page"),
+            "page three",
+        ]
+        data = self.multi_page_tiff([(255, 255, 255)] * 3)
+
+        pages = list(TextExtractor().run_pages(data))
+
+        self.assertEqual(pages, [(0, "page one"), (1, False), (2, "page three")])
+        self.assertEqual(mock_extract_frame.call_count, 3)
+
+    @patch.object(TextExtractor, "extract_image")
+    def test_run_rois(self, mock_extract_image):
+        frame_cache.clear()
+        crops = []
+
+        def extract_image(frame):
+            crops.append((frame.shape, tuple(frame[0, 0])))
+            frame[:] = 0
+            extractor.region_stats = {"regions": 1, "hits": 0}
+            return f"text {len(crops)}\n"
+
+        mock_extract_image.side_effect = extract_image
+        image = np.full((100, 200, 3), 255, dtype=np.uint8)
+        image[10:20, 30:40] = (0, 0, 255)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "page.png")
+            cv2.imwrite(file_path, image)
+            extractor = TextExtractor()
+
+            result = extractor.run_rois(
+                file_path, [[30, 10, 10, 10], [150, 50, 100, 100]]
+            )
+            with patch.object(TextExtractor, "decode_image") as mock_decode_image:
+                extractor.run_rois(file_path, [[30, 10, 10, 10]])
+
+        self.assertEqual(result, "text 1\n\ntext 2\n")
+        self.assertEqual(crops[0], ((10, 10, 3), (0, 0, 255)))
+        self.assertEqual(crops[1][0], (50, 50, 3))
+        self.assertEqual(extractor.region_stats["regions"], 1)
+        mock_decode_image.assert_not_called()
+        # The crops are processed in place without touching the cached frame
+        self.assertEqual(crops[2], crops[0])
+        self.assertEqual(frame_cache.stats()["hits"], 1)
+
+    def test_run_rois_outside_image(self):
+        frame_cache.clear()
+        image = cv2.imencode(".png", np.zeros((50, 50, 3), dtype=np.uint8))[1]
+
+        result = TextExtractor().run_rois(image.tobytes(), [[60, 60, 10, 10]])
+
+        self.assertFalse(result)
+
+    def text_strip(self, line_tops):
+        image = np.full((3000, 300, 3), 255, dtype=np.uint8)
+        for top in line_tops:
+            for left in range(20, 280, 30):
+                cv2.rectangle(image, (left, top), (left + 20, top + 24), (0, 0, 0), -1)
+        return image
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
+    def test_extract_tiled_matches_whole_image(self, mock_image_to_string):
+        mock_image_to_string.return_value = "Detected text"
+        image = self.text_strip(range(20, 3000, 100))
+        extractor = TextExtractor(
+            ocr_engine=Constants.PYTESSERACT_ENGINE, tile_size=500, tile_overlap=100
+        )
+
+        whole = extractor.draw_contours_and_crop_images(
+            extractor.binarize_image(extractor.upscale_image(image))
+        )
+        with patch.object(
+            extractor, "recognize_regions", wraps=extractor.recognize_regions
+        ) as mock_recognize_regions:
+            text_data = extractor.extract_tiled(image)
+
+        tiled = [
+            region["box"]
+            for call in mock_recognize_regions.call_args_list
+            for region in call[0][0]
+        ]
+        self.assertEqual(mock_recognize_regions.call_count, 6)
+        self.assertEqual(tiled, [region["box"] for region in whole])
+        self.assertEqual(len(text_data), 30)
+        self.assertEqual(extractor.region_stats["regions"], 30)
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_string")
+    def test_extract_tiled_keeps_boundary_regions_once(self, mock_image_to_string):
+        mock_image_to_string.return_value = "Detected text"
+        image = self.text_strip([490, 1990])
+        extractor = TextExtractor(
+            ocr_engine=Constants.PYTESSERACT_ENGINE, tile_size=500, tile_overlap=100
+        )
+
+        text_data = extractor.extract_tiled(image)
+
+        self.assertEqual(text_data, ["Detected text", "Detected text"])
+
+    def test_extract_tiled_keeps_blocks_across_band_edges_whole(self):
+        # Blocks longer than the overlap that still fit in one band
+        image = self.text_strip([430, 470, 510, 550, 950, 990, 1030, 1070, 1110])
+        extractor = TextExtractor(tile_size=500, tile_overlap=100)
+
+        whole = extractor.draw_contours_and_crop_images(
+            extractor.binarize_image(extractor.upscale_image(image))
+        )
+        with patch.object(
+            extractor, "recognize_regions", side_effect=no_text
+        ) as mock_recognize_regions:
+            extractor.extract_tiled(image)
+
+        tiled = [
+            region["box"]
+            for call in mock_recognize_regions.call_args_list
+            for region in call[0][0]
+        ]
+        self.assertEqual(len(whole), 2)
+        self.assertEqual(tiled, [region["box"] for region in whole])
+
+    def test_band_spans_edges_on_blank_rows(self):
+        image = self.text_strip(range(20, 3000, 100))
+        extractor = TextExtractor(tile_size=500, tile_overlap=100)
+
+        axis, spans = extractor.band_spans(image)
+
+        self.assertEqual(axis, 0)
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], 3000)
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            self.assertLess(start, end)
+            # No glyph is cut, the edges run through the white between lines
+            self.assertTrue((image[start] == 255).all())
+            self.assertTrue((image[end] == 255).all())
+
+    def test_extract_tiled_joins_long_columns(self):
+        image = np.full((3000, 300, 3), 255, dtype=np.uint8)
+        for top in range(100, 2900, 30):
+            cv2.rectangle(image, (140, top), (164, top + 20), (0, 0, 0), -1)
+        extractor = TextExtractor(tile_size=500, tile_overlap=100)
+
+        whole = extractor.draw_contours_and_crop_images(
+            extractor.binarize_image(extractor.upscale_image(image))
+        )
+        with patch.object(
+            extractor, "recognize_regions", side_effect=no_text
+        ) as mock_recognize_regions:
+            extractor.extract_tiled(image)
+
+        pieces = [
+            region
+            for call in mock_recognize_regions.call_args_list
+            for region in call[0][0]
+        ]
+        self.assertEqual(len(whole), 1)
+        self.assertEqual([piece["box"] for piece in pieces], [whole[0]["box"]])
+        self.assertEqual(pieces[0]["image"].shape, whole[0]["image"].shape)
+        self.assertEqual(pieces[0]["segmentation"], whole[0]["segmentation"])
+
+    def test_extract_tiled_vertical_page_in_reading_order(self):
+        # Columns of different lengths down a tall page, read right to left
+        image = np.full((3000, 400, 3), 255, dtype=np.uint8)
+        for left, bottom in ((40, 2900), (140, 1200), (240, 2500), (340, 700)):
+            for top in range(100, bottom, 30):
+                cv2.rectangle(image, (left, top), (left + 24, top + 20), (0, 0, 0), -1)
+        extractor = TextExtractor(tile_size=500, tile_overlap=100)
+
+        whole = extractor.draw_contours_and_crop_images(
+            extractor.binarize_image(extractor.upscale_image(image))
+        )
+        with patch.object(
+            extractor,
+            "recognize_regions",
+            side_effect=lambda regions: ([str(r["box"]) for r in regions], 0),
+        ) as mock_recognize_regions:
+            text_data = extractor.extract_tiled(image)
+
+        recognized = sum(
+            len(call[0][0]) for call in mock_recognize_regions.call_args_list
+        )
+        # Every column is recognized once, whole, in the order of the whole page
+        self.assertEqual(len(whole), 4)
+        self.assertEqual(recognized, 4)
+        self.assertEqual(text_data, [str(region["box"]) for region in whole])
+        self.assertEqual(extractor.region_stats["regions"], 4)
+
+    @patch("src.text_extractor.engine.pytesseract.image_to_data", autospec=True)
+    def test_run_structured(self, mock_image_to_data):
+        mock_image_to_data.return_value = {
+            "block_num": [1, 1],
+            "par_num": [1, 1],
+            "line_num": [1, 1],
+            "conf": [95, 85],
+            "text": ["Detected", "text"],
+        }
+        image = np.full((200, 400, 3), 255, dtype=np.uint8)
+        for line in range(2):
+            for column in range(8 - line):
+                x, y = 20 + column * 40, 20 + line * 80
+                cv2.rectangle(image, (x, y), (x + 30, y + 30), (0, 0, 0), -1)
+        data = cv2.imencode(".png", image)[1].tobytes()
+
+        extractor = TextExtractor(
+            ocr_engine=Constants.PYTESSERACT_ENGINE, ocr_workers=2
+        )
+        result = extractor.run_structured(data)
+
+        self.assertEqual(result["text"], "Detected text\nDetected text\n")
+        self.assertEqual([region["index"] for region in result["regions"]], [0, 1])
+        first = result["regions"][0]
+        self.assertEqual(first["text"], "Detected text")
+        self.assertEqual(first["box"], [20, 20, 311, 31])
+        self.assertEqual(first["segmentation"], Constants.HORIZONTAL_SEGMENTATION_MODE)
+        self.assertEqual(first["language"], Constants.JPN_LANGUAGE)
+        self.assertEqual(first["confidence"], 90.0)
+        self.assertEqual(extractor.region_stats["regions"], 2)
+
+        extractor.run_structured(data)
+        self.assertEqual(mock_image_to_data.call_count, 2)
+        self.assertEqual(extractor.region_stats["hits"], 2)
+
+    @patch.object(TextExtractor, "decode_image")
+    def test_run_structured_exception_handling(self, mock_decode_image):
+        mock_decode_image.side_effect = ValueError("The image could not be decoded")
+
+        self.assertFalse(TextExtractor().run_structured(b"not an image"))
+
+    @patch.object(TextExtractor, "extract_tiled")
+    def test_run_tiled(self, mock_extract_tiled):
+        mock_extract_tiled.return_value = ["Detected text"]
+        image = self.text_strip([20])
+        data = cv2.imencode(".png", image)[1].tobytes()
+
+        small_tiles = TextExtractor(tile_size=500, tile_overlap=100)
+        self.assertEqual(small_tiles.run(data), "Detected text\n")
+        mock_extract_tiled.assert_called_once()
+
+        mock_extract_tiled.reset_mock()
+        with patch.object(TextExtractor, "apply_ocr", return_value=["Detected text"]):
+            large_tiles = TextExtractor(tile_size=4000, tile_overlap=100)
+            self.assertEqual(large_tiles.run(data), "Detected text\n")
+        mock_extract_tiled.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,90 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src.text_extractor.tracing import Tracer
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_dir.name, "traces")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def finished_trace(self, tracer):
+        trace = tracer.start_trace("run")
+        trace.add_span("preprocess", trace.start, 0.5)
+        trace.set(regions=3)
+        trace.keep("preprocessed", np.zeros((10, 10), dtype=np.uint8))
+        trace.keep("regions", lambda: np.full((10, 10, 3), 255, dtype=np.uint8))
+        saved = tracer.finish(trace)
+        tracer.flush()
+        return trace, saved
+
+    def test_unsampled_trace_is_not_saved(self):
+        tracer = Tracer(self.directory, sample_rate=0.0, slow_seconds=None)
+
+        trace, saved = self.finished_trace(tracer)
+
+        self.assertFalse(saved)
+        self.assertIsNotNone(trace.seconds)
+        self.assertFalse(os.path.exists(self.directory))
+
+    def test_slow_trace_is_saved(self):
+        tracer = Tracer(self.directory, sample_rate=0.0, slow_seconds=0)
+
+        trace, saved = self.finished_trace(tracer)
+
+        self.assertTrue(saved)
+        (name,) = os.listdir(self.directory)
+        self.assertTrue(name.endswith(trace.trace_id))
+        trace_path = os.path.join(self.directory, name)
+        self.assertEqual(
+            sorted(os.listdir(trace_path)),
+            ["preprocessed.png", "regions.png", "trace.json"],
+        )
+        with open(os.path.join(trace_path, "trace.json")) as file:
+            data = json.load(file)
+        self.assertEqual(data["spans"][0]["name"], "preprocess")
+        self.assertEqual(data["attributes"], {"regions": 3})
+
+    @patch("src.text_extractor.tracing.random.random")
+    def test_sampled_trace_is_saved(self, mock_random):
+        mock_random.return_value = 0.05
+        tracer = Tracer(self.directory, sample_rate=0.1, slow_seconds=None)
+
+        _, saved = self.finished_trace(tracer)
+
+        self.assertTrue(saved)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_store_keeps_latest_traces(self):
+        tracer = Tracer(self.directory, slow_seconds=0, max_entries=2)
+
+        traces = [self.finished_trace(tracer)[0] for _ in range(3)]
+
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), 2)
+        self.assertTrue(names[0].endswith(traces[1].trace_id))
+        self.assertTrue(names[1].endswith(traces[2].trace_id))
+
+    @patch.object(Tracer, "start")
+    def test_full_queue_drops_traces(self, mock_start):
+        tracer = Tracer(self.directory, slow_seconds=0, queue_size=1)
+
+        first = tracer.finish(tracer.start_trace("run"))
+        second = tracer.finish(tracer.start_trace("run"))
+
+        self.assertTrue(first)
+        self.assertFalse(second)
+
+
+if __name__ == "__main__":
+    unittest.main()
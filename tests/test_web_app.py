@@ -1,10 +1,26 @@
+import json
 import os
+import subprocess
+import sys
 import tempfile
 import unittest
 from io import BytesIO
 from unittest.mock import patch, MagicMock
 
-from src.web_app.app import flask_app
+from src.text_extractor.cache import ResultCache
+from src.web_app.app import flask_app, run_job
+from src.web_app.admission import AdmissionRejected
+from src.web_app.jobs import JobQueue, MemoryJobStore
+from src.web_app.storage import ReadThroughCache, SharedStorage
+from src.web_app.sweeper import UploadSweeper
+from src.web_app.utils import sweeper
+from tests.fakes import MemoryObjectStore
+
+IMPORT_SCRIPT = """
+import sys
+import src.web_app.app
+print(",".join(name for name in ("cv2", "numpy", "PIL") if name in sys.modules))
+"""
 
 
 class TestWebApp(unittest.TestCase):
@@ -58,6 +74,31 @@ class TestWebApp(unittest.TestCase):
             self.assertIn("file_url", json_data)
             mock_schedule_file_delete.assert_called_once()
 
+    def test_upload_file_tracked_in_upload_folder(self):
+        # Same storage as the app sweeper, with an index of its own
+        upload_sweeper = UploadSweeper(
+            sweeper.get_storage,
+            os.path.join(self.temp_dir.name, "index", "uploads.sqlite3"),
+            ttl_seconds=600,
+            quota_bytes=1000,
+            interval_seconds=60,
+            batch_size=100,
+        )
+        with patch("src.web_app.utils.sweeper", upload_sweeper), patch.object(
+            upload_sweeper, "start"
+        ):
+            data = {"file": (BytesIO(b"Test file content"), "test_image.png")}
+            response = self.client.post(
+                "/upload", data=data, content_type="multipart/form-data"
+            )
+
+        self.assertTrue(response.get_json()["success"])
+        self.assertEqual(upload_sweeper.totals(), {"files": 1, "bytes": 17})
+
+        upload_sweeper.sweep(now=float("inf"))
+
+        self.assertNotIn("test_image.png", os.listdir(self.temp_dir.name))
+
     @patch("src.web_app.app.schedule_file_delete")
     def test_upload_cropped_file(self, mock_schedule_file_delete):
         with tempfile.NamedTemporaryFile() as temp_file:
@@ -84,7 +125,7 @@ class TestWebApp(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data, b"test image data")
 
-    @patch("src.web_app.app.TextExtractor")
+    @patch("src.text_extractor.app.TextExtractor")
     def test_process_file(self, mock_text_extractor):
         mock_text_extractor_instance = MagicMock()
         mock_text_extractor.return_value = mock_text_extractor_instance
@@ -110,6 +151,366 @@ class TestWebApp(unittest.TestCase):
         self.assertEqual(json_data["result"], "Processed text")
         mock_text_extractor_instance.run.assert_called_once_with(file_path)
 
+    @patch("src.web_app.app.schedule_file_delete")
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_file_shared_storage(
+        self, mock_text_extractor, mock_schedule_file_delete
+    ):
+        mock_text_extractor.return_value.run.return_value = "Processed text"
+        store = MemoryObjectStore()
+        nodes = [
+            SharedStorage(
+                store, ReadThroughCache(os.path.join(self.temp_dir.name, node), 1000)
+            )
+            for node in ("first", "second")
+        ]
+
+        with patch("src.web_app.app.storage", nodes[0]):
+            response = self.client.post(
+                "/upload", data={"file": (BytesIO(b"shared image"), "shared.png")}
+            )
+        self.assertTrue(response.get_json()["success"])
+        mock_schedule_file_delete.assert_called_once_with("shared.png")
+
+        with patch("src.web_app.app.storage", nodes[1]):
+            response = self.client.post("/process/shared.png")
+            served = self.client.get("/uploads/shared.png")
+
+        self.assertEqual(response.get_json()["result"], "Processed text")
+        self.assertEqual(served.data, b"shared image")
+        served.close()
+        self.assertNotIn("shared.png", os.listdir(self.app.config["UPLOAD_FOLDER"]))
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_file_cached(self, mock_text_extractor, mock_result_cache):
+        mock_text_extractor_instance = MagicMock()
+        mock_text_extractor.return_value = mock_text_extractor_instance
+        mock_text_extractor_instance.run.return_value = "Processed text"
+        mock_text_extractor_instance.cache_config.return_value = {"language": "jpn"}
+
+        with open(
+            os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png"), "wb"
+        ) as f:
+            f.write(b"test image data")
+
+        first = self.client.post("/process/test_image.png").get_json()
+        second = self.client.post("/process/test_image.png").get_json()
+
+        self.assertTrue(first["success"])
+        self.assertEqual(second["result"], "Processed text")
+        mock_text_extractor_instance.run.assert_called_once()
+
+        response = self.client.get("/cache/stats").get_json()
+        stats = response["stats"]
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertIn("max_bytes", response["frames"])
+
+    @patch("src.web_app.app.extract_text")
+    def test_process_file_async(self, mock_extract_text):
+        mock_extract_text.return_value = "Processed text"
+        file_path = os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png")
+        with open(file_path, "wb") as f:
+            f.write(b"test image data")
+
+        with patch(
+            "src.web_app.app.job_queue", JobQueue(MemoryJobStore(60), 1, run_job)
+        ):
+            response = self.client.post(
+                "/process/test_image.png?async=1",
+                json={"rois": [{"x": 10, "y": 20, "width": 30, "height": 40}]},
+            )
+            self.assertEqual(response.status_code, 202)
+            json_data = response.get_json()
+            self.assertTrue(json_data["success"])
+
+            response = self.client.get(f"{json_data['status_url']}?wait=5")
+            job = response.get_json()["job"]
+
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"], "Processed text")
+        self.assertIsNotNone(job["queue_seconds"])
+        mock_extract_text.assert_called_once_with(
+            file_path, "quality", [[10, 20, 30, 40]], max_wait_seconds=3600
+        )
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_file_rois(self, mock_text_extractor, mock_result_cache):
+        mock_text_extractor.return_value.run_rois.return_value = "Cropped text"
+        mock_text_extractor.return_value.cache_config.return_value = {}
+        file_path = os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png")
+        with open(file_path, "wb") as f:
+            f.write(b"test image data")
+        rois = [
+            {"x": 10, "y": 20, "width": 30, "height": 40},
+            {"x": 0, "y": 100, "width": 50, "height": 60},
+        ]
+
+        response = self.client.post("/process/test_image.png", json={"rois": rois})
+        self.assertEqual(response.get_json()["result"], "Cropped text")
+        response = self.client.post("/process/test_image.png", json={"rois": rois[:1]})
+        self.assertEqual(response.get_json()["result"], "Cropped text")
+
+        calls = mock_text_extractor.return_value.run_rois.call_args_list
+        self.assertEqual(
+            calls[0].args, (file_path, [[10, 20, 30, 40], [0, 100, 50, 60]])
+        )
+        self.assertEqual(calls[1].args, (file_path, [[10, 20, 30, 40]]))
+        mock_text_extractor.return_value.run.assert_not_called()
+
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_file_invalid_rois(self, mock_text_extractor):
+        with open(
+            os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png"), "wb"
+        ) as f:
+            f.write(b"test image data")
+
+        for rois in ([], [{"x": 0, "y": 0, "width": 0, "height": 10}], [{"x": 0}]):
+            response = self.client.post("/process/test_image.png", json={"rois": rois})
+
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.get_json()["success"])
+        mock_text_extractor.return_value.run_rois.assert_not_called()
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_file_profile(self, mock_text_extractor, mock_result_cache):
+        mock_text_extractor.return_value.run.return_value = "Processed text"
+        mock_text_extractor.return_value.cache_config.return_value = {}
+        with open(
+            os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png"), "wb"
+        ) as f:
+            f.write(b"test image data")
+
+        response = self.client.post("/process/test_image.png?profile=fast")
+
+        self.assertTrue(response.get_json()["success"])
+        self.assertEqual(mock_text_extractor.call_args[1]["profile"], "fast")
+
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_file_unknown_profile(self, mock_text_extractor):
+        with open(
+            os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png"), "wb"
+        ) as f:
+            f.write(b"test image data")
+
+        response = self.client.post("/process/test_image.png?profile=best")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.get_json()["success"])
+        mock_text_extractor.assert_not_called()
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_file_admission_rejected(
+        self, mock_text_extractor, mock_result_cache
+    ):
+        mock_text_extractor.return_value.cache_config.return_value = {}
+        file_path = os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png")
+        with open(file_path, "wb") as f:
+            f.write(b"test image data")
+
+        with patch("src.web_app.app.admission") as mock_admission:
+            mock_admission.admit.side_effect = AdmissionRejected("Busy", 5)
+            response = self.client.post("/process/test_image.png")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "5")
+        self.assertFalse(response.get_json()["success"])
+        mock_text_extractor.return_value.run.assert_not_called()
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_cached_result_skips_admission(self, mock_text_extractor, mock_cache):
+        mock_text_extractor.return_value.run.return_value = "Processed text"
+        mock_text_extractor.return_value.cache_config.return_value = {}
+        with open(
+            os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png"), "wb"
+        ) as f:
+            f.write(b"test image data")
+        self.client.post("/process/test_image.png")
+
+        # The budget is used up, yet repeats are served from the cache
+        with patch("src.web_app.app.admission") as mock_admission:
+            mock_admission.admit.side_effect = AdmissionRejected("Busy", 5)
+            processed = self.client.post("/process/test_image.png").get_json()
+            extracted = self.client.post(
+                "/extract", data=b"test image data", content_type="image/png"
+            ).get_json()
+
+        self.assertEqual(processed["result"], "Processed text")
+        self.assertEqual(extracted["result"], "Processed text")
+        mock_admission.admit.assert_not_called()
+        mock_text_extractor.return_value.run.assert_called_once()
+
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_pages(self, mock_text_extractor):
+        mock_text_extractor.return_value.run_pages.return_value = iter(
+            [(0, "page one"), (1, False)]
+        )
+        with open(
+            os.path.join(self.app.config["UPLOAD_FOLDER"], "scan.tiff"), "wb"
+        ) as f:
+            f.write(b"test image data")
+
+        response = self.client.post("/process_pages/scan.tiff")
+
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [
+            json.loads(line) for line in response.get_data(as_text=True).splitlines()
+        ]
+        self.assertEqual(lines[0], {"page": 0, "success": True, "result": "page one"})
+        self.assertEqual(lines[1]["page"], 1)
+        self.assertFalse(lines[1]["success"])
+        self.assertEqual(lines[2], {"done": True, "pages": 2})
+
+    def test_process_pages_not_found(self):
+        response = self.client.post("/process_pages/missing.tiff")
+
+        self.assertFalse(response.get_json()["success"])
+
+    def stream_events(self, url):
+        response = self.client.get(url)
+
+        self.assertEqual(response.mimetype, "text/event-stream")
+        return [
+            (
+                event.split("\n")[0].removeprefix("event: "),
+                json.loads(event.split("\n")[1].removeprefix("data: ")),
+            )
+            for event in response.get_data(as_text=True).strip().split("\n\n")
+        ]
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_stream(self, mock_text_extractor, mock_result_cache):
+        regions = [
+            {"index": 1, "text": "二行目", "box": [0, 20, 40, 10], "confidence": 90.0},
+            {"index": 0, "text": "一行目", "box": [0, 0, 40, 10], "confidence": 95.0},
+        ]
+        mock_text_extractor.return_value.iter_regions.return_value = iter(regions)
+        mock_text_extractor.return_value.normalize_text.side_effect = "\n".join
+        mock_text_extractor.return_value.cache_config.return_value = {}
+        with open(
+            os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png"), "wb"
+        ) as f:
+            f.write(b"test image data")
+
+        events = self.stream_events("/process_stream/test_image.png")
+
+        self.assertEqual(events[0], ("region", regions[0]))
+        self.assertEqual(events[1], ("region", regions[1]))
+        self.assertEqual(events[2][0], "done")
+        self.assertEqual(events[2][1]["result"], "一行目\n二行目")
+        self.assertEqual(events[2][1]["regions"], 2)
+
+        # A resubmit is answered from the cache, without taking budget
+        with patch("src.web_app.app.admission") as mock_admission:
+            events = self.stream_events("/process_stream/test_image.png")
+            processed = self.client.post("/process/test_image.png").get_json()
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], "done")
+        self.assertEqual(events[0][1]["result"], "一行目\n二行目")
+        self.assertEqual(processed["result"], "一行目\n二行目")
+        mock_admission.acquire.assert_not_called()
+        mock_admission.admit.assert_not_called()
+        mock_text_extractor.return_value.iter_regions.assert_called_once()
+        mock_text_extractor.return_value.run.assert_not_called()
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_process_stream_failure(self, mock_text_extractor, mock_result_cache):
+        mock_text_extractor.return_value.iter_regions.side_effect = Exception("boom")
+        mock_text_extractor.return_value.cache_config.return_value = {}
+        with open(
+            os.path.join(self.app.config["UPLOAD_FOLDER"], "test_image.png"), "wb"
+        ) as f:
+            f.write(b"test image data")
+
+        response = self.client.get("/process_stream/test_image.png")
+
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.startswith("event: failed\n"))
+        self.assertIn('"success": false', body)
+
+    def test_process_stream_not_found(self):
+        response = self.client.get("/process_stream/missing.png")
+
+        self.assertFalse(response.get_json()["success"])
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_extract_file_multipart(self, mock_text_extractor, mock_result_cache):
+        mock_text_extractor.return_value.run.return_value = "Processed text"
+        mock_text_extractor.return_value.cache_config.return_value = {}
+
+        data = {"file": (BytesIO(b"test image data"), "test_image.png")}
+        response = self.client.post(
+            "/extract", data=data, content_type="multipart/form-data"
+        )
+
+        json_data = response.get_json()
+        self.assertTrue(json_data["success"])
+        self.assertEqual(json_data["result"], "Processed text")
+        mock_text_extractor.return_value.run.assert_called_once_with(b"test image data")
+        self.assertEqual(os.listdir(self.app.config["UPLOAD_FOLDER"]), [])
+
+    @patch("src.web_app.app.result_cache", new_callable=lambda: ResultCache(8))
+    @patch("src.text_extractor.app.TextExtractor")
+    def test_extract_file_raw_body(self, mock_text_extractor, mock_result_cache):
+        mock_text_extractor.return_value.run.return_value = "Processed text"
+        mock_text_extractor.return_value.cache_config.return_value = {}
+
+        response = self.client.post(
+            "/extract", data=b"test image data", content_type="image/png"
+        )
+
+        self.assertTrue(response.get_json()["success"])
+        mock_text_extractor.return_value.run.assert_called_once_with(b"test image data")
+
+    def test_extract_file_no_file(self):
+        response = self.client.post(
+            "/extract", data={}, content_type="multipart/form-data"
+        )
+
+        json_data = response.get_json()
+        self.assertFalse(json_data["success"])
+        self.assertEqual(json_data["message"], "No selected file")
+
+    @patch("src.web_app.upload_request.settings")
+    def test_extract_file_too_large(self, mock_settings):
+        mock_settings.EXTRACT_MAX_BYTES = 10
+        mock_settings.SPOOL_THRESHOLD_BYTES = 10
+
+        data = {"file": (BytesIO(b"test image data" * 10), "test_image.png")}
+        response = self.client.post(
+            "/extract", data=data, content_type="multipart/form-data"
+        )
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(response.get_json()["success"])
+
+    @patch("src.web_app.upload_request.settings")
+    def test_upload_file_not_limited_by_extract_limit(self, mock_settings):
+        mock_settings.EXTRACT_MAX_BYTES = 10
+        mock_settings.SPOOL_THRESHOLD_BYTES = 10
+
+        data = {"file": (BytesIO(b"test image data" * 10), "test_image.png")}
+        with patch("src.web_app.app.schedule_file_delete"):
+            response = self.client.post(
+                "/upload", data=data, content_type="multipart/form-data"
+            )
+
+        self.assertTrue(response.get_json()["success"])
+
+    def test_job_status_not_found(self):
+        response = self.client.get("/jobs/missing")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.get_json()["success"])
+
     def test_process_file_not_found(self):
         response = self.client.post("/process/non_existent_image.png")
         self.assertEqual(response.status_code, 200)
@@ -119,6 +520,16 @@ class TestWebApp(unittest.TestCase):
             json_data["message"], "The image was not found, please reupload it."
         )
 
+    def test_heavy_dependencies_imported_lazily(self):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+        self.assertEqual(output.strip(), "")
+
 
 if __name__ == "__main__":
     unittest.main()